@@ -1,8 +1,20 @@
+import asyncio
+import json
+import time
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
-from models.schemas import AnalyzeRequest, TokenAnalysis, ScoreBreakdown, ExpectedReturn, ChatRequest, ChatResponse
-from services.coingecko import get_token_data, RateLimitError
-from services.ai_scoring import analyze_token, chat_about_token
+from models.schemas import (
+    AnalyzeRequest, TokenAnalysis, ScoreBreakdown, ExpectedReturn, ChatRequest, ChatResponse,
+    SweepRequest, SweepResponse, LockPeriodAnalysis, BatchAnalyzeRequest
+)
+from services.coingecko import RateLimitError
+from api.tokens import fetch_token_data
+from services.ai_scoring import chat_about_token, stream_chat_about_token, analyze_lock_periods
+from services.analysis_cache import get_or_analyze, get_cached_analysis, stream_or_analyze
+from services.batch_analysis import analyze_batch
 
 router = APIRouter()
 
@@ -22,25 +34,136 @@ async def analyze_token_endpoint(request: AnalyzeRequest):
     Lock period affects risk assessment - longer locks = more uncertainty.
     """
 
-    # Fetch token data from CoinGecko
+    token_data = await fetch_token_data(request.token_id)
+
+    # Get AI analysis (reused if the same inputs were analyzed recently)
+    analysis = await get_or_analyze(token_data, request.lock_period)
+
+    return build_token_analysis(token_data, analysis)
+
+
+@router.post("/analyze/stream")
+async def analyze_token_stream_endpoint(request: AnalyzeRequest):
+    """
+    Two-phase version of /analyze, streamed as NDJSON (one JSON object per line):
+    - {"event": "scores", "analysis": {...}}: deterministic scores, recommendation and
+      expected returns, sent before the LLM is called
+    - {"event": "narrative", "delta": "..."}: reasoning text as it is generated
+    - {"event": "done", "analysis": {...}, "narrative_source": "llm"|"fallback"}
+    """
+    token_data = await fetch_token_data(request.token_id)
+
+    async def events():
+        async for event in stream_or_analyze(token_data, request.lock_period):
+            if "analysis" in event:
+                analysis = event.pop("analysis")
+                event["analysis"] = build_token_analysis(token_data, analysis).model_dump()
+                if event["event"] == "done":
+                    event["narrative_source"] = analysis.get("narrative_source", "llm")
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/analyze/batch")
+async def analyze_batch_endpoint(request: BatchAnalyzeRequest):
+    """
+    Analyze up to 200 tokens, streamed as NDJSON in completion order:
+    - {"event": "result", "token_id": ..., "status": "ok", "analyses": [{"lock_period": 4, ...analysis}]}
+    - {"event": "result", "token_id": ..., "status": "degraded", "missing_inputs": [...], "analyses": [...]}
+      (scored without some inputs, e.g. OHLC while rate limited)
+    - {"event": "result", "token_id": ..., "status": "not_found" | "error", "error": ...}
+    - {"event": "done", "tokens": ..., "ok": ..., "degraded": ..., "elapsed_ms": ...}
+    """
+    started = time.perf_counter()
+    results = analyze_batch(request.token_ids, request.lock_periods, request.include_narrative)
     try:
-        token_data = await get_token_data(request.token_id)
+        # Fetches market data for the whole batch; fail with 429 before streaming starts
+        first = await results.__anext__()
     except RateLimitError:
         raise HTTPException(
             status_code=429,
             detail="CoinGecko API Rate Limit. Please wait a moment and try again."
         )
 
-    if not token_data:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Token '{request.token_id}' not found. Please check the ID."
+    async def events():
+        tokens = ok = degraded = 0
+        pending = first
+        try:
+            while pending is not None:
+                result = pending
+                tokens += 1
+                line = {"event": "result", "token_id": result["token_id"], "status": result["status"]}
+                if result["status"] in ("ok", "degraded"):
+                    if result["status"] == "ok":
+                        ok += 1
+                    else:
+                        degraded += 1
+                        line["missing_inputs"] = result["missing_inputs"]
+                    line["analyses"] = [
+                        {"lock_period": lock_period, **build_token_analysis(result["token_data"], analysis).model_dump()}
+                        for lock_period, analysis in result["analyses"]
+                    ]
+                elif "error" in result:
+                    line["error"] = result["error"]
+                yield json.dumps(line) + "\n"
+                pending = await anext(results, None)
+        finally:
+            await results.aclose()
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        yield json.dumps({
+            "event": "done", "tokens": tokens, "ok": ok, "degraded": degraded, "elapsed_ms": elapsed_ms
+        }) + "\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/analyze/sweep", response_model=SweepResponse)
+async def analyze_sweep_endpoint(request: SweepRequest):
+    """
+    Scores, recommendation and expected returns for every lock period (1-8 weeks)
+    from a single data fetch. The AI narrative is generated only for
+    narrative_lock_period, if given.
+    """
+    token_data = await fetch_token_data(request.token_id)
+
+    if request.narrative_lock_period is not None:
+        sweep, analysis = await asyncio.gather(
+            analyze_lock_periods(token_data),
+            get_or_analyze(token_data, request.narrative_lock_period)
         )
+        narrative = analysis["reasoning"]
+    else:
+        sweep = await analyze_lock_periods(token_data)
+        narrative = None
 
-    # Get AI analysis
-    analysis = await analyze_token(token_data, request.lock_period)
+    return SweepResponse(
+        token_id=token_data["id"],
+        token_name=token_data["name"],
+        token_symbol=token_data["symbol"],
+        current_price=token_data["current_price"],
+        market_cap=token_data.get("market_cap"),
+        periods=[LockPeriodAnalysis(**period) for period in sweep["periods"]],
+        narrative_lock_period=request.narrative_lock_period,
+        narrative=narrative,
+        sparkline_in_7d=token_data.get("sparkline_in_7d", []),
+        price_history_1y=sweep["price_history_1y"],
+        image=token_data.get("image"),
+        missing_inputs=sweep["missing_inputs"]
+    )
 
-    # Build response
+
+def build_token_analysis(token_data: dict, analysis: dict) -> TokenAnalysis:
+    """Response model from token data and an analysis result"""
     return TokenAnalysis(
         token_id=token_data["id"],
         token_name=token_data["name"],
@@ -54,7 +177,8 @@ async def analyze_token_endpoint(request: AnalyzeRequest):
         reasoning=analysis["reasoning"],
         sparkline_in_7d=token_data.get("sparkline_in_7d", []),
         price_history_1y=analysis.get("price_history_1y", []),
-        image=token_data.get("image")
+        image=token_data.get("image"),
+        missing_inputs=analysis.get("missing_inputs", [])
     )
 
 
@@ -63,10 +187,50 @@ async def chat_endpoint(request: ChatRequest):
     """
     Ask questions about a specific token analysis.
     The context must be provided in the request body.
+    If lock_period is given and that analysis is cached, the cached result is used instead.
     """
     response_text = await chat_about_token(
         message=request.message,
-        context=request.token_context.model_dump()
+        context=chat_context(request)
     )
     
     return ChatResponse(response=response_text)
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming version of /chat over Server-Sent Events:
+    - data: {"delta": "..."}         answer text as the model produces it
+    - event: done / data: {"response": "..."}   full answer
+    Disconnecting cancels the model call.
+    """
+    context = chat_context(request)
+
+    async def events():
+        chunks = []
+        async for delta in stream_chat_about_token(request.message, context):
+            chunks.append(delta)
+            yield sse({"delta": delta})
+        yield sse({"response": "".join(chunks)}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def chat_context(request: ChatRequest) -> dict:
+    """Chat context: the cached analysis for request.lock_period if available, else the request's"""
+    if request.lock_period is not None:
+        cached = get_cached_analysis(request.token_context.token_id, request.lock_period)
+        if cached is not None:
+            return build_token_analysis(*cached).model_dump()
+    return request.token_context.model_dump()
+
+
+def sse(data: dict, event: Optional[str] = None) -> str:
+    """One Server-Sent Events message"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
@@ -0,0 +1,36 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Query
+
+from models.schemas import BacktestResponse
+from services.ai_scoring import LOCK_PERIODS
+from services.backtest import run_backtest, backtest_sources, cached_candles, token_snapshot, \
+    BACKTEST_CANDLES_PATH
+
+router = APIRouter()
+
+
+@router.get("/backtest", response_model=BacktestResponse)
+async def backtest_endpoint(
+    lock_period: Optional[int] = Query(None, ge=1, le=8, description="Lock period in weeks (default: all)"),
+    discount: Optional[float] = Query(None, ge=0, lt=100, description="Fixed discount % (default: suggested per deal)"),
+    stride: int = Query(1, ge=1, description="Evaluate every n-th candle close")
+):
+    """
+    Replay the deterministic scores over rolling windows of historical candles
+    and report hit rate and PnL per recommendation.
+    Uses BACKTEST_CANDLES_PATH when set, otherwise the cached candle series.
+    """
+    lock_periods = [lock_period] if lock_period else LOCK_PERIODS
+    tokens = token_snapshot()
+    # The event loop keeps updating the candle store: copy the cached series here, not in the worker
+    cached = None if BACKTEST_CANDLES_PATH else cached_candles()
+
+    def backtest():
+        sources = backtest_sources() if cached is None else cached
+        return run_backtest(sources, tokens, lock_periods, discount, stride)
+
+    # CPU-bound (about a second for a year of 500 tokens): keep it off the event loop
+    results = await asyncio.to_thread(backtest)
+    return BacktestResponse(source="files" if BACKTEST_CANDLES_PATH else "cache", results=results)
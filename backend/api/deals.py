@@ -10,8 +10,8 @@ from database.db import (
     claim_deal,
     cancel_deal
 )
-from services.coingecko import get_token_data
-from services.ai_scoring import analyze_token
+from api.tokens import fetch_token_data
+from services.analysis_cache import get_or_analyze
 from models.schemas import ScoreBreakdown, ExpectedReturn
 
 router = APIRouter()
@@ -58,17 +58,12 @@ async def create_new_deal(request: CreateDealRequest):
     AI analysis is automatically attached to the deal.
     """
 
-    # Validate token exists
-    token_data = await get_token_data(request.token_id)
-    if not token_data:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Token '{request.token_id}' not found"
-        )
+    # Validate token exists (CoinGecko failures are 429/502, not a deal without analysis)
+    token_data = await fetch_token_data(request.token_id, not_found_status=400)
 
-    # Get AI analysis for the deal
+    # Get AI analysis for the deal (usually cached from the seller's /analyze call)
     try:
-        analysis_result = await analyze_token(token_data, request.lock_period)
+        analysis_result = await get_or_analyze(token_data, request.lock_period)
         ai_score = TokenAnalysis(
             token_id=token_data["id"],
             token_name=token_data["name"],
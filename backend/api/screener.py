@@ -0,0 +1,54 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Query
+
+from models.schemas import ScreenerResponse, ScreenerRow
+from services.screener import screener
+
+router = APIRouter()
+
+SortField = Literal[
+    "overall", "technical", "risk", "sentiment", "on_chain", "fundamental",
+    "market_cap", "market_cap_rank", "total_volume", "price_change_percentage_7d", "current_price"
+]
+Recommendation = Literal["STRONG_BUY", "BUY", "HOLD", "HIGH_RISK", "EXTREME_RISK"]
+
+
+@router.get("/screener", response_model=ScreenerResponse)
+async def screener_endpoint(
+    lock_period: int = Query(4, ge=1, le=8, description="Lock period in weeks"),
+    sort: SortField = Query("overall", description="Field to sort by"),
+    order: Literal["asc", "desc"] = Query("desc"),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=250),
+    min_overall: Optional[float] = Query(None, ge=0, le=10),
+    max_risk: Optional[float] = Query(None, ge=0, le=10),
+    recommendation: Optional[Recommendation] = Query(None)
+):
+    """
+    Top tokens by market cap with deterministic scores (no AI narrative),
+    precomputed in the background for every lock period.
+    The table is empty until the first background refresh completes.
+    """
+    table = screener.table
+    total, items = table.query(
+        lock_period=lock_period,
+        sort=sort,
+        descending=order == "desc",
+        page=page,
+        per_page=per_page,
+        min_overall=min_overall,
+        max_risk=max_risk,
+        recommendation=recommendation
+    )
+
+    return ScreenerResponse(
+        lock_period=lock_period,
+        sort=sort,
+        order=order,
+        page=page,
+        per_page=per_page,
+        total=total,
+        updated_at=table.updated_at,
+        items=[ScreenerRow(**item) for item in items]
+    )
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, Query
 
 from models.schemas import TokenData, TokenSearchResult
-from services.coingecko import get_token_data, search_tokens, get_trending_tokens, RateLimitError
+from services.coingecko import get_token_data, search_tokens, RateLimitError, UpstreamError
+from services.trending import ensure_trending_snapshot
 from services.deal_calculator import calculate_deal_metrics, suggest_discount
 
 router = APIRouter()
@@ -28,33 +29,45 @@ async def search_tokens_endpoint(
 
 @router.get("/tokens/trending", response_model=list[TokenSearchResult])
 async def get_trending_tokens_endpoint():
-    """Get currently trending tokens from CoinGecko"""
-    results = await get_trending_tokens()
-    return [TokenSearchResult(**r) for r in results]
+    """Get currently trending tokens from CoinGecko (background-refreshed snapshot)"""
+    snapshot = await ensure_trending_snapshot()
+    return [TokenSearchResult(**r) for r in snapshot.tokens]
 
 
-@router.get("/tokens/{token_id}", response_model=TokenData)
-async def get_token_endpoint(token_id: str):
+async def fetch_token_data(token_id: str, not_found_status: int = 404) -> dict:
     """
-    Get full market data for a specific token.
-
-    Use the CoinGecko token ID (e.g., 'bitcoin', 'ethereum', 'uniswap').
+    Token data from CoinGecko for an endpoint, or its HTTP error: 429 when rate
+    limited, 502 when CoinGecko fails, not_found_status when the token is not listed
     """
     try:
-        token = await get_token_data(token_id)
+        token_data = await get_token_data(token_id)
     except RateLimitError:
         raise HTTPException(
             status_code=429,
-            detail="External API rate limit reached. Please wait a moment and try again."
+            detail="CoinGecko API Rate Limit. Please wait a moment and try again."
+        )
+    except UpstreamError:
+        raise HTTPException(
+            status_code=502,
+            detail="CoinGecko API is unavailable. Please try again later."
         )
 
-    if not token:
+    if not token_data:
         raise HTTPException(
-            status_code=404,
+            status_code=not_found_status,
             detail=f"Token '{token_id}' not found. Please check the token symbol or ID."
         )
+    return token_data
+
+
+@router.get("/tokens/{token_id}", response_model=TokenData)
+async def get_token_endpoint(token_id: str):
+    """
+    Get full market data for a specific token.
 
-    return TokenData(**token)
+    Use the CoinGecko token ID (e.g., 'bitcoin', 'ethereum', 'uniswap').
+    """
+    return TokenData(**await fetch_token_data(token_id))
 
 
 @router.post("/tokens/{token_id}/calculate")
@@ -73,13 +86,7 @@ async def calculate_deal_endpoint(
     - Risk/reward ratio
     - Quality score
     """
-    token = await get_token_data(token_id)
-
-    if not token:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Token '{token_id}' not found"
-        )
+    token = await fetch_token_data(token_id)
 
     metrics = calculate_deal_metrics(
         token_amount=amount,
@@ -113,13 +120,7 @@ async def suggest_discount_endpoint(
     - Risk score from AI analysis
     - Token's 30-day volatility
     """
-    token = await get_token_data(token_id)
-
-    if not token:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Token '{token_id}' not found"
-        )
+    token = await fetch_token_data(token_id)
 
     # Fallback to a simple volatility proxy if no full technical analysis is available here
     # 30d change is NOT volatility. We use a combination of 7d and 30d absolute moves.
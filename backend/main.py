@@ -5,20 +5,48 @@ from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from api import analyze, deals, tokens
-from database.db import seed_demo_deals
-
-# Load environment variables
+# Load environment variables (before services read their configuration)
 load_dotenv()
 
+from api import analyze, deals, tokens, screener as screener_api, backtest as backtest_api
+from database.db import seed_demo_deals
+from services.coingecko import (
+    get_http_client, close_http_client, get_coingecko_stats, refresh_search_index, SEARCH_INDEX_REFRESH_INTERVAL
+)
+from services.candle_store import candle_store
+from services.timeframes import timeframe_cache
+from services.trending import refresh_trending, get_trending_stats, TRENDING_REFRESH_INTERVAL
+from services.background import start_background_jobs, stop_background_jobs
+from services.pipeline import get_pipeline_stats
+from services.analysis_cache import get_analysis_cache_stats
+from services.llm_limiter import llm_limiter
+from services.batch_analysis import get_batch_stats
+from services.ai_scoring import get_chat_stats
+from services.screener import screener, SCREENER_REFRESH_INTERVAL
+from services.persistent_cache import (
+    restore_caches, persist_caches, close_persistent_cache, get_persistence_stats, CACHE_PERSIST_INTERVAL
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: seed demo data
     seed_demo_deals()
     print("✅ Demo deals seeded")
+    restore_caches()
+    get_http_client()
+    print("✅ CoinGecko connection pool ready")
+    jobs = start_background_jobs([
+        ("trending", refresh_trending, TRENDING_REFRESH_INTERVAL),
+        ("search-index", refresh_search_index, SEARCH_INDEX_REFRESH_INTERVAL),
+        ("cache-persist", persist_caches, CACHE_PERSIST_INTERVAL),
+        ("screener", screener.refresh, SCREENER_REFRESH_INTERVAL),
+    ])
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop background jobs, flush caches and release pooled connections
+    await stop_background_jobs(jobs)
+    await close_persistent_cache()
+    await close_http_client()
     print("👋 Shutting down...")
 
 
@@ -84,6 +112,8 @@ app.add_middleware(
 app.include_router(analyze.router, prefix="/api", tags=["Analysis"])
 app.include_router(deals.router, prefix="/api", tags=["Deals"])
 app.include_router(tokens.router, prefix="/api", tags=["Tokens"])
+app.include_router(screener_api.router, prefix="/api", tags=["Screener"])
+app.include_router(backtest_api.router, prefix="/api", tags=["Backtest"])
 
 
 @app.get("/")
@@ -103,6 +133,24 @@ def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+def metrics():
+    """Runtime counters for upstream calls and caches"""
+    return {
+        "coingecko": get_coingecko_stats(),
+        "candles": candle_store.stats(),
+        "timeframes": timeframe_cache.stats(),
+        "trending": get_trending_stats(),
+        "persistent_cache": get_persistence_stats(),
+        "pipelines": get_pipeline_stats(),
+        "analysis_cache": get_analysis_cache_stats(),
+        "llm": llm_limiter.stats(),
+        "batch_analysis": get_batch_stats(),
+        "chat": get_chat_stats(),
+        "screener": screener.stats()
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Annotated, Optional, Literal
 from datetime import datetime
 
 
@@ -38,11 +38,107 @@ class TokenAnalysis(BaseModel):
     sparkline_in_7d: list[float] = []
     price_history_1y: list[float] = []
     image: Optional[str] = None
+    # Inputs that could not be fetched ("ohlc", "fundamentals"): those scores are the no-data defaults
+    missing_inputs: list[str] = []
+
+
+class BatchAnalyzeRequest(BaseModel):
+    token_ids: list[str] = Field(min_length=1, max_length=200)
+    lock_periods: list[Annotated[int, Field(ge=1, le=8)]] = Field([4], min_length=1)
+    # LLM narrative per token/lock period (deterministic reasoning when False)
+    include_narrative: bool = False
+
+
+class SweepRequest(BaseModel):
+    token_id: str
+    # Lock period to generate the AI narrative for (no LLM call when omitted)
+    narrative_lock_period: Optional[int] = Field(None, ge=1, le=8)
+
+
+class LockPeriodAnalysis(BaseModel):
+    lock_period: int
+    scores: ScoreBreakdown
+    recommendation: Literal["STRONG_BUY", "BUY", "HOLD", "HIGH_RISK", "EXTREME_RISK"]
+    expected_return: ExpectedReturn
+    key_risks: list[str]
+
+
+class SweepResponse(BaseModel):
+    token_id: str
+    token_name: str
+    token_symbol: str
+    current_price: float
+    market_cap: Optional[float] = None
+    periods: list[LockPeriodAnalysis]
+    narrative_lock_period: Optional[int] = None
+    narrative: Optional[str] = None
+    sparkline_in_7d: list[float] = []
+    price_history_1y: list[float] = []
+    image: Optional[str] = None
+    missing_inputs: list[str] = []
+
+
+class ScreenerRow(BaseModel):
+    id: str
+    name: str
+    symbol: str
+    image: Optional[str] = None
+    current_price: Optional[float] = None
+    market_cap: Optional[float] = None
+    market_cap_rank: Optional[int] = None
+    total_volume: Optional[float] = None
+    price_change_percentage_7d: Optional[float] = None
+    scores: ScoreBreakdown
+    recommendation: Literal["STRONG_BUY", "BUY", "HOLD", "HIGH_RISK", "EXTREME_RISK"]
+    # False: no cached price history yet, technical score is the neutral default
+    has_ohlc: bool
+
+
+class ScreenerResponse(BaseModel):
+    lock_period: int
+    sort: str
+    order: Literal["asc", "desc"]
+    page: int
+    per_page: int
+    total: int
+    updated_at: Optional[float] = None
+    items: list[ScreenerRow]
+
+
+class BacktestSummary(BaseModel):
+    deals: int
+    hit_rate: Optional[float] = None  # % of deals with a positive return
+    avg_return_pct: Optional[float] = None  # Return on the discounted price at unlock
+    median_return_pct: Optional[float] = None
+    worst_return_pct: Optional[float] = None
+    avg_market_return_pct: Optional[float] = None  # Price change over the lock, before the discount
+    avg_discount_pct: Optional[float] = None
+    total_pnl: float  # USD, per 1000 USD deal
+
+
+class BacktestLockPeriod(BaseModel):
+    lock_period: int
+    timeframe: Literal["4h", "1d", "1w"]
+    candle_hours: float
+    tokens: int  # Tokens with at least one deal
+    tokens_with_candles: int
+    # % of deals with a 30-day price change at entry (the others suggest the discount with a 0% 30d move)
+    price_change_30d_pct: Optional[float] = None
+    discount: Optional[float] = None  # None: suggested discount per deal
+    all: BacktestSummary
+    buckets: dict[Literal["STRONG_BUY", "BUY", "HOLD", "HIGH_RISK", "EXTREME_RISK"], BacktestSummary]
+
+
+class BacktestResponse(BaseModel):
+    source: Literal["files", "cache"]
+    results: list[BacktestLockPeriod]
 
 
 class ChatRequest(BaseModel):
     message: str
     token_context: TokenAnalysis
+    # When set, the server-side cached analysis for this lock period is used as context
+    lock_period: Optional[int] = Field(None, ge=1, le=8)
 
 
 class ChatResponse(BaseModel):
@@ -1,6 +1,7 @@
+import asyncio
 import os
 import json
-from typing import Optional
+from typing import AsyncIterator, Optional
 from openai import AsyncOpenAI
 
 client: Optional[AsyncOpenAI] = None
@@ -12,11 +13,15 @@ def get_client() -> AsyncOpenAI:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
-        client = AsyncOpenAI(api_key=api_key)
+        client = AsyncOpenAI(api_key=api_key, timeout=LLM_TIMEOUT)
     return client
 
 
-from .coingecko import get_coin_ohlc, get_trending_tokens
+from .llm_limiter import llm_limiter, LLM_TIMEOUT
+from .candle_store import candle_store
+from .timeframes import TIMEFRAMES, timeframe_cache, timeframe_for_lock_period, closes_per_year
+from .trending import ensure_trending_snapshot
+from .pipeline import Stage, run_pipeline
 from .technical_analysis import TechnicalScorer
 from .risk_analysis import RiskScorer
 from .fundamental_analysis import FundamentalScorer
@@ -75,6 +80,14 @@ Return JSON:
 }
 """
 
+# Streaming mode: scores, recommendation and returns are already sent, the model only writes the reasoning
+NARRATIVE_SYSTEM_PROMPT = SYSTEM_PROMPT.split("Return JSON:")[0] + """Return ONLY the reasoning as plain text (3-5 sentences, no JSON, no markdown).
+Mention specific data points like 'Active Github'.
+"""
+STREAM_INSTRUCTION = """
+    Explain these metrics in plain text for the user.
+    """
+
 
 def calculate_overall_score(tech: float, risk: float, sentiment: float, on_chain: float, fundamental: float) -> float:
     """Standardized overall score calculation (30/30/20/15/5)"""
@@ -88,58 +101,165 @@ def calculate_overall_score(tech: float, risk: float, sentiment: float, on_chain
     return round(max(0, min(10, overall)), 1)
 
 
-async def analyze_token(token_data: dict, lock_period: int) -> dict:
-    """Analyze a token using Deterministic Scorers + GPT-4 Narrative"""
+def analysis_stages(token_data: dict, lock_period: int) -> list[Stage]:
+    """
+    Dependency graph of the analysis pipeline:
 
-    # 0. Context Data
-    trending_list = await get_trending_tokens()
-    is_trending = any(t['id'] == token_data['id'] for t in trending_list)
-
-    # 1. Technical Analysis
-    ohlc = await get_coin_ohlc(token_data['id'], days="365")
-    price_history_1y = []
-    real_volatility = 50.0
-    if ohlc:
-        price_history_1y = [candle[4] for candle in ohlc]
-        tech_scorer = TechnicalScorer(ohlc)
-        tech_result = tech_scorer.get_technical_score()
-        real_volatility = tech_result['indicators'].get('volatility', 50.0)
-    else:
-        tech_result = {"score": 5.0, "indicators": {}, "details": ["No OHLC data available"]}
+        trending ──┬─> sentiment ──────────────┐
+                   └─> fundamental ────────────┤
+        timeframe_ohlc ──> technical ──> risk ─┼─> overall ──> narrative
+        ohlc ──> price_history_1y              │
+        on_chain ──────────────────────────────┘
+
+    The technical stage reads the candle timeframe matching the lock period
+    (4h / daily / weekly), derived from the cached 30-day or 365-day series.
+    """
+    timeframe = timeframe_for_lock_period(lock_period)
+
+    # 0. Context Data (snapshot kept fresh by a background task)
+    async def trending(r: dict) -> bool:
+        snapshot = await ensure_trending_snapshot()
+        return token_data['id'] in snapshot
+
+    # 1. Technical Analysis (cached series, only the tail is refetched)
+    async def ohlc(r: dict) -> list:
+        return await candle_store.get_candles(token_data['id'], days="365")
+
+    async def timeframe_ohlc(r: dict) -> dict:
+        candles = await timeframe_cache.get(token_data['id'], timeframe)
+        if not len(candles) and timeframe != "1w":
+            # No short-horizon series: fall back to the weekly view of the 1y series
+            return {"timeframe": "1w", "candles": await timeframe_cache.get(token_data['id'], "1w")}
+        return {"timeframe": timeframe, "candles": candles}
+
+    def technical(r: dict) -> dict:
+        view = r['timeframe_ohlc']
+        if len(view['candles']):
+            spec = TIMEFRAMES[view['timeframe']]
+            scorer = TechnicalScorer(view['candles'], closes_per_year(view['candles'], view['timeframe']))
+            # Native views are the cached series: the candle store keeps their indicators current
+            state = candle_store.indicators(token_data['id'], spec.source_days, view['candles'])
+            result = state.technical_score() if state is not None else scorer.get_technical_score()
+            # EMA, MACD, Bollinger width, ATR/TR volatility and drawdowns: reported, not scored
+            result['indicators'] = {**result['indicators'], **scorer.calculate_extended_indicators()}
+            result['timeframe'] = view['timeframe']
+            return result
+        return {"score": 5.0, "indicators": {}, "details": ["No OHLC data available"], "timeframe": None}
+
+    def price_history_1y(r: dict) -> list:
+        return [candle[4] for candle in r['ohlc']]
 
     # 2. Risk Analysis
-    risk_scorer = RiskScorer(token_data, real_volatility, lock_period)
-    risk_result = risk_scorer.get_risk_score()
+    def risk(r: dict) -> dict:
+        real_volatility = r['technical']['indicators'].get('volatility', 50.0)
+        return RiskScorer(token_data, real_volatility, lock_period).get_risk_score()
 
     # 3. Sentiment Analysis
-    sent_scorer = SentimentScorer(token_data, is_trending)
-    sent_result = sent_scorer.get_sentiment_score()
+    def sentiment(r: dict) -> dict:
+        return SentimentScorer(token_data, r['trending']).get_sentiment_score()
 
     # 4. On-Chain Analysis
-    oc_scorer = OnChainScorer(token_data)
-    oc_result = oc_scorer.get_on_chain_score()
+    def on_chain(r: dict) -> dict:
+        return OnChainScorer(token_data).get_on_chain_score()
 
     # 5. Fundamental Analysis
-    fund_scorer = FundamentalScorer(token_data, is_trending)
-    fund_result = fund_scorer.get_fundamental_score()
+    def fundamental(r: dict) -> dict:
+        return FundamentalScorer(token_data, r['trending']).get_fundamental_score()
 
     # 6. Overall Deterministic Score
-    overall_score = calculate_overall_score(
-        tech_result['score'], 
-        risk_result['score'], 
-        sent_result['score'], 
-        oc_result['score'], 
-        fund_result['score']
+    def overall(r: dict) -> float:
+        return calculate_overall_score(
+            r['technical']['score'],
+            r['risk']['score'],
+            r['sentiment']['score'],
+            r['on_chain']['score'],
+            r['fundamental']['score']
+        )
+
+    # 7. GPT-4o narrative (deterministic fallback if unavailable)
+    async def narrative(r: dict) -> dict:
+        return await generate_narrative(token_data, lock_period, r)
+
+    return [
+        Stage("trending", trending),
+        Stage("ohlc", ohlc),
+        Stage("timeframe_ohlc", timeframe_ohlc),
+        Stage("technical", technical, ("timeframe_ohlc",)),
+        Stage("price_history_1y", price_history_1y, ("ohlc",)),
+        Stage("risk", risk, ("technical",)),
+        Stage("sentiment", sentiment, ("trending",)),
+        Stage("on_chain", on_chain),
+        Stage("fundamental", fundamental, ("trending",)),
+        Stage("overall", overall, ("technical", "risk", "sentiment", "on_chain", "fundamental")),
+        Stage("narrative", narrative, ("overall",)),
+    ]
+
+
+def missing_inputs(token_data: dict, r: dict) -> list[str]:
+    """
+    Inputs that could not be fetched (e.g. rate limited), so their scorers fell
+    back to the no-data defaults: "ohlc" (technical) and "fundamentals". A token
+    CoinGecko simply has no details for is not missing anything.
+    """
+    missing = []
+    if not r['technical'].get('timeframe'):
+        missing.append("ohlc")
+    if token_data.get('fundamentals_unavailable'):
+        missing.append("fundamentals")
+    return missing
+
+
+async def analyze_token(token_data: dict, lock_period: int) -> dict:
+    """Analyze a token using Deterministic Scorers + GPT-4 Narrative"""
+    results, timings = await run_pipeline(
+        "analyze_token",
+        analysis_stages(token_data, lock_period),
+        targets=["narrative", "price_history_1y"]
     )
 
-    # 7. Prepare Prompt
-    tech_details = "\n".join([f"- {d}" for d in tech_result['details']])
+    analysis = results['narrative']
+    analysis['price_history_1y'] = results['price_history_1y']
+    analysis['missing_inputs'] = missing_inputs(token_data, results)
+    analysis['stage_timings_ms'] = timings
+    return analysis
+
+
+def extended_indicator_details(lock_period: int, r: dict) -> list[str]:
+    """Trend, range and drawdown context for the narrative, from the technical stage's indicators"""
+    tech_result = r['technical']
+    indicators = tech_result['indicators']
+    if 'macd_pct' not in indicators:
+        return []
+    drawdown = indicators['max_drawdown_by_lock_period'].get(lock_period)
+
+    details = [
+        f"MACD histogram {indicators['macd_histogram_pct']:+.2f}% of price "
+        f"(MACD {indicators['macd_pct']:+.2f}%, signal {indicators['macd_signal_pct']:+.2f}%)",
+        f"Bollinger(20, 2) width {indicators['bollinger_width']:.1f}%, ATR(14) {indicators['atr_pct']:.1f}% of price",
+        f"True-range volatility {indicators['tr_volatility']:.0f}% (annualized)",
+        f"Max drawdown {indicators['max_drawdown']:.1f}% over the {tech_result['timeframe']} series"
+    ]
+    if drawdown is not None:
+        details.append(f"Worst drawdown in any {lock_period}-week window: {drawdown:.1f}%")
+    return details
+
+
+def scorecard_prompt(token_data: dict, lock_period: int, r: dict) -> str:
+    """User prompt describing the pre-computed stage results"""
+    tech_result = r['technical']
+    risk_result = r['risk']
+    sent_result = r['sentiment']
+    oc_result = r['on_chain']
+    fund_result = r['fundamental']
+    overall_score = r['overall']
+
+    tech_details = "\n".join([f"- {d}" for d in tech_result['details'] + extended_indicator_details(lock_period, r)])
     risk_details = "\n".join([f"- {d}" for d in risk_result['details']])
     sent_details = "\n".join([f"- {d}" for d in sent_result['details']])
     oc_details = "\n".join([f"- {d}" for d in oc_result['details']])
     fund_details = "\n".join([f"- {d}" for d in fund_result.get('details', [])])
     
-    user_prompt = f"""
+    return f"""
     TOKEN: {token_data['name']} ({token_data['symbol'].upper()})
     Lock Period: {lock_period} weeks
     
@@ -163,7 +283,74 @@ async def analyze_token(token_data: dict, lock_period: int) -> dict:
     {fund_details}
     
     === OVERALL SYSTEM SCORE: {overall_score}/10 ===
-    
+    """
+
+
+def deterministic_analysis(token_data: dict, lock_period: int, r: dict) -> dict:
+    """Fallback-style analysis (recommendation, expected returns, risks) from stage results"""
+    return generate_fallback_analysis_internal(
+        token_data, lock_period,
+        r['technical'], r['risk'], r['sentiment'], r['on_chain'], r['fundamental'],
+        r['overall'], r['technical']['indicators'].get('volatility', 50.0)
+    )
+
+
+LOCK_PERIODS = range(1, 9)  # weeks
+
+
+async def analyze_lock_periods(token_data: dict, lock_periods=LOCK_PERIODS) -> dict:
+    """
+    Deterministic analysis for several lock periods (default: all) from one data fetch.
+    Only the technical timeframe, risk, the overall score and the expected returns
+    depend on the lock period, so the other stages run once, the technical stage
+    once per timeframe, and both are pre-seeded into each period's run.
+    """
+    # First lock period of each timeframe
+    by_timeframe = {}
+    for lock_period in lock_periods:
+        by_timeframe.setdefault(timeframe_for_lock_period(lock_period), lock_period)
+
+    (shared, timings), *technical_runs = await asyncio.gather(
+        run_pipeline(
+            "analyze_sweep",
+            analysis_stages(token_data, lock_periods[0]),
+            targets=["sentiment", "on_chain", "fundamental", "price_history_1y"]
+        ),
+        *(
+            run_pipeline("analyze_sweep", analysis_stages(token_data, lock_period), targets=["technical"])
+            for lock_period in by_timeframe.values()
+        )
+    )
+    technical = dict(zip(by_timeframe, (run for run, _ in technical_runs)))
+    for _, run_timings in technical_runs:
+        timings.update(run_timings)
+
+    periods = []
+    for lock_period in lock_periods:
+        r, _ = await run_pipeline(
+            "analyze_sweep",
+            analysis_stages(token_data, lock_period),
+            targets=["overall"],
+            results={**shared, **technical[timeframe_for_lock_period(lock_period)]}
+        )
+        analysis = deterministic_analysis(token_data, lock_period, r)
+        del analysis['price_history_1y']
+        periods.append({"lock_period": lock_period, **analysis})
+
+    return {
+        "periods": periods,
+        "price_history_1y": shared['price_history_1y'],
+        "missing_inputs": list(dict.fromkeys(
+            name for run in technical.values() for name in missing_inputs(token_data, run)
+        )),
+        "stage_timings_ms": timings
+    }
+
+
+async def generate_narrative(token_data: dict, lock_period: int, r: dict) -> dict:
+    """GPT-4o interpretation of pre-computed stage results (falls back to a deterministic summary)"""
+    real_volatility = r['technical']['indicators'].get('volatility', 50.0)
+    user_prompt = scorecard_prompt(token_data, lock_period, r) + f"""
     Generate the JSON analysis based on these metrics. 
     Calculate expected returns based on current 7d momentum ({token_data.get('price_change_percentage_7d', 0):+.1f}%) 
     and annualized volatility ({real_volatility:.1f}%).
@@ -171,7 +358,7 @@ async def analyze_token(token_data: dict, lock_period: int) -> dict:
 
     try:
         ai_client = get_client()
-        response = await ai_client.chat.completions.create(
+        response = await llm_limiter.run(lambda: ai_client.chat.completions.create(
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
@@ -179,34 +366,90 @@ async def analyze_token(token_data: dict, lock_period: int) -> dict:
             ],
             response_format={"type": "json_object"},
             temperature=0.7
-        )
+        ))
 
         result = json.loads(response.choices[0].message.content)
         
         # Enforce deterministic scores
         result['scores'] = {
-            "technical": tech_result['score'],
-            "risk": risk_result['score'],
-            "sentiment": sent_result['score'],
-            "on_chain": oc_result['score'],
-            "fundamental": fund_result['score'],
-            "overall": overall_score
+            "technical": r['technical']['score'],
+            "risk": r['risk']['score'],
+            "sentiment": r['sentiment']['score'],
+            "on_chain": r['on_chain']['score'],
+            "fundamental": r['fundamental']['score'],
+            "overall": r['overall']
         }
-        result['price_history_1y'] = price_history_1y
+        result['narrative_source'] = "llm"
 
         return result
 
     except Exception as e:
         print(f"OpenAI API error: {e}")
-        fallback = generate_fallback_analysis_internal(
-            token_data, lock_period, 
-            tech_result, risk_result, sent_result, oc_result, fund_result, 
-            overall_score, real_volatility
-        )
-        fallback['price_history_1y'] = price_history_1y
+        fallback = deterministic_analysis(token_data, lock_period, r)
+        fallback['narrative_source'] = "fallback"
         return fallback
 
 
+async def stream_narrative(token_data: dict, lock_period: int, r: dict) -> AsyncIterator[str]:
+    """
+    GPT-4o reasoning as text deltas (yields nothing if the model is unavailable).
+    The LLM deadline applies to the first token and LLM_STREAM_TIMEOUT to the whole
+    stream; past it the reasoning is cut short and the slot is released.
+    """
+    try:
+        ai_client = get_client()
+        async with llm_limiter.slot() as slot:
+            stream = await slot.wait(ai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": NARRATIVE_SYSTEM_PROMPT},
+                    {"role": "user", "content": scorecard_prompt(token_data, lock_period, r) + STREAM_INSTRUCTION}
+                ],
+                temperature=0.7,
+                stream=True
+            ))
+            try:
+                async for chunk in slot.stream(stream):
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                # Stops generation (and billing) when the client goes away mid-stream
+                await stream.close()
+    except Exception as e:
+        print(f"OpenAI API error: {e}")
+
+
+async def analyze_token_streaming(token_data: dict, lock_period: int) -> AsyncIterator[dict]:
+    """
+    Two-phase analysis. Yields events:
+    - {"event": "scores", "analysis": ...}: deterministic scores, recommendation and
+      expected returns, as soon as the scorers finish (no LLM wait)
+    - {"event": "narrative", "delta": "..."}: reasoning text as the model produces it
+    - {"event": "done", "analysis": ...}: final analysis with the streamed reasoning
+    """
+    results, timings = await run_pipeline(
+        "analyze_token_streaming",
+        analysis_stages(token_data, lock_period),
+        targets=["overall", "price_history_1y"]
+    )
+
+    analysis = deterministic_analysis(token_data, lock_period, results)
+    analysis['price_history_1y'] = results['price_history_1y']
+    analysis['missing_inputs'] = missing_inputs(token_data, results)
+    analysis['stage_timings_ms'] = timings
+    analysis['narrative_source'] = "fallback"
+    yield {"event": "scores", "analysis": analysis}
+
+    chunks = []
+    async for delta in stream_narrative(token_data, lock_period, results):
+        chunks.append(delta)
+        yield {"event": "narrative", "delta": delta}
+
+    if chunks:
+        analysis = {**analysis, "reasoning": "".join(chunks).strip(), "narrative_source": "llm"}
+    yield {"event": "done", "analysis": analysis}
+
+
 def generate_fallback_analysis_internal(
     token_data: dict, lock_period: int,
     tech_result: dict, risk_result: dict, sent_result: dict, oc_result: dict, fund_result: dict,
@@ -277,13 +520,7 @@ def generate_fallback_analysis(token_data: dict, lock_period: int) -> dict:
     )
 
 
-async def chat_about_token(message: str, context: dict) -> str:
-    """
-    Answer user questions about a specific token analysis.
-    Context is the full JSON output from analyze_token.
-    """
-    
-    system_prompt = """You are a helpful crypto analyst assistant.
+CHAT_SYSTEM_PROMPT = """You are a helpful crypto analyst assistant.
     You have performed a detailed analysis of a token (Context).
     User is asking questions about this analysis.
     
@@ -294,28 +531,142 @@ async def chat_about_token(message: str, context: dict) -> str:
     4. Be professional but conversational.
     """
 
-    user_prompt = f"""
-    CONTEXT (Analysis Results):
-    {json.dumps(context, indent=2)}
-    
-    USER QUESTION:
-    {message}
+CHAT_FALLBACK_MESSAGE = "I'm having trouble connecting to my brain right now. Please try again."
+
+# Context fields that carry no information for the model
+CHAT_CONTEXT_EXCLUDE = ("image",)
+
+chat_stats = {
+    "requests": 0,
+    "prompt_chars": 0,
+    "prompt_tokens": 0,
+    "cached_prompt_tokens": 0,
+    "completion_tokens": 0
+}
+
+
+def summarize_series(values: list) -> dict:
+    """Summary statistics standing in for a raw price series"""
+    first, last = values[0], values[-1]
+    return {
+        "points": len(values),
+        "first": float(f"{first:.6g}"),
+        "last": float(f"{last:.6g}"),
+        "min": float(f"{min(values):.6g}"),
+        "max": float(f"{max(values):.6g}"),
+        "change_pct": round((last / first - 1) * 100, 2) if first else None
+    }
+
+
+def compact_context(context: dict) -> dict:
+    """Analysis context for the chat prompt: numeric series summarized, empty fields dropped"""
+    compact = {}
+    for key, value in context.items():
+        if key in CHAT_CONTEXT_EXCLUDE or value is None or value == [] or value == {}:
+            continue
+        if isinstance(value, list) and all(isinstance(v, (int, float)) for v in value):
+            compact[key] = summarize_series(value)
+        elif isinstance(value, dict):
+            compact[key] = compact_context(value)
+        else:
+            compact[key] = value
+    return compact
+
+
+def chat_messages(message: str, context: dict) -> list[dict]:
     """
+    System prompt, then the context, then the question: the first two messages
+    are byte-identical across turns about the same analysis, so the provider's
+    prompt cache can reuse them.
+    """
+    context_json = json.dumps(compact_context(context), sort_keys=True, separators=(",", ":"))
+    return [
+        {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+        {"role": "system", "content": f"CONTEXT (Analysis Results):\n{context_json}"},
+        {"role": "user", "content": message}
+    ]
+
+
+def _usage_field(usage, name: str):
+    # Usage fields the SDK version does not model come back as plain dicts
+    return usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+
+
+def record_chat_usage(messages: list[dict], usage) -> None:
+    """Count prompt size (chars, and provider-reported tokens when available)"""
+    chat_stats["requests"] += 1
+    chat_stats["prompt_chars"] += sum(len(m["content"]) for m in messages)
+    if usage is None:
+        return
+    chat_stats["prompt_tokens"] += _usage_field(usage, "prompt_tokens") or 0
+    chat_stats["completion_tokens"] += _usage_field(usage, "completion_tokens") or 0
+    details = _usage_field(usage, "prompt_tokens_details")
+    if details is not None:
+        chat_stats["cached_prompt_tokens"] += _usage_field(details, "cached_tokens") or 0
+
+
+def get_chat_stats() -> dict:
+    requests = chat_stats["requests"]
+    return {
+        **chat_stats,
+        "avg_prompt_chars": round(chat_stats["prompt_chars"] / requests) if requests else 0,
+        "avg_prompt_tokens": round(chat_stats["prompt_tokens"] / requests) if requests else 0
+    }
 
+
+async def chat_about_token(message: str, context: dict) -> str:
+    """
+    Answer user questions about a specific token analysis.
+    Context is the full JSON output from analyze_token.
+    """
     try:
         ai_client = get_client()
-        response = await ai_client.chat.completions.create(
+        messages = chat_messages(message, context)
+        response = await llm_limiter.run(lambda: ai_client.chat.completions.create(
             model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=messages,
             temperature=0.7,
             max_tokens=200
-        )
+        ))
+        record_chat_usage(messages, getattr(response, "usage", None))
 
         return response.choices[0].message.content
 
     except Exception as e:
         print(f"OpenAI Chat error: {e}")
-        return "I'm having trouble connecting to my brain right now. Please try again."
+        return CHAT_FALLBACK_MESSAGE
+
+
+async def stream_chat_about_token(message: str, context: dict) -> AsyncIterator[str]:
+    """
+    Streaming chat_about_token: answer text deltas as the model produces them.
+    Closing the generator (client disconnected) aborts the completion.
+    """
+    answered = False
+    try:
+        ai_client = get_client()
+        messages = chat_messages(message, context)
+        async with llm_limiter.slot() as slot:
+            stream = await slot.wait(ai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=200,
+                stream=True,
+                # Final chunk carries token usage
+                extra_body={"stream_options": {"include_usage": True}}
+            ))
+            usage = None
+            try:
+                async for chunk in slot.stream(stream):
+                    usage = getattr(chunk, "usage", None) or usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        answered = True
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+                record_chat_usage(messages, usage)
+    except Exception as e:
+        print(f"OpenAI Chat error: {e}")
+        if not answered:
+            yield CHAT_FALLBACK_MESSAGE
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+from typing import AsyncIterator, Optional
+
+from .ai_scoring import analyze_token, analyze_token_streaming
+from .cache import TTLCache
+from .singleflight import SingleFlight
+from .trending import get_trending_snapshot, ensure_trending_snapshot
+
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", "600"))  # seconds
+
+# Token fields that feed the deterministic scorers and the prompt
+ANALYSIS_INPUT_FIELDS = (
+    "current_price", "market_cap", "market_cap_rank", "fully_diluted_valuation",
+    "circulating_supply", "total_supply", "total_volume",
+    "price_change_percentage_7d", "developer_data", "community_data",
+)
+
+# { (token_id, lock_period): (data_version, token_data, analysis) }
+ANALYSIS_CACHE = TTLCache(
+    "analysis",
+    maxsize=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "500")),
+    ttl=ANALYSIS_CACHE_TTL
+)
+analysis_flight = SingleFlight("analysis")
+
+
+def data_version(token_data: dict) -> str:
+    """Fingerprint of the analysis inputs: changes when market data or trending status changes"""
+    inputs = {field: token_data.get(field) for field in ANALYSIS_INPUT_FIELDS}
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    digest = hashlib.sha1(payload.encode()).hexdigest()[:16]
+    return f"{digest}:{get_trending_snapshot().version}"
+
+
+def get_cached_analysis(token_id: str, lock_period: int, version: Optional[str] = None) -> Optional[tuple[dict, dict]]:
+    """(token_data, analysis) if cached and fresh; any version when `version` is None"""
+    entry = ANALYSIS_CACHE.get((token_id, lock_period))
+    if entry is None:
+        return None
+
+    cached_version, token_data, analysis = entry
+    if version is not None and cached_version != version:
+        return None
+    return token_data, analysis
+
+
+def cacheable(analysis: dict) -> bool:
+    """
+    Deterministic fallbacks are not cached so the LLM narrative replaces them on
+    recovery, nor are analyses scored without their OHLC or fundamentals (e.g.
+    after a rate-limited fetch) so the next request retries the fetch
+    """
+    return analysis.get("narrative_source") != "fallback" and not analysis.get("missing_inputs")
+
+
+async def get_or_analyze(token_data: dict, lock_period: int) -> dict:
+    """
+    Analysis for a token/lock period, reusing a cached result computed from the
+    same input data. Concurrent requests for the same key share one pipeline run.
+    """
+    await ensure_trending_snapshot()  # so the version reflects the snapshot the pipeline will use
+    version = data_version(token_data)
+    cached = get_cached_analysis(token_data["id"], lock_period, version)
+    if cached is not None:
+        return cached[1]
+
+    async def compute() -> dict:
+        analysis = await analyze_token(token_data, lock_period)
+        if cacheable(analysis):
+            ANALYSIS_CACHE.set((token_data["id"], lock_period), (version, token_data, analysis))
+        return analysis
+
+    return await analysis_flight.do((token_data["id"], lock_period, version), compute)
+
+
+async def stream_or_analyze(token_data: dict, lock_period: int) -> AsyncIterator[dict]:
+    """
+    Streaming counterpart of get_or_analyze (events as in analyze_token_streaming).
+    A cached analysis is replayed as a "scores" event followed by "done".
+    """
+    await ensure_trending_snapshot()
+    version = data_version(token_data)
+    cached = get_cached_analysis(token_data["id"], lock_period, version)
+    if cached is not None:
+        yield {"event": "scores", "analysis": cached[1]}
+        yield {"event": "done", "analysis": cached[1]}
+        return
+
+    async for event in analyze_token_streaming(token_data, lock_period):
+        if event["event"] == "done" and cacheable(event["analysis"]):
+            ANALYSIS_CACHE.set((token_data["id"], lock_period), (version, token_data, event["analysis"]))
+        yield event
+
+
+def get_analysis_cache_stats() -> dict:
+    return {**ANALYSIS_CACHE.stats(), "coalescing": analysis_flight.stats()}
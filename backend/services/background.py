@@ -0,0 +1,25 @@
+import asyncio
+from typing import Awaitable, Callable
+
+
+async def run_periodically(name: str, fn: Callable[[], Awaitable], interval: float):
+    """Run fn() now and then every `interval` seconds until cancelled; errors are logged, not raised"""
+    while True:
+        try:
+            await fn()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Background job '{name}' failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_background_jobs(jobs: list[tuple[str, Callable[[], Awaitable], float]]) -> list[asyncio.Task]:
+    """Start (name, fn, interval) jobs as tasks; pass the result to stop_background_jobs on shutdown"""
+    return [asyncio.create_task(run_periodically(name, fn, interval), name=name) for name, fn, interval in jobs]
+
+
+async def stop_background_jobs(tasks: list[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
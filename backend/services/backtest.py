@@ -0,0 +1,332 @@
+"""
+Backtest of the deterministic scoring model on historical candles.
+
+Every candle close of every token is a hypothetical OTC deal: the token is
+scored from the data available at that close, bought at the discount and sold
+at the close at the end of the lock. Deals are grouped by recommendation to
+see whether better-rated deals actually paid off.
+
+Windows are evaluated for all tokens at once: the closes of a timeframe are
+laid out on one (tokens x candles) grid and the batch scorers run on the
+(tokens x windows x 31) close windows, so a year of daily candles for 500
+tokens and all lock periods takes seconds.
+
+Only prices are historical. Market cap, volume, supply, rank and the developer
+and community data are the current snapshot (or the scorers' no-data defaults)
+and trending is off, so those category scores are held constant over the
+history. Consecutive windows overlap, so deals are not independent samples.
+"""
+import json
+import os
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .ai_scoring import LOCK_PERIODS
+from .batch_scoring import token_columns, risk_scores, sentiment_scores, on_chain_scores, \
+    fundamental_scores, window_indicators, technical_scores, overall_scores, recommendations, \
+    round1, RECOMMENDATIONS
+from .candle_store import candle_store, DAY_MS
+from .coingecko import FUNDAMENTALS_CACHE
+from .screener import screener
+from .timeframes import TIMEFRAMES, WEEK_MS, YEAR_MS, resample, timeframe_for_lock_period
+
+# Optional: a JSON file or a directory of <token_id>.json candle files to backtest instead of the cached candles
+BACKTEST_CANDLES_PATH = os.getenv("BACKTEST_CANDLES_PATH")
+
+WINDOW = 31  # Closes read by the technical indicators
+# Upper bound on the size of one (tokens x windows x 31) block, to bound memory
+MAX_BLOCK_ELEMENTS = 2_000_000
+
+
+def load_candle_files(path: str) -> dict[str, list]:
+    """
+    Candles per token from a JSON file ({token_id: candles}) or a directory of
+    <token_id>.json files, each a list of [timestamp, open, high, low, close]
+    as returned by CoinGecko's /ohlc
+    """
+    if not os.path.isdir(path):
+        with open(path) as f:
+            return json.load(f)
+
+    candles = {}
+    for name in sorted(os.listdir(path)):
+        if name.endswith(".json"):
+            with open(os.path.join(path, name)) as f:
+                candles[name[:-len(".json")]] = json.load(f)
+    return candles
+
+
+def cached_candles() -> dict[str, dict[str, np.ndarray]]:
+    """
+    Candles per timeframe and token from the candle store's cached source series
+    (no network I/O), copied into arrays. The event loop updates the store in
+    place, so call this on the loop thread and hand only the copies to a worker.
+    """
+    token_ids = sorted({token_id for token_id, _, _ in candle_store.items()})
+    by_source = {}
+    for days in {spec.source_days for spec in TIMEFRAMES.values()}:
+        series = {token_id: candle_store.peek(token_id, days) for token_id in token_ids}
+        by_source[days] = {
+            token_id: np.array(candles, dtype=np.float64) for token_id, candles in series.items() if candles
+        }
+    return {timeframe: by_source[spec.source_days] for timeframe, spec in TIMEFRAMES.items()}
+
+
+def token_snapshot() -> dict[str, dict]:
+    """Current market data of the screener's tokens, with cached developer/community data"""
+    fundamentals = {key: value for key, value, _ in FUNDAMENTALS_CACHE.items() if value}
+    return {
+        row["id"]: {
+            **row,
+            "developer_data": fundamentals.get(row["id"], {}).get("developer_data"),
+            "community_data": fundamentals.get(row["id"], {}).get("community_data")
+        }
+        for row in screener.table.rows
+    }
+
+
+def suggested_discounts(lock_period: int, risk: np.ndarray, volatility_30d: np.ndarray) -> np.ndarray:
+    """suggest_discount()['suggested_discount'] for arrays of risk scores and volatility proxies"""
+    base_discount = {1: 5, 4: 12, 8: 20}.get(lock_period, 10)
+    risk_adjustment = (risk - 5) * 1.5
+    vol_adjustment = np.select([volatility_30d > 30, volatility_30d > 20, volatility_30d < 10], [5, 3, -2], 0)
+    suggested = base_discount + risk_adjustment + vol_adjustment
+    return round1(np.clip(suggested, 5, 35))
+
+
+def closes_grid(candles: dict[str, list], bucket_ms: int, origin_ms: int = 0):
+    """
+    Close prices of every token on a common time grid.
+    The grid step is the timeframe's candle size, or the coarsest candle size
+    among the series if that is larger. Missing candles and non-positive closes are NaN.
+    Returns (token_ids, closes (tokens x candles), times, step_ms, source_ms): times are
+    the real close times of the grid's closes, source_ms the coarsest source candle size.
+    """
+    series = {}
+    source = 0
+    for token_id, ohlc in candles.items():
+        ohlc = np.asarray(ohlc, dtype=np.float64).reshape(-1, 5)
+        if len(ohlc) < 2:
+            continue
+        ohlc = ohlc[np.argsort(ohlc[:, 0], kind="stable")]
+        series[token_id] = ohlc
+        source = max(source, int(np.median(np.diff(ohlc[:, 0]))))
+    step = max(bucket_ms, source)
+
+    token_ids = list(series)
+    origin = origin_ms % step
+    resampled = [np.asarray(resample(series[t], step, origin), dtype=np.float64) for t in token_ids]
+    if not resampled:
+        return token_ids, np.empty((0, 0)), np.empty((0, 0)), step, source
+
+    # Each close is stamped with its real close time, which lies in its bucket
+    buckets = [((ohlc[:, 0] - origin - 1) // step).astype(np.int64) for ohlc in resampled]
+    first = min(b[0] for b in buckets)
+    shape = (len(token_ids), int(max(b[-1] for b in buckets) - first) + 1)
+    closes, times = np.full(shape, np.nan), np.full(shape, np.nan)
+    for i, (ohlc, b) in enumerate(zip(resampled, buckets)):
+        closes[i, b - first] = ohlc[:, 4]
+        times[i, b - first] = ohlc[:, 0]
+    closes[closes <= 0] = np.nan
+    return token_ids, closes, times, step, source
+
+
+def lookback(closes: np.ndarray, ends: np.ndarray, candles: int) -> np.ndarray:
+    """Closes `candles` before each window end (NaN before the start of the grid)"""
+    index = ends - candles
+    return np.where(index >= 0, closes[:, np.maximum(index, 0)], np.nan)
+
+
+class TimeframeWindows:
+    """Price-derived scoring inputs for every (token, window end) on one timeframe grid"""
+
+    def __init__(self, candles: dict[str, list], bucket_ms: int, origin_ms: int = 0, stride: int = 1):
+        self.token_ids, self.closes, times, self.step, source = closes_grid(candles, bucket_ms, origin_ms)
+        n_tokens, n_candles = self.closes.shape
+        self.ends = np.arange(WINDOW - 1, n_candles, stride)
+
+        # Closes per year for annualizing volatility, as closes_per_year(): by the real
+        # spacing of each window's closes when the grid step is not a multiple of the
+        # source candles (weekly closes of 4-day candles are 4 or 8 days apart)
+        periods_per_year = np.full((n_tokens, len(self.ends)), YEAR_MS / self.step)
+        if source and self.step % source:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                span = times[:, self.ends] - times[:, self.ends - (WINDOW - 1)]
+                periods_per_year = YEAR_MS * (WINDOW - 1) / span
+
+        # RSI(14), volatility(30) and SMA20 deviation per window, in token blocks
+        shape = (n_tokens, len(self.ends))
+        self.rsi, self.volatility, self.sma_deviation = np.empty(shape), np.empty(shape), np.empty(shape)
+        self.complete = np.zeros(shape, dtype=bool)
+        if n_candles >= WINDOW:
+            windows = sliding_window_view(self.closes, WINDOW, axis=1)  # [token, end - 30]
+            block = max(1, MAX_BLOCK_ELEMENTS // (len(self.ends) * WINDOW))
+            for start in range(0, n_tokens, block):
+                rows = slice(start, start + block)
+                window = windows[rows, self.ends - (WINDOW - 1)]
+                self.rsi[rows], self.volatility[rows], self.sma_deviation[rows] = window_indicators(
+                    window, WINDOW, periods_per_year[rows]
+                )
+                self.complete[rows] = ~np.isnan(window).any(axis=-1)
+
+        self.technical = technical_scores(self.rsi, self.volatility, self.sma_deviation)
+
+        # CoinGecko-style price changes at each window end
+        with np.errstate(invalid="ignore"):
+            last = self.closes[:, self.ends] if n_candles else np.empty(shape)
+            self.price_change_7d = (last / lookback(self.closes, self.ends, self._candles(7 * DAY_MS)) - 1) * 100
+            self.price_change_30d = (last / lookback(self.closes, self.ends, self._candles(30 * DAY_MS)) - 1) * 100
+
+    def _candles(self, duration_ms: int) -> int:
+        return max(1, round(duration_ms / self.step))
+
+    def covers(self, lock_period: int) -> bool:
+        """Whether the grid is long enough for an indicator window followed by the lock"""
+        return self.closes.shape[1] >= WINDOW + self._candles(lock_period * WEEK_MS)
+
+    def forward_returns(self, lock_period: int) -> np.ndarray:
+        """Price change (%) from each window end to the end of the lock (NaN past the end of the data)"""
+        horizon = self._candles(lock_period * WEEK_MS)
+        index = self.ends + horizon
+        n_candles = self.closes.shape[1]
+        exit_closes = np.where(index < n_candles, self.closes[:, np.minimum(index, n_candles - 1)], np.nan)
+        with np.errstate(invalid="ignore"):
+            return (exit_closes / self.closes[:, self.ends] - 1) * 100
+
+
+def summarize(returns: np.ndarray, market_returns: np.ndarray, discounts: np.ndarray, notional: float) -> dict:
+    """Hit rate and PnL of a group of deals"""
+    if not len(returns):
+        return {"deals": 0, "hit_rate": None, "avg_return_pct": None, "median_return_pct": None,
+                "worst_return_pct": None, "avg_market_return_pct": None, "avg_discount_pct": None, "total_pnl": 0.0}
+    return {
+        "deals": int(len(returns)),
+        "hit_rate": round(float((returns > 0).mean()) * 100, 1),
+        "avg_return_pct": round(float(returns.mean()), 2),
+        "median_return_pct": round(float(np.median(returns)), 2),
+        "worst_return_pct": round(float(returns.min()), 2),
+        "avg_market_return_pct": round(float(market_returns.mean()), 2),
+        "avg_discount_pct": round(float(discounts.mean()), 2),
+        "total_pnl": round(float(returns.sum()) / 100 * notional, 2)
+    }
+
+
+def run_backtest(
+    candles: dict[str, dict[str, list]],
+    tokens: Optional[dict[str, dict]] = None,
+    lock_periods=LOCK_PERIODS,
+    discount: Optional[float] = None,
+    stride: int = 1,
+    notional: float = 1000.0
+) -> list[dict]:
+    """
+    Replay the deterministic scorers over rolling windows and report deal outcomes per recommendation.
+
+    candles: {timeframe: {token_id: candles}}, the series each lock period's timeframe is built from
+    (the same series for every timeframe when backtesting local files). A timeframe whose series is
+    too short for the window and the lock (the cached 30-day series for daily candles) uses the
+    weekly timeframe's longer series at its own candle size instead
+    tokens: current token_data per token_id for the non-price scores (default: no-data defaults)
+    discount: fixed discount (%) for every deal; default suggest_discount() per deal, from the
+    risk score and the 7d/30d price moves at the window end as in /suggest-discount (a 0% 30d move
+    where the history is shorter than 30 days, as /suggest-discount does without CoinGecko's)
+    stride: evaluate every stride-th candle close
+    notional: USD paid per deal, for total_pnl
+    """
+    tokens = tokens or {}
+    views: dict[tuple, TimeframeWindows] = {}
+    reports = []
+
+    def windows(timeframe: str, source: str) -> TimeframeWindows:
+        spec = TIMEFRAMES[timeframe]
+        key = (id(candles[source]), spec.bucket_ms, spec.origin_ms)
+        if key not in views:
+            views[key] = TimeframeWindows(candles[source], spec.bucket_ms, spec.origin_ms, stride)
+        return views[key]
+
+    for lock_period in lock_periods:
+        timeframe = timeframe_for_lock_period(lock_period)
+        view = windows(timeframe, timeframe)
+        if not view.covers(lock_period):
+            view = windows(timeframe, "1w")
+
+        # Snapshot columns per token, broadcast over the windows; price-derived columns per window
+        columns = {
+            name: values[:, None]
+            for name, values in token_columns([tokens.get(t, {}) for t in view.token_ids]).items()
+        }
+        columns["volatility"] = round1(view.volatility)
+        columns["price_change_7d"] = view.price_change_7d
+
+        risk = risk_scores(columns, lock_period)
+        overall = overall_scores(
+            view.technical, risk, sentiment_scores(columns), on_chain_scores(columns), fundamental_scores(columns)
+        )
+        rating = recommendations(overall)
+
+        if discount is None:
+            change_30d = np.nan_to_num(np.abs(view.price_change_30d), nan=0.0)
+            volatility_proxy = (np.abs(view.price_change_7d) * 2 + change_30d) / 2
+            discounts = suggested_discounts(lock_period, risk, volatility_proxy)
+        else:
+            discounts = np.full(overall.shape, float(discount))
+
+        market_returns = view.forward_returns(lock_period)
+        # Bought at (1 - discount) of the market price, sold at the market price at unlock
+        with np.errstate(invalid="ignore"):
+            returns = ((1 + market_returns / 100) / (1 - discounts / 100) - 1) * 100
+
+        # Deals with a full indicator window, the 7d price move and an unlock price
+        valid = view.complete & ~np.isnan(returns) & ~np.isnan(view.price_change_7d)
+        with_30d = valid & ~np.isnan(view.price_change_30d)
+
+        buckets = {}
+        for label in RECOMMENDATIONS:
+            mask = valid & (rating == label)
+            buckets[label] = summarize(returns[mask], market_returns[mask], discounts[mask], notional)
+
+        reports.append({
+            "lock_period": lock_period,
+            "timeframe": timeframe,
+            "candle_hours": round(view.step / 3_600_000, 2),
+            "tokens": int(valid.any(axis=1).sum()),
+            "tokens_with_candles": len(view.token_ids),
+            "price_change_30d_pct": round(float(with_30d.sum() / valid.sum()) * 100, 1) if valid.any() else None,
+            "discount": discount,
+            "all": summarize(returns[valid], market_returns[valid], discounts[valid], notional),
+            "buckets": buckets
+        })
+    return reports
+
+
+def backtest_sources(path: Optional[str] = BACKTEST_CANDLES_PATH) -> dict[str, dict[str, list]]:
+    """Candles per timeframe: the local candle files when a path is set, otherwise the cached series"""
+    if path:
+        candles = load_candle_files(path)
+        return {timeframe: candles for timeframe in TIMEFRAMES}
+    return cached_candles()
+
+
+if __name__ == "__main__":
+    # python -m services.backtest candles/ --tokens tokens.json   (from backend/)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backtest the deterministic scores on local candle files")
+    parser.add_argument("candles", help="JSON file {token_id: candles} or directory of <token_id>.json files")
+    parser.add_argument("--tokens", help="JSON list of token_data dicts (e.g. saved /api/tokens/{id} responses)")
+    parser.add_argument("--lock-period", type=int, action="append", help="Lock period in weeks (repeatable, default all)")
+    parser.add_argument("--discount", type=float, help="Fixed discount %% (default: suggested per deal)")
+    parser.add_argument("--stride", type=int, default=1)
+    args = parser.parse_args()
+
+    snapshot = {}
+    if args.tokens:
+        with open(args.tokens) as f:
+            snapshot = {token["id"]: token for token in json.load(f)}
+
+    results = run_backtest(
+        backtest_sources(args.candles), snapshot, args.lock_period or LOCK_PERIODS, args.discount, args.stride
+    )
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,203 @@
+import asyncio
+import os
+from typing import AsyncIterator
+
+from .ai_scoring import generate_fallback_analysis_internal
+from .analysis_cache import get_or_analyze
+from .batch_scoring import token_columns, risk_components, sentiment_scores, on_chain_scores, \
+    fundamental_scores, timeframe_technicals, overall_scores, round1
+from .candle_store import candle_store
+from .coingecko import get_many_token_data, get_token_data, queue_wait, \
+    RATE_LIMIT_PER_MINUTE, MAX_QUEUE_WAIT
+from .risk_analysis import risk_details
+from .timeframes import timeframe_cache, timeframe_for_lock_period, closes_per_year
+from .trending import ensure_trending_snapshot
+
+# Per-token budget; a token that takes longer is reported as an error
+BATCH_ITEM_TIMEOUT = float(os.getenv("BATCH_ANALYSIS_ITEM_TIMEOUT", "30"))  # seconds
+# CoinGecko calls per uncached token: details, 30-day and 365-day OHLC (market rows are batched)
+CALLS_PER_TOKEN = 3
+# Tokens fetched at once per batch. The default keeps every in-flight call within the
+# rate limiter's queue budget, so calls wait for a slot instead of being rejected
+BATCH_CONCURRENCY = int(os.getenv(
+    "BATCH_ANALYSIS_CONCURRENCY",
+    str(max(1, int(RATE_LIMIT_PER_MINUTE / 60 * MAX_QUEUE_WAIT / CALLS_PER_TOKEN)))
+))
+
+batch_stats = {"batches": 0, "tokens": 0, "degraded": 0, "failed": 0, "timeouts": 0}
+
+
+def batch_missing_inputs(token_data: dict, has_ohlc: bool) -> list[str]:
+    """missing_inputs() of the sweep for a token scored in a batch"""
+    missing = [] if has_ohlc else ["ohlc"]
+    if token_data.get('fundamentals_unavailable'):
+        missing.append("fundamentals")
+    return missing
+
+
+def score_fetched(fetched: list[dict], lock_periods: list[int], trending) -> list[dict]:
+    """
+    Deterministic analyses for fetched tokens in one vectorized pass (the same
+    scores as analyze_lock_periods, one token at a time)
+    """
+    tokens = [item["token_data"] for item in fetched]
+    closes = {
+        timeframe: [[candle[4] for candle in item["views"][timeframe][-31:]] for item in fetched]
+        for timeframe in fetched[0]["views"]
+    }
+    periods = {
+        timeframe: [closes_per_year(item["views"][timeframe], timeframe) for item in fetched]
+        for timeframe in closes
+    }
+    technical, volatility, has_ohlc = timeframe_technicals(closes, periods)
+
+    columns = token_columns(tokens, [t["id"] in trending for t in tokens])
+    sentiment = sentiment_scores(columns)
+    on_chain = on_chain_scores(columns)
+    fundamental = fundamental_scores(columns)
+
+    periods = {}
+    for lock_period in lock_periods:
+        timeframe = timeframe_for_lock_period(lock_period)
+        risk = risk_components({**columns, "volatility": volatility[timeframe]}, lock_period)
+        risk_score = round1(risk["score"])
+        periods[lock_period] = {
+            "timeframe": timeframe,
+            "risk": risk,
+            "risk_score": risk_score,
+            "overall": overall_scores(technical[timeframe], risk_score, sentiment, on_chain, fundamental)
+        }
+
+    results = []
+    for i, item in enumerate(fetched):
+        token_data = item["token_data"]
+        analyses = []
+        for lock_period, period in periods.items():
+            timeframe = period["timeframe"]
+            risk = period["risk"]
+            token_volatility = float(volatility[timeframe][i])
+            analysis = generate_fallback_analysis_internal(
+                token_data, lock_period,
+                {"score": float(technical[timeframe][i])},
+                {
+                    "score": float(period["risk_score"][i]),
+                    "details": risk_details(
+                        float(risk["liquidity"][i]), float(risk["volatility"][i]), float(risk["dilution"][i]),
+                        token_volatility, float(risk["score"][i])
+                    )
+                },
+                {"score": float(sentiment[i])}, {"score": float(on_chain[i])}, {"score": float(fundamental[i])},
+                float(period["overall"][i]), token_volatility
+            )
+            analysis["price_history_1y"] = item["price_history_1y"]
+            analyses.append((lock_period, {"lock_period": lock_period, **analysis}))
+
+        has_all_ohlc = all(has_ohlc[timeframe_for_lock_period(lp)][i] for lp in lock_periods)
+        results.append(analyzed(token_data, analyses, batch_missing_inputs(token_data, has_all_ohlc)))
+    return results
+
+
+def analyzed(token_data: dict, analyses: list, missing: list[str]) -> dict:
+    """Result for an analyzed token: "degraded" when some inputs could not be fetched"""
+    if missing:
+        batch_stats["degraded"] += 1
+    return {
+        "token_id": token_data["id"],
+        "status": "degraded" if missing else "ok",
+        "token_data": token_data,
+        "analyses": analyses,
+        "missing_inputs": missing
+    }
+
+
+async def analyze_batch(
+    token_ids: list[str], lock_periods: list[int], include_narrative: bool = False
+) -> AsyncIterator[dict]:
+    """
+    Analyze many tokens, yielding one result per token as soon as it completes:
+    {"token_id", "status": "ok"|"degraded"|"not_found"|"error", "token_data",
+     "analyses": [(lock_period, analysis)], "missing_inputs"}
+
+    Market data for all tokens is fetched up front in batched /coins/markets calls
+    (RateLimitError propagates before anything is yielded). Details and OHLC are then
+    fetched per token, at most BATCH_CONCURRENCY tokens at a time, waiting for rate
+    limiter slots up to BATCH_ITEM_TIMEOUT. Tokens whose inputs arrived together are
+    scored in one vectorized pass; with include_narrative each token goes through the
+    analysis cache instead. "degraded" results were scored without some inputs
+    (listed in missing_inputs); "not_found" means CoinGecko does not list the token.
+    """
+    unique_ids = list(dict.fromkeys(token_ids))
+    lock_periods = sorted(set(lock_periods))
+    market = await get_many_token_data(unique_ids, include_fundamentals=False)
+    trending = await ensure_trending_snapshot()
+
+    batch_stats["batches"] += 1
+    batch_stats["tokens"] += len(unique_ids)
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    # The weekly view doubles as the fallback of the shorter timeframes
+    timeframes = list(dict.fromkeys([timeframe_for_lock_period(lp) for lp in lock_periods] + ["1w"]))
+
+    async def fetch_one(token_id: str) -> dict:
+        token_data = await get_token_data(token_id)  # Market data is cached; adds details
+        if not token_data:
+            return {"token_id": token_id, "status": "not_found"}
+
+        if include_narrative:
+            analyses = await asyncio.gather(*(get_or_analyze(token_data, lp) for lp in lock_periods))
+            missing = list(dict.fromkeys(name for a in analyses for name in a.get("missing_inputs", [])))
+            return analyzed(token_data, list(zip(lock_periods, analyses)), missing)
+
+        views = await asyncio.gather(*(timeframe_cache.get(token_id, tf) for tf in timeframes))
+        history = candle_store.peek(token_id, "365") or []
+        return {
+            "token_id": token_id,
+            "status": "fetched",
+            "token_data": token_data,
+            "views": dict(zip(timeframes, views)),
+            "price_history_1y": [candle[4] for candle in history]
+        }
+
+    async def guarded(token_id: str) -> dict:
+        async with semaphore:
+            queue_wait.set(BATCH_ITEM_TIMEOUT)  # Task-local: wait for a slot rather than fail
+            try:
+                return await asyncio.wait_for(fetch_one(token_id), BATCH_ITEM_TIMEOUT)
+            except asyncio.TimeoutError:
+                batch_stats["timeouts"] += 1
+                error = f"Timed out after {BATCH_ITEM_TIMEOUT:.0f}s"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+        batch_stats["failed"] += 1
+        return {"token_id": token_id, "status": "error", "error": error}
+
+    pending = []
+    for token_id in unique_ids:
+        row = market.get(token_id)
+        if isinstance(row, Exception):
+            batch_stats["failed"] += 1
+            yield {"token_id": token_id, "status": "error", "error": str(row) or type(row).__name__}
+        elif row is None:
+            yield {"token_id": token_id, "status": "not_found"}
+        else:
+            pending.append(asyncio.ensure_future(guarded(token_id)))
+
+    try:
+        waiting = set(pending)
+        while waiting:
+            done, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            results = [task.result() for task in done]
+            fetched = [r for r in results if r["status"] == "fetched"]
+            for result in results:
+                if result["status"] != "fetched":
+                    yield result
+            if fetched:
+                for result in score_fetched(fetched, lock_periods, trending):
+                    yield result
+    finally:
+        # Client went away: stop the remaining work
+        for task in pending:
+            task.cancel()
+
+
+def get_batch_stats() -> dict:
+    return dict(batch_stats)
@@ -0,0 +1,331 @@
+"""
+Columnar versions of the deterministic scorers, for scoring many tokens at once.
+
+Each function mirrors the if/elif chains of the per-token scorer classes with
+vectorized threshold lookups and performs the float operations in the same
+order, so results are identical to RiskScorer, SentimentScorer, OnChainScorer,
+FundamentalScorer, TechnicalScorer.get_technical_score and calculate_overall_score.
+"""
+import numpy as np
+
+# Column name -> token_data field (None/missing becomes NaN)
+TOKEN_FIELDS = {
+    "market_cap": "market_cap",
+    "total_volume": "total_volume",
+    "fully_diluted_valuation": "fully_diluted_valuation",
+    "total_supply": "total_supply",
+    "circulating_supply": "circulating_supply",
+    "market_cap_rank": "market_cap_rank",
+    "price_change_7d": "price_change_percentage_7d",
+}
+
+
+def round1(values: np.ndarray) -> np.ndarray:
+    """round(v, 1) for every element, identical to Python's round()"""
+    # v * 10 as v * 8 + v * 2: both products are exact and TwoSum recovers the
+    # rounding error of the sum, so scaled + err == v * 10 exactly
+    eight, two = values * 8, values * 2
+    scaled = eight + two
+    b = scaled - eight
+    err = (eight - (scaled - b)) + (two - b)
+
+    # scaled is the nearest double to v * 10, so it can only land on the wrong side
+    # of a .5 boundary by landing exactly on it; the sign of err then decides
+    floor = np.floor(scaled)
+    on_half = (scaled - floor) == 0.5
+    up = np.where(err == 0, floor % 2 == 1, err > 0)  # Exact ties: half to even
+    digits = np.where(on_half, floor + up, np.round(scaled))
+    return digits / 10
+
+
+def _column(tokens: list[dict], field: str) -> np.ndarray:
+    return np.array([t.get(field) for t in tokens], dtype=np.float64)  # None -> nan
+
+
+def _or0(values: np.ndarray) -> np.ndarray:
+    """`value or 0` for a column"""
+    return np.nan_to_num(values, nan=0.0)
+
+
+def _truthy(values: np.ndarray) -> np.ndarray:
+    return ~np.isnan(values) & (values != 0)
+
+
+def token_columns(tokens: list[dict], is_trending=None, volatility=None) -> dict[str, np.ndarray]:
+    """
+    Columns for score_tokens from token_data dicts (as returned by get_token_data).
+    is_trending: per-token flags (default all False)
+    volatility: annualized volatility per token as in technical indicators (default 50.0, as in analyze_token)
+    """
+    n = len(tokens)
+    columns = {name: _column(tokens, field) for name, field in TOKEN_FIELDS.items()}
+
+    dev = [t.get("developer_data") or {} for t in tokens]
+    comm = [t.get("community_data") or {} for t in tokens]
+    columns["has_developer_data"] = np.array([bool(d) for d in dev])
+    columns["commits_4w"] = np.array([d.get("commit_count_4_weeks") or 0 for d in dev], dtype=np.float64)
+    columns["stars"] = np.array([d.get("stars") or 0 for d in dev], dtype=np.float64)
+    columns["has_community_data"] = np.array([bool(c) for c in comm])
+    columns["twitter_followers"] = np.array([c.get("twitter_followers") or 0 for c in comm], dtype=np.float64)
+    columns["telegram_users"] = np.array([c.get("telegram_channel_user_count") or 0 for c in comm], dtype=np.float64)
+
+    columns["is_trending"] = np.zeros(n, dtype=bool) if is_trending is None else np.asarray(is_trending, dtype=bool)
+    columns["volatility"] = np.full(n, 50.0) if volatility is None else np.asarray(volatility, dtype=np.float64)
+    return columns
+
+
+def risk_scores(columns: dict, lock_period) -> np.ndarray:
+    """RiskScorer.get_risk_score()['score']; lock_period may be a scalar or an array"""
+    return round1(risk_components(columns, lock_period)["score"])
+
+
+def risk_components(columns: dict, lock_period) -> dict[str, np.ndarray]:
+    """
+    RiskScorer's liquidity, volatility and dilution points and the unrounded
+    capped score (the inputs of risk_details)
+    """
+    mcap = _or0(columns["market_cap"])
+    volume = _or0(columns["total_volume"])
+    volatility = columns["volatility"]
+
+    # Liquidity (Volume/MCap)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = volume / mcap
+    liq = np.select(
+        [mcap <= 0, ratio < 0.01, ratio < 0.05, ratio < 0.10],
+        [3.5, 3.5, 2.0, 1.0],
+        0.0
+    )
+
+    # Volatility
+    vol = np.select(
+        [volatility > 150, volatility > 100, volatility > 60, volatility > 30],
+        [3.5, 2.5, 1.5, 0.5],
+        0.0
+    )
+
+    # Dilution (FDV/MCap, falling back to total/circulating supply)
+    fdv = columns["fully_diluted_valuation"]
+    total = columns["total_supply"]
+    circ = columns["circulating_supply"]
+    use_fdv = _truthy(fdv) & (mcap != 0)
+    use_supply = ~use_fdv & _truthy(total) & _truthy(circ) & (circ > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dilution_ratio = np.where(use_fdv, fdv / mcap, total / circ)
+    dil = np.select(
+        [~use_fdv & ~use_supply, dilution_ratio > 20, dilution_ratio > 5, dilution_ratio > 2],
+        [1.0, 2.0, 1.5, 1.0],
+        0.0
+    )
+
+    time_multiplier = 1.0 + (np.asarray(lock_period, dtype=np.float64) * 0.025)
+    score = (liq + vol + dil) * time_multiplier
+    return {"liquidity": liq, "volatility": vol, "dilution": dil, "score": np.minimum(10.0, score)}
+
+
+def sentiment_scores(columns: dict) -> np.ndarray:
+    """SentimentScorer.get_sentiment_score()['score']"""
+    price_7d = _or0(columns["price_change_7d"])
+    rank = columns["market_cap_rank"]
+    has_rank = _truthy(rank)
+
+    momentum = np.select(
+        [price_7d > 10, price_7d > 0, price_7d < -15, price_7d < -5],
+        [1.5, 0.5, -2.0, -1.0],
+        0.0
+    )
+    awareness = np.select([has_rank & (rank <= 50), has_rank & (rank > 200)], [1.0, -0.5], 0.0)
+    trending = np.where(columns["is_trending"], 1.5, 0.0)
+
+    sentiment = 5.0 + momentum + awareness + trending
+    return round1(np.clip(sentiment, 0, 10))
+
+
+def on_chain_scores(columns: dict) -> np.ndarray:
+    """OnChainScorer.get_on_chain_score()['score']"""
+    mcap = _or0(columns["market_cap"])
+    volume = _or0(columns["total_volume"])
+    rank = columns["market_cap_rank"]
+    has_rank = _truthy(rank)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = volume / mcap
+    activity = np.select(
+        [mcap <= 0, ratio > 0.15, ratio > 0.05, ratio < 0.01],
+        [np.where(volume > 100_000, 0.5, -1.0), 2.0, 1.0, -2.0],
+        0.0
+    )
+    distribution = np.select([has_rank & (rank <= 100), has_rank & (rank > 500)], [1.0, -1.0], 0.0)
+
+    score = 5.0 + activity + distribution
+    return round1(np.clip(score, 0, 10))
+
+
+def fundamental_scores(columns: dict) -> np.ndarray:
+    """FundamentalScorer.get_fundamental_score()['score']"""
+    commits = columns["commits_4w"]
+    stars = columns["stars"]
+    dev = np.select([commits > 100, commits > 30, commits > 0], [5.0, 3.0, 1.0], 0.0)
+    dev = dev + np.select([stars > 5000, stars > 1000, stars > 100], [5.0, 3.0, 1.0], 0.0)
+    dev = np.where(columns["has_developer_data"], np.minimum(10.0, dev), 5.0)
+
+    twitter = columns["twitter_followers"]
+    telegram = columns["telegram_users"]
+    comm = np.select(
+        [twitter > 500_000, twitter > 100_000, twitter > 10_000, twitter > 1_000],
+        [6.0, 4.0, 2.0, 1.0],
+        -2.0
+    )
+    comm = comm + np.select([telegram > 10_000, telegram > 2_000], [4.0, 2.0], 0.0)
+    comm = np.where(columns["has_community_data"], np.clip(comm, 0.0, 10.0), 5.0)
+
+    rank = columns["market_cap_rank"]
+    market = np.select([rank <= 20, rank <= 100, rank <= 500], [9.0, 7.0, 5.0], 3.0)
+    market = market + np.where(columns["is_trending"], 2.0, 0.0)
+    market = np.where(_truthy(rank), np.minimum(10.0, market), 2.0)
+
+    return round1((dev * 0.4) + (comm * 0.3) + (market * 0.3))
+
+
+def technical_scores(rsi: np.ndarray, volatility: np.ndarray, sma_deviation: np.ndarray) -> np.ndarray:
+    """
+    TechnicalScorer.get_technical_score()['score'] from unrounded indicators
+    (calculate_rsi(14), calculate_volatility(30), calculate_sma_deviation(20))
+    """
+    rsi_points = np.select([rsi < 30, rsi > 70], [2.0, -1.0], 0.5)
+    vol_points = np.select(
+        [volatility > 100, volatility > 60, volatility < 20],
+        [-2.0, -1.0, -1.0],
+        1.5
+    )
+    trend_points = np.where(sma_deviation > 0, 1.0, -1.0)
+    extended = np.where(sma_deviation > 20, -0.5, 0.0)
+
+    score = 5.0 + rsi_points + vol_points + trend_points + extended
+    return round1(np.clip(score, 0, 10))
+
+
+def technical_indicators(closes: list, periods_per_year: float = 365) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Unrounded (rsi, volatility, sma_deviation) per token, as TechnicalScorer.calculate_rsi(14),
+    calculate_volatility(30) and calculate_sma_deviation(20), from each token's close prices
+    (oldest first). Only the last 31 closes of each series are used.
+    """
+    n = len(closes)
+    width = 31  # 30 log returns
+    window = np.full((n, width), np.nan)
+    lengths = np.zeros(n, dtype=np.int64)
+    for i, series in enumerate(closes):
+        tail = np.asarray(series[-width:], dtype=np.float64)
+        lengths[i] = len(series)
+        if len(tail):
+            window[i, width - len(tail):] = tail
+
+    return window_indicators(window, lengths, periods_per_year)
+
+
+def window_indicators(window: np.ndarray, lengths, periods_per_year: float = 365) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    technical_indicators() for windows of the last 31 closes along the last axis
+    (NaN-padded on the left for shorter series); lengths: full series lengths,
+    broadcastable to window.shape[:-1]
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # RSI: average gain/loss over the last 14 deltas
+        deltas = np.diff(window[..., -15:], axis=-1)
+        avg_gain = np.maximum(deltas, 0.0).sum(axis=-1) / 14
+        avg_loss = np.maximum(-deltas, 0.0).sum(axis=-1) / 14
+        rsi = np.select([lengths < 15, avg_loss == 0], [50.0, 100.0], 100 - (100 / (1 + avg_gain / avg_loss)))
+
+        # Volatility: population std of the last 30 log returns (29 when there are exactly 30 closes)
+        returns = np.log(window[..., 1:] / window[..., :-1])
+        valid = ~np.isnan(returns)
+        count = valid.sum(axis=-1)
+        mean = np.where(valid, returns, 0.0).sum(axis=-1) / count
+        deviations = np.where(valid, returns - mean[..., None], 0.0)
+        std_dev = np.sqrt((deviations * deviations).sum(axis=-1) / count)
+        volatility = np.where(lengths < 30, 0.0, std_dev * np.sqrt(periods_per_year) * 100)
+
+        # SMA20 deviation
+        sma = window[..., -20:].sum(axis=-1) / 20
+        sma_deviation = np.where(lengths < 20, 0.0, ((window[..., -1] - sma) / sma) * 100)
+
+    return rsi, volatility, sma_deviation
+
+
+def timeframe_technicals(
+    closes: dict[str, list], periods_per_year: dict, fallback: str = "1w"
+) -> tuple[dict, dict, dict]:
+    """
+    Technical score, rounded volatility and has-OHLC flags per timeframe, as the
+    analysis pipeline's technical stage computes them: closes of each timeframe
+    per token (oldest first, empty without candles) and closes per year per
+    timeframe (a scalar, or one per token); a token without candles in
+    a timeframe uses the `fallback` timeframe, and neutral defaults (5.0, 50.0)
+    without either
+    """
+    technical, volatility, has_ohlc = {}, {}, {}
+    for timeframe, series in closes.items():
+        periods = np.asarray(periods_per_year[timeframe], dtype=np.float64)
+        rsi, raw_volatility, sma_deviation = technical_indicators(series, periods)
+        technical[timeframe] = technical_scores(rsi, raw_volatility, sma_deviation)
+        volatility[timeframe] = round1(raw_volatility)
+        has_ohlc[timeframe] = np.array([len(c) > 0 for c in series], dtype=bool)
+
+    if fallback in closes:
+        for timeframe in closes:
+            if timeframe != fallback:
+                substitute = ~has_ohlc[timeframe] & has_ohlc[fallback]
+                technical[timeframe] = np.where(substitute, technical[fallback], technical[timeframe])
+                volatility[timeframe] = np.where(substitute, volatility[fallback], volatility[timeframe])
+                has_ohlc[timeframe] = has_ohlc[timeframe] | substitute
+    for timeframe in closes:
+        technical[timeframe] = np.where(has_ohlc[timeframe], technical[timeframe], 5.0)
+        volatility[timeframe] = np.where(has_ohlc[timeframe], volatility[timeframe], 50.0)
+    return technical, volatility, has_ohlc
+
+
+def overall_scores(tech, risk, sentiment, on_chain, fundamental) -> np.ndarray:
+    """calculate_overall_score for arrays of (rounded) category scores"""
+    overall = (
+        tech * 0.30 +
+        (10 - risk) * 0.30 +
+        sentiment * 0.20 +
+        on_chain * 0.15 +
+        fundamental * 0.05
+    )
+    return round1(np.clip(overall, 0, 10))
+
+
+def score_tokens(columns: dict, lock_period, technical=None) -> dict[str, np.ndarray]:
+    """
+    All category scores and the overall score for N tokens.
+    technical: per-token technical scores (default 5.0, the no-OHLC score)
+    """
+    n = len(columns["market_cap"])
+    tech = np.full(n, 5.0) if technical is None else np.asarray(technical, dtype=np.float64)
+    risk = risk_scores(columns, lock_period)
+    sentiment = sentiment_scores(columns)
+    on_chain = on_chain_scores(columns)
+    fundamental = fundamental_scores(columns)
+
+    return {
+        "technical": tech,
+        "risk": risk,
+        "sentiment": sentiment,
+        "on_chain": on_chain,
+        "fundamental": fundamental,
+        "overall": overall_scores(tech, risk, sentiment, on_chain, fundamental)
+    }
+
+
+RECOMMENDATIONS = ("STRONG_BUY", "BUY", "HOLD", "HIGH_RISK", "EXTREME_RISK")
+
+
+def recommendations(overall: np.ndarray) -> np.ndarray:
+    """Recommendation per overall score (thresholds of generate_fallback_analysis_internal)"""
+    return np.select(
+        [overall >= 7.5, overall >= 6.0, overall >= 4.5, overall >= 3.0],
+        RECOMMENDATIONS[:4],
+        RECOMMENDATIONS[4]
+    )
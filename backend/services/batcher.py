@@ -0,0 +1,104 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+
+class MicroBatcher:
+    """
+    Micro-batching loader.
+    Keys requested within a short window are collected and resolved with a
+    single bulk call; each waiting caller then receives its own result.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch_many: Callable[[list[str]], Awaitable[dict[str, Any]]],
+        window: float = 0.015,
+        max_batch: int = 250
+    ):
+        """
+        fetch_many: bulk loader returning { key: result } for the keys it found
+        window: seconds to wait for more keys after the first one arrives
+        max_batch: flush immediately once this many distinct keys are pending
+        """
+        self.name = name
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: dict[str, list[asyncio.Future]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.keys_loaded = 0
+        self.largest_batch = 0
+
+    async def load(self, key: str) -> Any:
+        """Queue a key for the next batch and wait for its result (None if missing)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(key, []).append(future)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(lambda t: self._done(t, batch))
+
+    def _done(self, task: asyncio.Task, batch: dict[str, list[asyncio.Future]]):
+        """Forget a finished batch; a failure that escaped _run is logged and passed to its callers"""
+        self._tasks.discard(task)
+        error = None if task.cancelled() else task.exception()
+        if error is not None:
+            print(f"Batch '{self.name}' failed: {error}")
+        elif not task.cancelled():
+            return
+
+        for futures in batch.values():
+            for future in futures:
+                if future.done():
+                    continue
+                if error is None:
+                    future.cancel()
+                else:
+                    future.set_exception(error)
+
+    async def _run(self, batch: dict[str, list[asyncio.Future]]):
+        keys = list(batch)
+        self.batches += 1
+        self.keys_loaded += len(keys)
+        self.largest_batch = max(self.largest_batch, len(keys))
+
+        try:
+            results = await self.fetch_many(keys)
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for key, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(results.get(key))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "keys_loaded": self.keys_loaded,
+            "largest_batch": self.largest_batch,
+            "pending": len(self._pending),
+            "in_flight": len(self._tasks)
+        }
@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with TTL and stale-while-revalidate.
+
+    Entry lifecycle by age:
+    - < ttl:                      FRESH   (serve as-is)
+    - < ttl + stale_ttl:          STALE   (serve, refresh in the background)
+    - < ttl + stale_if_error_ttl: EXPIRED (refetch; serve only if upstream fails)
+    - older:                      dropped
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        stale_if_error_ttl: float = 0.0
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stale_if_error_ttl = max(stale_ttl, stale_if_error_ttl)
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.stale_on_error = 0
+        self.evictions = 0
+
+    def lookup(self, key: Hashable) -> tuple[Optional[Any], Optional[str]]:
+        """Return (value, state); state is None on a miss"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, None
+
+        value, stored_at = entry
+        age = time.time() - stored_at
+
+        if age >= self.ttl + self.stale_if_error_ttl:
+            del self._data[key]
+            self.misses += 1
+            return None, None
+
+        self._data.move_to_end(key)
+
+        if age < self.ttl:
+            self.hits += 1
+            return value, FRESH
+        if age < self.ttl + self.stale_ttl:
+            self.stale_hits += 1
+            return value, STALE
+
+        self.misses += 1
+        return value, EXPIRED
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Value if fresh, else None"""
+        value, state = self.lookup(key)
+        return value if state == FRESH else None
+
+    def set(self, key: Hashable, value: Any, stored_at: Optional[float] = None):
+        self._data[key] = (value, stored_at if stored_at is not None else time.time())
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def serve_stale_on_error(self, value: Any) -> Any:
+        """Record that an old value was served because upstream failed"""
+        self.stale_on_error += 1
+        return value
+
+    def items(self) -> list[tuple[Hashable, Any, float]]:
+        """(key, value, stored_at) for every entry, oldest first"""
+        return [(key, value, stored_at) for key, (value, stored_at) in self._data.items()]
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "stale_on_error": self.stale_on_error,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0
+        }
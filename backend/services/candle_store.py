@@ -0,0 +1,222 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from .coingecko import get_coin_ohlc
+from .indicators import IndicatorState
+from .singleflight import SingleFlight
+
+# How often a cached series is topped up with the newest candles (seconds)
+TAIL_REFRESH_INTERVAL = float(os.getenv("CANDLE_TAIL_REFRESH_INTERVAL", "300"))
+# How often the whole series is re-downloaded to heal gaps (seconds)
+FULL_REFRESH_INTERVAL = float(os.getenv("CANDLE_FULL_REFRESH_INTERVAL", "86400"))
+MAX_SERIES = int(os.getenv("CANDLE_STORE_MAX_SERIES", "500"))
+
+# CoinGecko OHLC granularity depends on `days` (1-2: 30m, 3-30: 4h, 31+: 4d).
+# The tail request is the shortest `days` value with the same granularity.
+TAIL_DAYS = {
+    "1": "1",
+    "7": "7",
+    "14": "7",
+    "30": "7",
+    "90": "90",
+    "180": "90",
+    "365": "90",
+    "max": "90",
+}
+
+DAY_MS = 86_400_000
+
+
+def candle_interval_ms(days: str) -> int:
+    """CoinGecko OHLC candle size for a `days` value"""
+    if days != "max" and int(days) <= 2:
+        return 30 * 60_000
+    if days != "max" and int(days) <= 30:
+        return 4 * 3_600_000
+    return 4 * DAY_MS
+
+
+def periods_per_year(days: str) -> float:
+    """Candles per year at the series' granularity (for annualizing volatility)"""
+    return 365 * DAY_MS / candle_interval_ms(days)
+
+
+def track_indicators(
+    candles: list[list[float]], previous: Optional[IndicatorState] = None, periods: float = 365
+) -> Optional[IndicatorState]:
+    """Indicator state for a series, advanced from `previous` when possible"""
+    try:
+        if previous is not None and previous.periods_per_year == periods:
+            return previous.sync(candles)
+        return IndicatorState.from_candles(candles, periods)
+    except ValueError:
+        return None  # Non-positive prices: consumers fall back to TechnicalScorer
+
+
+class CandleSeries:
+    def __init__(
+        self, candles: list[list[float]], now: float,
+        indicators: Optional[IndicatorState] = None, periods: float = 365
+    ):
+        self.candles = candles
+        self.refreshed_at = now
+        self.full_refreshed_at = now
+        # Kept in step with the candles, so technical indicators never rescan the history
+        self.indicators = track_indicators(candles, indicators, periods)
+
+
+def merge_candles(
+    existing: list[list[float]], new: list[list[float]], days: str
+) -> Optional[list[list[float]]]:
+    """
+    Merge candles by timestamp (new candles replace existing ones with the same
+    timestamp) and trim to the `days` horizon.
+    Returns None if the tail does not line up with the existing candle grid.
+    """
+    if not existing:
+        return sorted(new, key=lambda c: c[0])
+    if not new:
+        return existing
+
+    last_ts = existing[-1][0]
+    known = {c[0] for c in existing}
+    overlapping = [c for c in new if c[0] <= last_ts]
+    if overlapping and not any(c[0] in known for c in overlapping):
+        return None  # Different candle boundaries: needs a full refetch
+
+    by_ts = {c[0]: c for c in existing}
+    for candle in new:
+        by_ts[candle[0]] = candle
+
+    merged = [by_ts[ts] for ts in sorted(by_ts)]
+    if days != "max":
+        cutoff = merged[-1][0] - int(days) * DAY_MS
+        merged = [c for c in merged if c[0] >= cutoff]
+    return merged
+
+
+class CandleStore:
+    """
+    Per-token in-memory OHLC series.
+    The first request downloads the full history; later refreshes only fetch
+    the short tail and merge it in by timestamp.
+    """
+
+    def __init__(self, max_series: int = MAX_SERIES):
+        self.max_series = max_series
+        self._series: OrderedDict[tuple[str, str], CandleSeries] = OrderedDict()
+        self._flight = SingleFlight("candles")
+
+        # Metrics
+        self.hits = 0
+        self.full_fetches = 0
+        self.tail_fetches = 0
+        self.misaligned = 0
+        self.evictions = 0
+
+    async def get_candles(self, token_id: str, days: str = "365") -> list[list[float]]:
+        """Cached [timestamp, open, high, low, close] series, refreshed incrementally"""
+        key = (token_id, days)
+        series = self._series.get(key)
+
+        if series is not None:
+            self._series.move_to_end(key)
+            if time.time() - series.refreshed_at < TAIL_REFRESH_INTERVAL:
+                self.hits += 1
+                return series.candles
+
+        return await self._flight.do(key, lambda: self._refresh(token_id, days))
+
+    def peek(self, token_id: str, days: str = "365") -> Optional[list[list[float]]]:
+        """Cached series without any network I/O (None if not cached)"""
+        series = self._series.get((token_id, days))
+        return series.candles if series is not None else None
+
+    def indicators(
+        self, token_id: str, days: str = "365", candles: Optional[list[list[float]]] = None
+    ) -> Optional[IndicatorState]:
+        """
+        Incremental indicator state of a cached series (None if not cached, or if
+        `candles` is given and is not the cached series)
+        """
+        series = self._series.get((token_id, days))
+        if series is None or (candles is not None and series.candles is not candles):
+            return None
+        return series.indicators
+
+    def put(
+        self,
+        token_id: str,
+        days: str,
+        candles: list[list[float]],
+        refreshed_at: Optional[float] = None,
+        full_refreshed_at: Optional[float] = None,
+        indicators: Optional[IndicatorState] = None
+    ):
+        now = refreshed_at if refreshed_at is not None else time.time()
+        series = CandleSeries(candles, now, indicators, periods_per_year(days))
+        if full_refreshed_at is not None:
+            series.full_refreshed_at = full_refreshed_at
+        self._series[(token_id, days)] = series
+        self._series.move_to_end((token_id, days))
+
+        while len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+            self.evictions += 1
+
+    def items(self) -> list[tuple[str, str, CandleSeries]]:
+        """(token_id, days, series) for every cached series, least recently used first"""
+        return [(token_id, days, series) for (token_id, days), series in self._series.items()]
+
+    async def _refresh(self, token_id: str, days: str) -> list[list[float]]:
+        key = (token_id, days)
+        series = self._series.get(key)
+        now = time.time()
+
+        tail_days = TAIL_DAYS.get(days, days)
+        can_tail = (
+            series is not None
+            and series.candles
+            and tail_days != days
+            and now - series.full_refreshed_at < FULL_REFRESH_INTERVAL
+        )
+
+        if can_tail:
+            tail = await get_coin_ohlc(token_id, days=tail_days)
+            self.tail_fetches += 1
+            if not tail:
+                return series.candles  # Keep serving what we have
+
+            merged = merge_candles(series.candles, tail, days)
+            if merged is not None:
+                # Replace the list instead of mutating it: callers may hold the old one
+                series.candles = merged
+                # Applies only the new candles
+                series.indicators = track_indicators(merged, series.indicators, periods_per_year(days))
+                series.refreshed_at = now
+                return merged
+            self.misaligned += 1
+
+        candles = await get_coin_ohlc(token_id, days=days)
+        self.full_fetches += 1
+        if not candles:
+            return series.candles if series is not None else []
+
+        candles = sorted(candles, key=lambda c: c[0])
+        self.put(token_id, days, candles, now)
+        return candles
+
+    def stats(self) -> dict:
+        return {
+            "series": len(self._series),
+            "hits": self.hits,
+            "full_fetches": self.full_fetches,
+            "tail_fetches": self.tail_fetches,
+            "misaligned_tails": self.misaligned,
+            "evictions": self.evictions
+        }
+
+
+candle_store = CandleStore()
@@ -1,190 +1,626 @@
+import asyncio
+import os
+import random
 import httpx
 import time
+from contextvars import ContextVar
 from typing import Optional
 
+from .batcher import MicroBatcher
+from .cache import TTLCache, FRESH, STALE
+from .search_index import search_index
+from .singleflight import SingleFlight
+
 COINGECKO_BASE = "https://api.coingecko.com/api/v3"
 
-# Simple in-memory cache: { "token_id": (data, timestamp) }
-TOKEN_CACHE = {}
+# Shared connection pool (created and closed by the app lifespan)
+HTTP2_ENABLED = os.getenv("COINGECKO_HTTP2", "true").lower() == "true"
+MAX_CONNECTIONS = int(os.getenv("COINGECKO_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("COINGECKO_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("COINGECKO_KEEPALIVE_EXPIRY", "30"))
+CONNECT_TIMEOUT = float(os.getenv("COINGECKO_CONNECT_TIMEOUT", "5"))
+
+# Per-endpoint read timeouts (seconds)
+ENDPOINT_TIMEOUTS = {
+    "markets": float(os.getenv("COINGECKO_TIMEOUT_MARKETS", "10")),
+    "details": float(os.getenv("COINGECKO_TIMEOUT_DETAILS", "15")),
+    "search": float(os.getenv("COINGECKO_TIMEOUT_SEARCH", "5")),
+    "trending": float(os.getenv("COINGECKO_TIMEOUT_TRENDING", "5")),
+    "ohlc": float(os.getenv("COINGECKO_TIMEOUT_OHLC", "10")),
+    "coins_list": float(os.getenv("COINGECKO_TIMEOUT_COINS_LIST", "30")),
+}
+
+# Client-side pacing: requests per minute allowed by our CoinGecko plan
+RATE_LIMIT_PER_MINUTE = float(os.getenv("COINGECKO_RATE_LIMIT_PER_MINUTE", "30"))
+RATE_LIMIT_BURST = int(os.getenv("COINGECKO_RATE_LIMIT_BURST", "10"))
+MAX_QUEUE_WAIT = float(os.getenv("COINGECKO_MAX_QUEUE_WAIT", "20"))  # seconds
+
+# Retries for 429/5xx and transport errors (jittered exponential backoff)
+MAX_RETRIES = int(os.getenv("COINGECKO_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("COINGECKO_BACKOFF_BASE", "0.5"))  # seconds
+BACKOFF_MAX = float(os.getenv("COINGECKO_BACKOFF_MAX", "10"))  # seconds
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+http_client: Optional[httpx.AsyncClient] = None
+
+# Tiered caches (bounded LRU with stale-while-revalidate)
+# MARKET tier: price/volume fields that move every few seconds
 CACHE_TTL = 60  # seconds
+TOKEN_CACHE = TTLCache(
+    "market_data",
+    maxsize=int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "2000")),
+    ttl=CACHE_TTL,
+    stale_ttl=float(os.getenv("TOKEN_CACHE_STALE_TTL", "300")),
+    stale_if_error_ttl=float(os.getenv("TOKEN_CACHE_STALE_IF_ERROR_TTL", "3600"))
+)
+
+# FUNDAMENTALS tier: GitHub/community metrics that barely move within a day
+FUNDAMENTALS_TTL = float(os.getenv("FUNDAMENTALS_CACHE_TTL", "21600"))  # 6 hours
+FUNDAMENTALS_CACHE = TTLCache(
+    "fundamentals",
+    maxsize=int(os.getenv("FUNDAMENTALS_CACHE_MAX_ENTRIES", "2000")),
+    ttl=FUNDAMENTALS_TTL,
+    stale_ttl=FUNDAMENTALS_TTL * 3,
+    stale_if_error_ttl=FUNDAMENTALS_TTL * 12
+)
+
+# Market rows requested within the window share one /coins/markets?ids=a,b,c call
+BATCH_WINDOW_MS = float(os.getenv("COINGECKO_BATCH_WINDOW_MS", "15"))
+BATCH_MAX_IDS = int(os.getenv("COINGECKO_BATCH_MAX_IDS", "250"))
+
+# Concurrent identical requests share one upstream call, keyed by (endpoint, params)
+coingecko_flight = SingleFlight("coingecko")
 
 
-class RateLimitError(Exception):
+class UpstreamError(Exception):
+    """CoinGecko could not be reached or answered with an error (not "token does not exist")"""
     pass
 
 
+class RateLimitError(UpstreamError):
+    pass
+
+
+# Longest wait for a rate limiter slot in the current context (None: MAX_QUEUE_WAIT).
+# Bulk jobs whose concurrency is sized to the budget set this to wait instead of failing.
+queue_wait: ContextVar[Optional[float]] = ContextVar("coingecko_queue_wait", default=None)
+
+
+class TokenBucket:
+    """
+    Token-bucket limiter for outgoing CoinGecko requests.
+    Callers reserve a slot in FIFO order; when the bucket is empty they sleep
+    until their slot comes up instead of failing immediately.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_wait: float):
+        self.rate = rate_per_minute / 60.0  # tokens per second
+        self.capacity = float(burst)
+        self.max_wait = max_wait
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+        # Metrics
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, max_wait: Optional[float] = None):
+        """Wait for a token. Raises RateLimitError if the wait would exceed max_wait (default: the bucket's)."""
+        self._refill()
+        # Tokens may go negative: each queued caller holds a reservation
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if wait > (self.max_wait if max_wait is None else max_wait):
+            self.rejected += 1
+            raise RateLimitError("CoinGecko request queue is full")
+
+        self.tokens -= 1
+        self.acquired += 1
+        self.total_wait += wait
+        self.max_wait_seen = max(self.max_wait_seen, wait)
+
+        if wait > 0:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self.queue_depth -= 1
+
+    def pause(self, seconds: float):
+        """Push back every future reservation by at least `seconds` (e.g. after a 429)"""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_minute": round(self.rate * 60, 1),
+            "tokens_available": round(max(0.0, self.tokens), 2),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 1) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait_seen * 1000, 1)
+        }
+
+
+rate_limiter = TokenBucket(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST, MAX_QUEUE_WAIT)
+retry_stats = {"retries": 0, "retry_after_honoured": 0, "gave_up": 0}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared CoinGecko client, creating it on first use"""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.AsyncClient(
+            base_url=COINGECKO_BASE,
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(10.0, connect=CONNECT_TIMEOUT),
+            headers={"Accept": "application/json"}
+        )
+    return http_client
+
+
+async def close_http_client():
+    """Close the shared client and release pooled connections"""
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds form only)"""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+async def _get(endpoint: str, path: str, params: Optional[dict] = None) -> httpx.Response:
+    """
+    GET a CoinGecko path over the shared pool with the endpoint's timeout.
+    Paced by the token bucket; 429/5xx responses and transport errors are
+    retried up to MAX_RETRIES times. The last response is returned as-is.
+    """
+    timeout = httpx.Timeout(ENDPOINT_TIMEOUTS[endpoint], connect=CONNECT_TIMEOUT)
+
+    for attempt in range(MAX_RETRIES + 1):
+        await rate_limiter.acquire(queue_wait.get())
+
+        try:
+            response = await get_http_client().get(path, params=params, timeout=timeout)
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                retry_stats["gave_up"] += 1
+                raise
+            retry_stats["retries"] += 1
+            await asyncio.sleep(_backoff_delay(attempt))
+            continue
+
+        if response.status_code not in RETRY_STATUSES:
+            return response
+
+        delay = _retry_after(response)
+        # Give up when out of attempts or upstream wants us gone for longer than we hold requests
+        if attempt == MAX_RETRIES or (delay is not None and delay > BACKOFF_MAX):
+            if response.status_code == 429 and delay:
+                rate_limiter.pause(delay)
+            retry_stats["gave_up"] += 1
+            return response
+
+        if delay is not None:
+            retry_stats["retry_after_honoured"] += 1
+        else:
+            delay = _backoff_delay(attempt)
+
+        retry_stats["retries"] += 1
+        if response.status_code == 429:
+            # The paused bucket makes the next acquire() wait out the delay
+            rate_limiter.pause(delay)
+        else:
+            await asyncio.sleep(delay)
+
+    return response
+
+
 async def get_token_data(token_id: str) -> Optional[dict]:
-    """Fetch token market data from CoinGecko (with caching)"""
-    
-    # Check cache
-    if token_id in TOKEN_CACHE:
-        data, timestamp = TOKEN_CACHE[token_id]
-        if time.time() - timestamp < CACHE_TTL:
-            return data
-
-    async with httpx.AsyncClient() as client:
+    """
+    Fetch token data from CoinGecko (with caching).
+    Market fields come from the short-lived market tier, developer/community
+    data from the long-lived fundamentals tier. "fundamentals_unavailable" is
+    set when that tier failed (rate limited, upstream error) rather than
+    CoinGecko having no details for the token.
+    """
+    market, fundamentals = await asyncio.gather(
+        get_market_data(token_id),
+        get_token_fundamentals(token_id),
+        return_exceptions=True
+    )
+
+    if isinstance(market, BaseException):
+        raise market
+    if not market:
+        return None
+
+    unavailable = isinstance(fundamentals, BaseException)
+    if unavailable:
+        print(f"Error fetching token details: {fundamentals}")
+        fundamentals = None
+
+    # Ensure fundamentals is a dict
+    fundamentals = fundamentals or {}
+
+    return {
+        **market,
+        "developer_data": fundamentals.get("developer_data"),
+        "community_data": fundamentals.get("community_data"),
+        "fundamentals_unavailable": unavailable
+    }
+
+
+async def get_market_data(token_id: str) -> Optional[dict]:
+    """Price/market fields only (MARKET tier, seconds-to-minutes TTL)"""
+    return await _cached_fetch(TOKEN_CACHE, token_id, ("markets", token_id), lambda: _fetch_market_data(token_id))
+
+
+async def get_token_fundamentals(token_id: str) -> Optional[dict]:
+    """Developer/community data (FUNDAMENTALS tier, hours TTL)"""
+    return await _cached_fetch(
+        FUNDAMENTALS_CACHE, token_id, ("fundamentals", token_id), lambda: _fetch_fundamentals(token_id)
+    )
+
+
+async def _cached_fetch(cache: TTLCache, key: str, flight_key: tuple, fetch) -> Optional[dict]:
+    """
+    Serve from a cache tier with stale-while-revalidate.
+    fetch() is responsible for storing successful results in the cache.
+    """
+    cached, state = cache.lookup(key)
+    if state == FRESH:
+        return cached
+    if state == STALE:
+        _refresh_in_background(flight_key, fetch)
+        return cached
+
+    try:
+        data = await coingecko_flight.do(flight_key, fetch)
+    except UpstreamError:
+        if cached is not None:
+            return cache.serve_stale_on_error(cached)
+        raise
+
+    if data is None and cached is not None:
+        return cache.serve_stale_on_error(cached)
+    return data
+
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _refresh_in_background(flight_key: tuple, fetch):
+    """Revalidate a stale entry without blocking the caller"""
+    async def refresh():
         try:
-            response = await client.get(
-                f"{COINGECKO_BASE}/coins/markets",
-                params={
-                    "vs_currency": "usd",
-                    "ids": token_id,
-                    "order": "market_cap_desc",
-                    "sparkline": "true",
-                    "price_change_percentage": "24h,7d,30d"
-                },
-                timeout=10.0
-            )
-
-            if response.status_code == 429:
-                print("CoinGecko API Rate Limit Hit (429). Please wait.")
-                raise RateLimitError("CoinGecko Rate Limit")
-            
-            if response.status_code != 200:
-                print(f"CoinGecko Error: {response.status_code}")
-                return None
-
-            data = response.json()
-            if not data or not isinstance(data, list):
-                return None
-
-            token = data[0]
-            
-            # Fetch additional details (developer/community data)
-            # This is slow but necessary for fundamental analysis
-            try:
-                details = await get_token_details(token_id)
-            except Exception as e:
-                print(f"Error fetching token details: {e}")
-                details = {}
-            
-            # Ensure details is a dict
-            details = details or {}
-            
-            formatted_data = {
-                "id": token["id"],
-                "name": token["name"],
-                "symbol": token["symbol"],
-                "current_price": token.get("current_price", 0),
-                "market_cap": token.get("market_cap") or 0,
-                "market_cap_rank": token.get("market_cap_rank"),
-                "fully_diluted_valuation": token.get("fully_diluted_valuation"),
-                "circulating_supply": token.get("circulating_supply"),
-                "total_supply": token.get("total_supply"),
-                "total_volume": token.get("total_volume") or 0,
-                "price_change_percentage_24h": token.get("price_change_percentage_24h") or 0,
-                "price_change_percentage_7d": token.get("price_change_percentage_7d_in_currency") or 0,
-                "price_change_percentage_30d": token.get("price_change_percentage_30d_in_currency") or 0,
-                "ath": token.get("ath") or 0,
-                "ath_change_percentage": token.get("ath_change_percentage") or 0,
-                "image": token.get("image"),
-                "developer_data": details.get("developer_data"),
-                "community_data": details.get("community_data"),
-                "sparkline_in_7d": token.get("sparkline_in_7d", {}).get("price", [])
-            }
-            
-            # Save to cache
-            TOKEN_CACHE[token_id] = (formatted_data, time.time())
-            
-            return formatted_data
-        except RateLimitError:
-            raise
+            await coingecko_flight.do(flight_key, fetch)
         except Exception as e:
-            print(f"CoinGecko API error: {e}")
+            print(f"Background refresh of {flight_key} failed: {e}")
+
+    task = asyncio.ensure_future(refresh())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def get_many_token_data(
+    token_ids: list[str], include_fundamentals: bool = True
+) -> dict[str, Optional[dict] | UpstreamError]:
+    """
+    Fetch data for several tokens; market cache misses share batched /coins/markets calls.
+    Values are None for tokens CoinGecko does not list, and the UpstreamError for
+    tokens that could not be fetched. RateLimitError is raised.
+    """
+    unique_ids = list(dict.fromkeys(token_ids))
+    fetch = get_token_data if include_fundamentals else get_market_data
+    results = await asyncio.gather(*[fetch(t) for t in unique_ids], return_exceptions=True)
+
+    data = {}
+    for token_id, result in zip(unique_ids, results):
+        if isinstance(result, RateLimitError):
+            raise result
+        if isinstance(result, Exception):
+            result = result if isinstance(result, UpstreamError) else UpstreamError(str(result))
+        data[token_id] = result
+    return data
+
+
+def format_market_row(token: dict) -> dict:
+    """Normalise a /coins/markets row into our token data shape (market fields only)"""
+    return {
+        "id": token["id"],
+        "name": token["name"],
+        "symbol": token["symbol"],
+        "current_price": token.get("current_price", 0),
+        "market_cap": token.get("market_cap") or 0,
+        "market_cap_rank": token.get("market_cap_rank"),
+        "fully_diluted_valuation": token.get("fully_diluted_valuation"),
+        "circulating_supply": token.get("circulating_supply"),
+        "total_supply": token.get("total_supply"),
+        "total_volume": token.get("total_volume") or 0,
+        "price_change_percentage_24h": token.get("price_change_percentage_24h") or 0,
+        "price_change_percentage_7d": token.get("price_change_percentage_7d_in_currency") or 0,
+        "price_change_percentage_30d": token.get("price_change_percentage_30d_in_currency") or 0,
+        "ath": token.get("ath") or 0,
+        "ath_change_percentage": token.get("ath_change_percentage") or 0,
+        "image": token.get("image"),
+        "sparkline_in_7d": (token.get("sparkline_in_7d") or {}).get("price", [])
+    }
+
+
+async def _fetch_market_data(token_id: str) -> Optional[dict]:
+    try:
+        token = await markets_batcher.load(token_id)
+        if not token:
             return None
 
+        formatted_data = format_market_row(token)
+        TOKEN_CACHE.set(token_id, formatted_data)
+        return formatted_data
+    except UpstreamError:
+        raise
+    except Exception as e:
+        print(f"CoinGecko API error: {e}")
+        raise UpstreamError(str(e) or type(e).__name__) from e
 
-async def get_token_details(token_id: str) -> Optional[dict]:
-    """Fetch detailed token info including description and links"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{COINGECKO_BASE}/coins/{token_id}",
-                params={
-                    "localization": "false",
-                    "tickers": "false",
-                    "market_data": "true",
-                    "community_data": "true",
-                    "developer_data": "true",
-                    "sparkline": "true"
-                },
-                timeout=10.0
-            )
-
-            if response.status_code == 429:
-                raise RateLimitError("CoinGecko Rate Limit")
-
-            if response.status_code != 200:
-                return None
-
-            return response.json()
-        except RateLimitError:
-            raise
-        except Exception as e:
-            print(f"CoinGecko API error: {e}")
+
+async def _fetch_fundamentals(token_id: str) -> Optional[dict]:
+    """
+    Slim /coins/{id} call: developer and community data without market data or sparkline.
+    None when CoinGecko has no details for the token; RateLimitError/UpstreamError
+    when the call failed.
+    """
+    try:
+        response = await _get(
+            "details",
+            f"/coins/{token_id}",
+            params={
+                "localization": "false",
+                "tickers": "false",
+                "market_data": "false",
+                "community_data": "true",
+                "developer_data": "true",
+                "sparkline": "false"
+            }
+        )
+
+        if response.status_code == 429:
+            raise RateLimitError("CoinGecko Rate Limit")
+        if response.status_code >= 500:
+            raise UpstreamError(f"CoinGecko details returned {response.status_code}")
+
+        if response.status_code != 200:
             return None
 
+        details = response.json()
+        fundamentals = {
+            "developer_data": details.get("developer_data"),
+            "community_data": details.get("community_data")
+        }
+        FUNDAMENTALS_CACHE.set(token_id, fundamentals)
+        return fundamentals
+    except UpstreamError:
+        raise
+    except Exception as e:
+        print(f"CoinGecko API error: {e}")
+        raise UpstreamError(str(e) or type(e).__name__) from e
+
+
+async def _fetch_markets_batch(token_ids: list[str]) -> dict[str, dict]:
+    """One /coins/markets call for up to BATCH_MAX_IDS ids, keyed by requested id"""
+    response = await _get(
+        "markets",
+        "/coins/markets",
+        params={
+            "vs_currency": "usd",
+            "ids": ",".join(token_ids),
+            "order": "market_cap_desc",
+            "per_page": len(token_ids),
+            "sparkline": "true",
+            "price_change_percentage": "24h,7d,30d"
+        }
+    )
+
+    if response.status_code == 429:
+        print("CoinGecko API Rate Limit Hit (429). Please wait.")
+        raise RateLimitError("CoinGecko Rate Limit")
+
+    if response.status_code != 200:
+        print(f"CoinGecko Error: {response.status_code}")
+        raise UpstreamError(f"CoinGecko markets error {response.status_code}")
+
+    data = response.json()
+    if not data or not isinstance(data, list):
+        return {}
+
+    rows = {row["id"]: row for row in data}
+    return {
+        token_id: rows.get(token_id) or rows.get(token_id.lower())
+        for token_id in token_ids
+    }
+
+
+markets_batcher = MicroBatcher(
+    "markets", _fetch_markets_batch, window=BATCH_WINDOW_MS / 1000, max_batch=BATCH_MAX_IDS
+)
+
+
+# Local search index, rebuilt periodically from /coins/list + top market-cap pages
+SEARCH_INDEX_REFRESH_INTERVAL = float(os.getenv("SEARCH_INDEX_REFRESH_INTERVAL", "21600"))  # 6 hours
+SEARCH_INDEX_RANKED_PAGES = int(os.getenv("SEARCH_INDEX_RANKED_PAGES", "4"))  # x250 tokens
+
 
 async def search_tokens(query: str, limit: int = 10) -> list[dict]:
-    """Search for tokens by name or symbol"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{COINGECKO_BASE}/search",
-                params={"query": query},
-                timeout=10.0
-            )
-
-            if response.status_code != 200:
-                return []
-
-            data = response.json()
-            coins = data.get("coins", [])[:limit]
-
-            return [
-                {
-                    "id": coin["id"],
-                    "name": coin["name"],
-                    "symbol": coin["symbol"],
-                    "market_cap_rank": coin.get("market_cap_rank"),
-                    "thumb": coin.get("thumb")
-                }
-                for coin in coins
-            ]
-        except Exception as e:
-            print(f"CoinGecko search error: {e}")
+    """Search for tokens by name or symbol (local index first, upstream /search on a miss)"""
+    if search_index.ready:
+        results = search_index.search(query, limit)
+        if results:
+            return results
+
+    results = await coingecko_flight.do(("search", query), lambda: _fetch_search(query))
+    return results[:limit]
+
+
+async def refresh_search_index():
+    """Rebuild the local search index; keeps the previous one if the coin list fetch fails"""
+    coins, *pages = await asyncio.gather(
+        get_coins_list(),
+        *[get_markets_page(page) for page in range(1, SEARCH_INDEX_RANKED_PAGES + 1)],
+        return_exceptions=True
+    )
+    if isinstance(coins, BaseException) or not coins:
+        print(f"Search index refresh skipped: coin list unavailable ({coins})")
+        return
+
+    ranked = [row for page in pages if isinstance(page, list) for row in page]
+    await asyncio.to_thread(search_index.build, coins, ranked)
+    print(f"🔎 Search index built: {len(coins)} tokens, {len(ranked)} ranked")
+
+
+async def get_coins_list() -> list[dict]:
+    """All CoinGecko coins as {id, symbol, name}"""
+    try:
+        response = await _get("coins_list", "/coins/list")
+
+        if response.status_code == 429:
+            raise RateLimitError("CoinGecko Rate Limit")
+
+        if response.status_code != 200:
+            return []
+
+        return response.json()
+    except RateLimitError:
+        raise
+    except Exception as e:
+        print(f"CoinGecko coin list error: {e}")
+        return []
+
+
+async def get_markets_page(page: int, per_page: int = 250, sparkline: bool = False) -> list[dict]:
+    """
+    One page of /coins/markets ordered by market cap (raw rows). Concurrent
+    callers (the screener and the search index both walk the top pages) share
+    one upstream call per page.
+    """
+    return await coingecko_flight.do(
+        ("markets_page", page, per_page, sparkline), lambda: _fetch_markets_page(page, per_page, sparkline)
+    )
+
+
+async def _fetch_markets_page(page: int, per_page: int, sparkline: bool) -> list[dict]:
+    try:
+        response = await _get(
+            "markets",
+            "/coins/markets",
+            params={
+                "vs_currency": "usd",
+                "order": "market_cap_desc",
+                "per_page": per_page,
+                "page": page,
+                "sparkline": "true" if sparkline else "false",
+                "price_change_percentage": "24h,7d,30d"
+            }
+        )
+
+        if response.status_code == 429:
+            raise RateLimitError("CoinGecko Rate Limit")
+
+        if response.status_code != 200:
+            return []
+
+        data = response.json()
+        return data if isinstance(data, list) else []
+    except RateLimitError:
+        raise
+    except Exception as e:
+        print(f"CoinGecko markets page error: {e}")
+        return []
+
+
+async def _fetch_search(query: str) -> list[dict]:
+    try:
+        response = await _get("search", "/search", params={"query": query})
+
+        if response.status_code != 200:
             return []
 
+        data = response.json()
+        coins = data.get("coins", [])
+
+        return [
+            {
+                "id": coin["id"],
+                "name": coin["name"],
+                "symbol": coin["symbol"],
+                "market_cap_rank": coin.get("market_cap_rank"),
+                "thumb": coin.get("thumb")
+            }
+            for coin in coins
+        ]
+    except Exception as e:
+        print(f"CoinGecko search error: {e}")
+        return []
+
 
 async def get_trending_tokens() -> list[dict]:
     """Get trending tokens"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{COINGECKO_BASE}/search/trending",
-                timeout=10.0
-            )
-
-            if response.status_code != 200:
-                return []
-
-            data = response.json()
-            coins = data.get("coins", [])
-
-            return [
-                {
-                    "id": coin["item"]["id"],
-                    "name": coin["item"]["name"],
-                    "symbol": coin["item"]["symbol"],
-                    "market_cap_rank": coin["item"].get("market_cap_rank"),
-                    "thumb": coin["item"].get("thumb")
-                }
-                for coin in coins[:10]
-            ]
-        except Exception as e:
-            print(f"CoinGecko trending error: {e}")
+    return await coingecko_flight.do(("trending",), _fetch_trending)
+
+
+async def _fetch_trending() -> list[dict]:
+    try:
+        response = await _get("trending", "/search/trending")
+
+        if response.status_code != 200:
             return []
 
+        data = response.json()
+        coins = data.get("coins", [])
+
+        return [
+            {
+                "id": coin["item"]["id"],
+                "name": coin["item"]["name"],
+                "symbol": coin["item"]["symbol"],
+                "market_cap_rank": coin["item"].get("market_cap_rank"),
+                "thumb": coin["item"].get("thumb")
+            }
+            for coin in coins[:10]
+        ]
+    except Exception as e:
+        print(f"CoinGecko trending error: {e}")
+        return []
+
 
 async def get_coin_ohlc(token_id: str, days: str = "30") -> list[list[float]]:
     """
@@ -192,18 +628,34 @@ async def get_coin_ohlc(token_id: str, days: str = "30") -> list[list[float]]:
     days: 1, 7, 14, 30, 90, 180, 365, max
     Returns list of [timestamp, open, high, low, close]
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{COINGECKO_BASE}/coins/{token_id}/ohlc",
-                params={"vs_currency": "usd", "days": days},
-                timeout=10.0
-            )
+    return await coingecko_flight.do(("ohlc", token_id, days), lambda: _fetch_ohlc(token_id, days))
 
-            if response.status_code != 200:
-                return []
 
-            return response.json()
-        except Exception as e:
-            print(f"CoinGecko OHLC error: {e}")
+async def _fetch_ohlc(token_id: str, days: str) -> list[list[float]]:
+    try:
+        response = await _get(
+            "ohlc",
+            f"/coins/{token_id}/ohlc",
+            params={"vs_currency": "usd", "days": days}
+        )
+
+        if response.status_code != 200:
             return []
+
+        return response.json()
+    except Exception as e:
+        print(f"CoinGecko OHLC error: {e}")
+        return []
+
+
+def get_coingecko_stats() -> dict:
+    """Counters for the CoinGecko client layer"""
+    return {
+        "market_cache": TOKEN_CACHE.stats(),
+        "fundamentals_cache": FUNDAMENTALS_CACHE.stats(),
+        "coalescing": coingecko_flight.stats(),
+        "markets_batching": markets_batcher.stats(),
+        "search_index": search_index.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "retries": dict(retry_stats)
+    }
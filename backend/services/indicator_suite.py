@@ -0,0 +1,129 @@
+"""
+Extended technical indicators from an (N, 5) OHLC array: EMA, MACD, Bollinger
+band width, ATR, true-range volatility and max drawdown per lock horizon.
+
+Everything is vectorised: the true range and EMAs are computed once over the
+series and the remaining indicators are read from them and from the closes.
+"""
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+DAY_MS = 86_400_000
+LOCK_PERIOD_WEEKS = range(1, 9)
+
+# exp(300) stays far from float64 overflow
+_MAX_EXPONENT = 300.0
+
+
+def ema(values: np.ndarray, span: int = None, alpha: float = None, initial: float = None) -> np.ndarray:
+    """
+    Exponential moving average e[t] = (1 - alpha) * e[t-1] + alpha * x[t], seeded with
+    `initial` (default: the first value). alpha defaults to 2 / (span + 1).
+    Computed in closed form per chunk: e[s+k] = d^k * (e[s] + alpha * sum(x[s+j] * d^-j)).
+    """
+    alpha = 2 / (span + 1) if alpha is None else alpha
+    decay = 1 - alpha
+    out = np.empty(len(values))
+    if not len(values):
+        return out
+
+    if initial is None:
+        out[0] = previous = values[0]
+        start = 1
+    else:
+        previous = initial
+        start = 0
+    chunk = max(1, int(_MAX_EXPONENT / -math.log(decay))) if decay > 0 else 1
+
+    while start < len(values):
+        x = values[start:start + chunk]
+        powers = decay ** np.arange(1, len(x) + 1)
+        out[start:start + len(x)] = powers * (previous + np.cumsum(alpha * x / powers))
+        previous = out[start + len(x) - 1]
+        start += len(x)
+    return out
+
+
+def drawdowns_by_horizon(closes: np.ndarray, max_lag: int) -> np.ndarray:
+    """
+    Largest peak-to-trough decline (%) with the trough at most k candles after the
+    peak, for k = 0..max_lag
+    """
+    padded = np.concatenate([np.full(max_lag, -np.inf), closes])
+    # windows[j, k] = close k candles before close j (most recent first)
+    windows = sliding_window_view(padded, max_lag + 1)[:, ::-1]
+    peaks = np.maximum.accumulate(windows, axis=1)
+    decline = 1 - closes[:, None] / peaks
+    return np.maximum.accumulate(decline.max(axis=0)) * 100
+
+
+def indicator_suite(ohlc: np.ndarray, periods_per_year: float = 365) -> dict:
+    """
+    Indicators for a timestamp-sorted OHLC array. Prices are relative to the last
+    close where the raw value depends on the token's price scale. Indicators
+    without enough candles are 0.0, as in TechnicalScorer.
+    """
+    closes, highs, lows = ohlc[:, 4], ohlc[:, 2], ohlc[:, 3]
+    n = len(closes)
+    if not n:
+        return {}
+    last = closes[-1]
+
+    # True range (the first candle has no previous close)
+    previous = np.concatenate([closes[:1], closes[:-1]])
+    true_range = np.maximum(highs - lows, np.maximum(np.abs(highs - previous), np.abs(lows - previous)))
+
+    # EMA / MACD(12, 26, 9)
+    ema_12 = ema(closes, 12)
+    ema_26 = ema(closes, 26)
+    macd_line = ema_12 - ema_26
+    signal = ema(macd_line[25:], 9) if n >= 26 else np.zeros(0)
+    macd = macd_signal = 0.0
+    if n >= 26 + 8:
+        macd = macd_line[-1] / last * 100
+        macd_signal = signal[-1] / last * 100
+
+    # Bollinger bands (20, 2 std): band width as % of the middle band
+    bollinger_width = 0.0
+    if n >= 20:
+        window = closes[-20:]
+        middle = window.mean()
+        bollinger_width = (4 * window.std()) / middle * 100
+
+    # ATR(14), Wilder smoothing seeded with the simple average of the first 14 ranges
+    atr = 0.0
+    if n >= 15:
+        ranges = true_range[1:]
+        atr = ema(ranges[14:], alpha=1 / 14, initial=ranges[:14].mean())[-1] if n > 15 else ranges.mean()
+
+    # True-range volatility: mean range relative to the previous close over 30 candles,
+    # converted to a standard deviation (E[range] = sqrt(8 / pi) * sigma) and annualized
+    tr_volatility = 0.0
+    if n >= 31:
+        relative_range = (true_range[-30:] / previous[-30:]).mean()
+        tr_volatility = relative_range * math.sqrt(math.pi / 8) * math.sqrt(periods_per_year) * 100
+
+    # Max drawdown over the series and within each lock horizon
+    max_drawdown = (1 - closes / np.maximum.accumulate(closes)).max() * 100
+    drawdown_by_lock = {}
+    if n >= 2:
+        step = (ohlc[-1, 0] - ohlc[0, 0]) / (n - 1)  # Mean spacing: resampled weekly closes are uneven
+        lags = {weeks: max(1, round(weeks * 7 * DAY_MS / step)) if step > 0 else 1 for weeks in LOCK_PERIOD_WEEKS}
+        by_lag = drawdowns_by_horizon(closes, min(max(lags.values()), n - 1))
+        drawdown_by_lock = {weeks: round(float(by_lag[min(lag, n - 1)]), 1) for weeks, lag in lags.items()}
+
+    return {
+        "ema_12": float(f"{ema_12[-1]:.6g}"),
+        "ema_26": float(f"{ema_26[-1]:.6g}"),
+        "macd_pct": round(float(macd), 2),
+        "macd_signal_pct": round(float(macd_signal), 2),
+        "macd_histogram_pct": round(float(macd - macd_signal), 2),
+        "bollinger_width": round(float(bollinger_width), 1),
+        "atr": float(f"{atr:.6g}"),
+        "atr_pct": round(float(atr / last * 100), 1),
+        "tr_volatility": round(float(tr_volatility), 1),
+        "max_drawdown": round(float(max_drawdown), 1),
+        "max_drawdown_by_lock_period": drawdown_by_lock
+    }
@@ -0,0 +1,277 @@
+"""
+Incremental technical indicators for live candle series.
+
+The rolling windows keep running sums, so appending a candle (or revising the
+latest, still-forming candle) is O(1) instead of rescanning the history as
+TechnicalScorer does. Results match TechnicalScorer to floating point tolerance.
+"""
+import math
+from collections import deque
+from typing import Optional
+
+from .technical_analysis import score_indicators
+
+RSI_PERIOD = 14
+VOLATILITY_PERIOD = 30
+SMA_PERIOD = 20
+# Running sums are recomputed from their window this often to stop rounding drift
+RESYNC_INTERVAL = 1024
+
+
+class RollingSMA:
+    """Mean of the last `period` values"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window: deque[float] = deque()
+        self.total = 0.0
+        self._updates = 0
+
+    def push(self, value: float):
+        if len(self.window) == self.period:
+            self.total -= self.window.popleft()
+        self.window.append(value)
+        self.total += value
+        self._tick()
+
+    def replace_last(self, value: float):
+        self.total += value - self.window[-1]
+        self.window[-1] = value
+        self._tick()
+
+    def _tick(self):
+        self._updates += 1
+        if self._updates % RESYNC_INTERVAL == 0:
+            self.total = sum(self.window)
+
+    @property
+    def value(self) -> float:
+        return self.total / len(self.window) if self.window else 0.0
+
+
+class RollingVariance:
+    """Population variance of the last `period` values (Welford updates with removal)"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window: deque[float] = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._updates = 0
+
+    def push(self, value: float):
+        if len(self.window) == self.period:
+            self._remove(self.window[0])
+            self.window.popleft()
+        self.window.append(value)
+        self._add(value)
+        self._tick()
+
+    def replace_last(self, value: float):
+        self._remove(self.window[-1])
+        self.window[-1] = value
+        self._add(value)
+        self._tick()
+
+    def _add(self, value: float):
+        n = len(self.window)  # Already includes value
+        delta = value - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (value - self.mean)
+
+    def _remove(self, value: float):
+        n = len(self.window) - 1  # Size without value (still in the window)
+        if n == 0:
+            self.mean = self.m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / n
+        self.m2 -= delta * (value - self.mean)
+
+    def _tick(self):
+        self._updates += 1
+        if self._updates % RESYNC_INTERVAL == 0:
+            self.mean = sum(self.window) / len(self.window)
+            self.m2 = sum((x - self.mean) ** 2 for x in self.window)
+
+    @property
+    def variance(self) -> float:
+        return max(self.m2, 0.0) / len(self.window) if self.window else 0.0
+
+
+class RollingRSI:
+    """Average gain and loss over the last `period` price changes (simple averages, as TechnicalScorer)"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window: deque[float] = deque()
+        self.gains = 0.0
+        self.losses = 0.0
+        # Positive/negative changes in the window: a window without any has an exact 0 sum
+        self._gaining = 0
+        self._losing = 0
+        self._updates = 0
+
+    def push(self, delta: float):
+        if len(self.window) == self.period:
+            self._remove(self.window.popleft())
+        self.window.append(delta)
+        self._add(delta)
+        self._tick()
+
+    def replace_last(self, delta: float):
+        self._remove(self.window[-1])
+        self.window[-1] = delta
+        self._add(delta)
+        self._tick()
+
+    def _add(self, delta: float):
+        if delta > 0:
+            self.gains += delta
+            self._gaining += 1
+        elif delta < 0:
+            self.losses -= delta
+            self._losing += 1
+
+    def _remove(self, delta: float):
+        if delta > 0:
+            self.gains -= delta
+            self._gaining -= 1
+            if self._gaining == 0:
+                self.gains = 0.0
+        elif delta < 0:
+            self.losses += delta
+            self._losing -= 1
+            if self._losing == 0:
+                self.losses = 0.0
+
+    def _tick(self):
+        self._updates += 1
+        if self._updates % RESYNC_INTERVAL == 0:
+            self.gains = sum(d for d in self.window if d > 0)
+            self.losses = sum(-d for d in self.window if d < 0)
+
+    @property
+    def value(self) -> float:
+        avg_gain = self.gains / self.period
+        avg_loss = self.losses / self.period
+        if avg_loss == 0:
+            return 100.0
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+class IndicatorState:
+    """
+    RSI(14), volatility(30) and SMA20 state for one candle series.
+    update() takes candles in timestamp order: a newer timestamp appends, the
+    same timestamp revises the latest candle.
+    """
+
+    def __init__(self, periods_per_year: float = 365):
+        self.periods_per_year = periods_per_year  # Candles per year, for annualizing volatility
+        self.timestamp: Optional[float] = None  # Latest candle
+        self.count = 0  # Candles in the series
+        self.closes: deque[float] = deque(maxlen=VOLATILITY_PERIOD + 1)
+        self.sma = RollingSMA(SMA_PERIOD)
+        self.rsi = RollingRSI(RSI_PERIOD)
+        self.returns = RollingVariance(VOLATILITY_PERIOD)
+
+    @classmethod
+    def from_candles(cls, candles: list[list[float]], periods_per_year: float = 365) -> "IndicatorState":
+        """State for a sorted candle series (only the tail is read)"""
+        state = cls(periods_per_year)
+        for candle in candles[-state.closes.maxlen:]:
+            state.update(candle)
+        state.count = len(candles)
+        return state
+
+    def update(self, candle: list[float]):
+        """Apply one [timestamp, open, high, low, close] candle in O(1)"""
+        timestamp, close = candle[0], candle[4]
+        if self.timestamp is not None and timestamp < self.timestamp:
+            raise ValueError("Candle is older than the indicator state")
+
+        if timestamp == self.timestamp:
+            self.closes[-1] = close
+            self.sma.replace_last(close)
+            if len(self.closes) > 1:
+                previous = self.closes[-2]
+                self.rsi.replace_last(close - previous)
+                self.returns.replace_last(math.log(close / previous))
+        else:
+            if self.closes:
+                previous = self.closes[-1]
+                self.rsi.push(close - previous)
+                self.returns.push(math.log(close / previous))
+            self.closes.append(close)
+            self.sma.push(close)
+            self.count += 1
+            self.timestamp = timestamp
+
+    def sync(self, candles: list[list[float]]) -> "IndicatorState":
+        """
+        Bring the state up to date with a merged series: apply the candles after
+        the latest known one, or rebuild if earlier closes in the window changed.
+        Returns the up-to-date state (self or a rebuilt one).
+        """
+        if self.timestamp is None:
+            return IndicatorState.from_candles(candles, self.periods_per_year)
+
+        i = len(candles) - 1
+        while i >= 0 and candles[i][0] > self.timestamp:
+            i -= 1
+        if i < 0 or candles[i][0] != self.timestamp:
+            return IndicatorState.from_candles(candles, self.periods_per_year)
+
+        # Closes before the latest one must be unchanged (the latest may be revised)
+        start = i - len(self.closes) + 1
+        partial = len(self.closes) < self.closes.maxlen and start != 0  # Older candles were added
+        if start < 0 or partial or [c[4] for c in candles[start:i]] != list(self.closes)[:-1]:
+            return IndicatorState.from_candles(candles, self.periods_per_year)
+
+        for candle in candles[i:]:
+            self.update(candle)
+        self.count = len(candles)
+        return self
+
+    def indicators(self) -> tuple[float, float, float]:
+        """Unrounded (rsi, volatility, sma_deviation), as TechnicalScorer's calculate_* methods"""
+        rsi = self.rsi.value if self.count >= RSI_PERIOD + 1 else 50.0
+
+        volatility = 0.0
+        if self.count >= VOLATILITY_PERIOD:
+            volatility = math.sqrt(self.returns.variance) * math.sqrt(self.periods_per_year) * 100
+
+        sma_dev = 0.0
+        if self.count >= SMA_PERIOD:
+            sma = self.sma.value
+            sma_dev = ((self.closes[-1] - sma) / sma) * 100
+
+        return rsi, volatility, sma_dev
+
+    def technical_score(self) -> dict:
+        """Same result as TechnicalScorer(candles, periods_per_year).get_technical_score()"""
+        if not self.count:
+            return {"score": 5.0, "details": "No data"}
+        return score_indicators(*self.indicators())
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable state; the running sums are rebuilt from the closes on load"""
+        return {
+            "timestamp": self.timestamp,
+            "count": self.count,
+            "closes": list(self.closes),
+            "periods_per_year": self.periods_per_year
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IndicatorState":
+        closes = data["closes"]
+        # Replay the closes on consecutive placeholder timestamps, then restore the real ones
+        state = cls.from_candles(
+            [[i, 0, 0, 0, close] for i, close in enumerate(closes)], data.get("periods_per_year", 365)
+        )
+        state.timestamp = data["timestamp"]
+        state.count = data["count"]
+        return state
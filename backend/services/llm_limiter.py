@@ -0,0 +1,150 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+# Latency budget per LLM call, including time spent queued for a slot (seconds)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Callers allowed to wait for a slot; beyond this they fail fast
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))
+# Budget for a whole streamed completion, from acquiring the slot (seconds)
+LLM_STREAM_TIMEOUT = float(os.getenv("LLM_STREAM_TIMEOUT", "30"))
+
+
+class LLMUnavailable(Exception):
+    """The LLM was not called or did not answer within the budget"""
+    pass
+
+
+class LLMSlot:
+    """An acquired concurrency slot with the remaining deadline"""
+
+    def __init__(self, limiter: "LLMLimiter", deadline: float):
+        self.limiter = limiter
+        self.deadline = deadline
+        self.acquired_at = time.monotonic()
+
+    async def wait(self, awaitable: Awaitable[Any]) -> Any:
+        """Await within the remaining budget (LLMUnavailable on timeout)"""
+        remaining = max(0.0, self.deadline - time.monotonic())
+        try:
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError:
+            self.limiter.timeouts += 1
+            raise LLMUnavailable(f"LLM deadline exceeded ({self.limiter.timeout}s)")
+
+    async def stream(self, iterable: AsyncIterator[Any], timeout: float = LLM_STREAM_TIMEOUT) -> AsyncIterator[Any]:
+        """
+        Items of a streamed response until `timeout` seconds after the slot was
+        acquired (then LLMUnavailable), so a slow stream cannot hold the slot indefinitely
+        """
+        deadline = self.acquired_at + timeout
+        iterator = iterable.__aiter__()
+        while True:
+            try:
+                item = await asyncio.wait_for(iterator.__anext__(), max(0.0, deadline - time.monotonic()))
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                self.limiter.timeouts += 1
+                raise LLMUnavailable(f"LLM stream deadline exceeded ({timeout}s)")
+            yield item
+
+
+class LLMLimiter:
+    """
+    Admission control for LLM calls.
+    At most max_concurrency calls run at once and max_queue callers wait for a
+    slot; the rest are rejected immediately. Each call has a deadline covering
+    queueing and the call itself. Callers handle LLMUnavailable like any other
+    LLM failure, by returning their deterministic fallback.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+
+        # Metrics
+        self.calls = 0
+        self.completed = 0
+        self.errors = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0  # Caller went away mid-call (e.g. client disconnected from a stream)
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None) -> AsyncIterator[LLMSlot]:
+        """Acquire a slot (LLMUnavailable if the queue is full or the wait exceeds the budget)"""
+        self.calls += 1
+        started = time.monotonic()
+        deadline = started + (self.timeout if timeout is None else timeout)
+
+        if not self._sem.locked():
+            await self._sem.acquire()  # Free slot: returns without suspending
+        elif self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise LLMUnavailable("LLM queue full")
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), max(0.0, deadline - started))
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise LLMUnavailable("Timed out waiting for an LLM slot")
+            finally:
+                self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield LLMSlot(self, deadline)
+        except LLMUnavailable:
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        except BaseException:
+            self.cancelled += 1
+            raise
+        else:
+            self.completed += 1
+            elapsed = time.monotonic() - started
+            self.total_latency += elapsed
+            self.max_latency = max(self.max_latency, elapsed)
+        finally:
+            self.in_flight -= 1
+            self._sem.release()
+
+    async def run(self, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Await fn() in a slot, within the deadline"""
+        async with self.slot(timeout) as slot:
+            return await slot.wait(fn())
+
+    def stats(self) -> dict:
+        fast_fallbacks = self.rejected + self.timeouts
+        return {
+            "timeout_s": self.timeout,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "completed": self.completed,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "fast_fallback_rate": round(fast_fallbacks / self.calls, 3) if self.calls else 0.0,
+            "avg_latency_ms": round(self.total_latency / self.completed * 1000, 1) if self.completed else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 1)
+        }
+
+
+llm_limiter = LLMLimiter(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_TIMEOUT)
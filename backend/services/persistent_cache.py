@@ -0,0 +1,169 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from typing import Optional
+
+from .coingecko import TOKEN_CACHE, FUNDAMENTALS_CACHE
+from .candle_store import candle_store, FULL_REFRESH_INTERVAL
+from .indicators import IndicatorState
+from .cache import TTLCache
+
+# Optional: set to a file path (e.g. /data/coingecko.db) to keep market data across restarts
+CACHE_DB_PATH = os.getenv("COINGECKO_CACHE_DB")
+CACHE_PERSIST_INTERVAL = float(os.getenv("COINGECKO_CACHE_PERSIST_INTERVAL", "60"))  # seconds
+
+
+class PersistentCache:
+    """
+    SQLite-backed store for cache entries: (namespace, key) -> JSON value + timestamp.
+    Only used at startup (load) and by the periodic flush, never on the request path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )"""
+        )
+        self._conn.commit()
+
+    def load(self, namespace: str, min_stored_at: float) -> list[tuple[str, object, float]]:
+        rows = self._conn.execute(
+            "SELECT key, value, stored_at FROM entries WHERE namespace = ? AND stored_at >= ?",
+            (namespace, min_stored_at)
+        ).fetchall()
+        return [(key, json.loads(value), stored_at) for key, value, stored_at in rows]
+
+    def save_many(self, namespace: str, entries: list[tuple[str, str, float]]):
+        """entries: (key, json_value, stored_at)"""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)",
+            [(namespace, key, value, stored_at) for key, value, stored_at in entries]
+        )
+        self._conn.commit()
+
+    def prune(self, namespace: str, max_age: float):
+        self._conn.execute(
+            "DELETE FROM entries WHERE namespace = ? AND stored_at < ?",
+            (namespace, time.time() - max_age)
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+store: Optional[PersistentCache] = None
+# Last stored_at written per namespace: only newer entries are flushed
+_persisted_until: dict[str, float] = {}
+persist_stats = {"restored": 0, "persisted": 0, "last_flush": None}
+
+
+def _max_age(cache: TTLCache) -> float:
+    return cache.ttl + cache.stale_if_error_ttl
+
+
+def restore_caches():
+    """Open the database (if configured) and warm the in-memory caches, skipping expired entries"""
+    global store
+    if not CACHE_DB_PATH:
+        return
+    store = PersistentCache(CACHE_DB_PATH)
+    now = time.time()
+
+    for namespace, cache in (("market", TOKEN_CACHE), ("fundamentals", FUNDAMENTALS_CACHE)):
+        entries = store.load(namespace, now - _max_age(cache))
+        for key, value, stored_at in sorted(entries, key=lambda e: e[2]):
+            cache.set(key, value, stored_at=stored_at)
+        persist_stats["restored"] += len(entries)
+        _persisted_until[namespace] = max((e[2] for e in entries), default=0.0)
+
+    entries = store.load("ohlc", now - FULL_REFRESH_INTERVAL)
+    for key, value, stored_at in sorted(entries, key=lambda e: e[2]):
+        token_id, days = key.rsplit("|", 1)
+        indicators = value.get("indicators")
+        candle_store.put(
+            token_id, days, value["candles"],
+            refreshed_at=stored_at, full_refreshed_at=value["full_refreshed_at"],
+            indicators=IndicatorState.from_dict(indicators) if indicators else None
+        )
+    persist_stats["restored"] += len(entries)
+    _persisted_until["ohlc"] = max((e[2] for e in entries), default=0.0)
+
+    print(f"✅ Restored {persist_stats['restored']} cached CoinGecko entries from {CACHE_DB_PATH}")
+
+
+def _collect_dirty() -> dict[str, list[tuple[str, str, float]]]:
+    """Serialise entries stored since the last flush (runs on the event loop thread)"""
+    dirty = {}
+    for namespace, cache in (("market", TOKEN_CACHE), ("fundamentals", FUNDAMENTALS_CACHE)):
+        since = _persisted_until.get(namespace, 0.0)
+        dirty[namespace] = [
+            (key, json.dumps(value), stored_at)
+            for key, value, stored_at in cache.items() if stored_at > since
+        ]
+
+    since = _persisted_until.get("ohlc", 0.0)
+    dirty["ohlc"] = [
+        (
+            f"{token_id}|{days}",
+            json.dumps({
+                "candles": series.candles,
+                "full_refreshed_at": series.full_refreshed_at,
+                "indicators": series.indicators.to_dict() if series.indicators is not None else None
+            }),
+            series.refreshed_at
+        )
+        for token_id, days, series in candle_store.items() if series.refreshed_at > since
+    ]
+    return dirty
+
+
+def _write(dirty: dict[str, list[tuple[str, str, float]]]):
+    for namespace, entries in dirty.items():
+        if entries:
+            store.save_many(namespace, entries)
+    store.prune("market", _max_age(TOKEN_CACHE))
+    store.prune("fundamentals", _max_age(FUNDAMENTALS_CACHE))
+    store.prune("ohlc", FULL_REFRESH_INTERVAL)
+
+
+async def persist_caches():
+    """Flush new cache entries to disk (no-op when persistence is disabled)"""
+    if store is None:
+        return
+
+    dirty = _collect_dirty()
+    await asyncio.to_thread(_write, dirty)
+
+    for namespace, entries in dirty.items():
+        if entries:
+            _persisted_until[namespace] = max(e[2] for e in entries)
+        persist_stats["persisted"] += len(entries)
+    persist_stats["last_flush"] = time.time()
+
+
+async def close_persistent_cache():
+    """Final flush on shutdown"""
+    global store
+    if store is None:
+        return
+    await persist_caches()
+    store.close()
+    store = None
+
+
+def get_persistence_stats() -> dict:
+    return {"enabled": store is not None, "path": CACHE_DB_PATH, **persist_stats}
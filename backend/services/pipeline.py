@@ -0,0 +1,104 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Optional
+
+
+class Stage:
+    """
+    One node of an analysis dependency graph.
+    fn receives the results dict (stage name -> value) and may be sync or async;
+    it runs as soon as every stage in deps has finished.
+    """
+
+    def __init__(self, name: str, fn: Callable[[dict], Any], deps: tuple[str, ...] = ()):
+        self.name = name
+        self.fn = fn
+        self.deps = deps
+
+
+# Per-pipeline, per-stage latency counters: { pipeline: { stage: {...} } }
+pipeline_stats: dict[str, dict[str, dict]] = {}
+
+
+def _required(stages: dict[str, Stage], targets: list[str]) -> list[str]:
+    """Targets plus their transitive dependencies, dependencies first"""
+    order: list[str] = []
+    seen: set[str] = set()
+
+    def visit(name: str):
+        if name in seen:
+            return
+        seen.add(name)
+        for dep in stages[name].deps:
+            visit(dep)
+        order.append(name)
+
+    for target in targets:
+        visit(target)
+    return order
+
+
+async def run_pipeline(
+    name: str,
+    stages: list[Stage],
+    targets: Optional[list[str]] = None,
+    results: Optional[dict] = None
+) -> tuple[dict, dict]:
+    """
+    Run the stages needed for `targets` (default: all), each as soon as its
+    dependencies are done, so independent I/O overlaps.
+    `results` may pre-seed stage values; those stages are not run again.
+    Returns (results, timings_ms).
+    """
+    by_name = {stage.name: stage for stage in stages}
+    order = _required(by_name, targets or list(by_name))
+    results = dict(results or {})
+    timings: dict[str, float] = {}
+    tasks: dict[str, asyncio.Future] = {}
+
+    async def run(stage: Stage):
+        if stage.deps:
+            await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+        started = time.perf_counter()
+        value = stage.fn(results)
+        if inspect.isawaitable(value):
+            value = await value
+        timings[stage.name] = round((time.perf_counter() - started) * 1000, 2)
+        results[stage.name] = value
+
+    loop = asyncio.get_running_loop()
+    for stage_name in order:
+        if stage_name in results:
+            done = loop.create_future()
+            done.set_result(None)
+            tasks[stage_name] = done
+        else:
+            tasks[stage_name] = asyncio.ensure_future(run(by_name[stage_name]))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    stats = pipeline_stats.setdefault(name, {})
+    for stage_name, elapsed in timings.items():
+        entry = stats.setdefault(stage_name, {"runs": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0})
+        entry["runs"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + elapsed, 2)
+        entry["max_ms"] = max(entry["max_ms"], elapsed)
+        entry["last_ms"] = elapsed
+
+    return results, timings
+
+
+def get_pipeline_stats() -> dict:
+    return {
+        name: {
+            stage: {**entry, "avg_ms": round(entry["total_ms"] / entry["runs"], 2)}
+            for stage, entry in stages.items()
+        }
+        for name, stages in pipeline_stats.items()
+    }
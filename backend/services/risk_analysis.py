@@ -107,18 +107,6 @@ class RiskScorer:
         # Cap at 10
         final_score = min(10.0, score)
         
-        # Details for AI
-        details = []
-        if liq_risk >= 2.0:
-            details.append(f"Low Liquidity (Vol/MCap ratio < 5%)")
-        if dil_risk >= 1.5:
-            details.append(f"High Dilution Risk (FDV >>> MCap)")
-        if vol_risk >= 2.5:
-            details.append(f"Extreme Volatility ({self.volatility:.0f}%)")
-        
-        if not details and final_score < 3:
-            details.append("Healthy risk profile")
-
         return {
             "score": round(final_score, 1),
             "components": {
@@ -126,5 +114,21 @@ class RiskScorer:
                 "volatility_risk": round(vol_risk, 1),
                 "dilution_risk": round(dil_risk, 1)
             },
-            "details": details
+            # Details for AI
+            "details": risk_details(liq_risk, vol_risk, dil_risk, self.volatility, final_score)
         }
+
+
+def risk_details(liq_risk: float, vol_risk: float, dil_risk: float, volatility: float, final_score: float) -> list[str]:
+    """Human-readable risk flags from the risk components and the (unrounded) capped score"""
+    details = []
+    if liq_risk >= 2.0:
+        details.append(f"Low Liquidity (Vol/MCap ratio < 5%)")
+    if dil_risk >= 1.5:
+        details.append(f"High Dilution Risk (FDV >>> MCap)")
+    if vol_risk >= 2.5:
+        details.append(f"Extreme Volatility ({volatility:.0f}%)")
+
+    if not details and final_score < 3:
+        details.append("Healthy risk profile")
+    return details
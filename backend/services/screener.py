@@ -0,0 +1,235 @@
+import asyncio
+import math
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from .ai_scoring import LOCK_PERIODS
+from .batch_scoring import token_columns, risk_scores, sentiment_scores, on_chain_scores, \
+    fundamental_scores, timeframe_technicals, overall_scores, recommendations
+from .timeframes import TIMEFRAMES, timeframe_cache, timeframe_for_lock_period, closes_per_year
+from .coingecko import get_markets_page, format_market_row, FUNDAMENTALS_CACHE
+from .trending import get_trending_snapshot
+
+SCREENER_TOP_N = int(os.getenv("SCREENER_TOP_N", "1000"))
+SCREENER_PER_PAGE = 250
+# Each run refreshes one /coins/markets page; the whole table turns over every TOP_N / 250 runs
+SCREENER_REFRESH_INTERVAL = float(os.getenv("SCREENER_REFRESH_INTERVAL", "60"))  # seconds
+
+SCORE_FIELDS = ("overall", "technical", "risk", "sentiment", "on_chain", "fundamental")
+MARKET_FIELDS = ("market_cap", "market_cap_rank", "total_volume", "price_change_percentage_7d", "current_price")
+
+
+class ScreenerTable:
+    """
+    Immutable scored view of the top tokens, for every lock period.
+    Sorted orders are computed once per (lock_period, sort, order) and reused
+    until the next table replaces this one.
+    """
+
+    def __init__(self, rows: list[dict], scores: dict[int, dict[str, np.ndarray]],
+                 version: int, updated_at: Optional[float]):
+        self.rows = rows  # market_cap_rank order
+        self.scores = scores  # { lock_period: { field: array } }
+        self.version = version
+        self.updated_at = updated_at
+        self._market = {
+            field: np.array([row.get(field) for row in rows], dtype=np.float64) for field in MARKET_FIELDS
+        }
+        self._orders: dict[tuple, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _column(self, lock_period: int, field: str) -> np.ndarray:
+        return self.scores[lock_period][field] if field in SCORE_FIELDS else self._market[field]
+
+    def ordered(self, lock_period: int, sort: str, descending: bool) -> np.ndarray:
+        """Row indexes sorted by a field (ties keep market cap order, missing values last)"""
+        key = (lock_period, sort, descending)
+        order = self._orders.get(key)
+        if order is None:
+            values = self._column(lock_period, sort)
+            values = np.where(np.isnan(values), np.inf, -values if descending else values)
+            order = np.argsort(values, kind="stable")
+            self._orders[key] = order
+        return order
+
+    def query(
+        self,
+        lock_period: int = 4,
+        sort: str = "overall",
+        descending: bool = True,
+        page: int = 1,
+        per_page: int = 50,
+        min_overall: Optional[float] = None,
+        max_risk: Optional[float] = None,
+        recommendation: Optional[str] = None
+    ) -> tuple[int, list[dict]]:
+        """(total matching rows, rows of the requested page)"""
+        if not self.rows:
+            return 0, []
+        order = self.ordered(lock_period, sort, descending)
+
+        scores = self.scores[lock_period]
+        if min_overall is not None or max_risk is not None or recommendation:
+            mask = np.ones(len(self.rows), dtype=bool)
+            if min_overall is not None:
+                mask &= scores["overall"] >= min_overall
+            if max_risk is not None:
+                mask &= scores["risk"] <= max_risk
+            if recommendation:
+                mask &= scores["recommendation"] == recommendation
+            order = order[mask[order]]
+
+        start = (page - 1) * per_page
+        return len(order), [self._item(int(i), lock_period) for i in order[start:start + per_page]]
+
+    def _item(self, i: int, lock_period: int) -> dict:
+        row = self.rows[i]
+        scores = self.scores[lock_period]
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "symbol": row["symbol"],
+            "image": row.get("image"),
+            "current_price": row.get("current_price"),
+            "market_cap": row.get("market_cap"),
+            "market_cap_rank": row.get("market_cap_rank"),
+            "total_volume": row.get("total_volume"),
+            "price_change_percentage_7d": row.get("price_change_percentage_7d"),
+            "scores": {field: float(scores[field][i]) for field in SCORE_FIELDS},
+            "recommendation": str(scores["recommendation"][i]),
+            "has_ohlc": bool(scores["has_ohlc"][i])
+        }
+
+
+class Screener:
+    """
+    Top-N tokens by market cap, scored deterministically (no LLM) for every lock period.
+    The first refresh loads every page; later refreshes fetch one page each, in
+    rotation, and rescore the whole table from local data. Technical scores (on the
+    lock period's timeframe) and fundamentals come from the candle store and the
+    fundamentals cache when the token has been analyzed before; otherwise the
+    scorers' no-data defaults apply.
+    """
+
+    def __init__(self, top_n: int = SCREENER_TOP_N, per_page: int = SCREENER_PER_PAGE):
+        self.top_n = top_n
+        self.per_page = per_page
+        self.table = ScreenerTable([], {}, version=0, updated_at=None)
+        self._rows: dict[str, dict] = {}
+        self._seen: dict[str, int] = {}  # token id -> refresh cycle it was last listed in
+        self._next_page = 1
+        self._cycle = 0
+
+        # Metrics
+        self.refreshes = 0
+        self.pages_fetched = 0
+        self.last_rescore_ms = 0.0
+
+    @property
+    def pages(self) -> int:
+        return math.ceil(self.top_n / self.per_page)
+
+    async def refresh(self):
+        """Fetch the next page of the ranking (all pages on the first run) and rescore"""
+        if not self._rows:
+            pages = list(range(1, self.pages + 1))
+        else:
+            pages = [self._next_page]
+            self._next_page = self._next_page % self.pages + 1
+            if self._next_page == 1:
+                self._cycle += 1
+
+        results = await asyncio.gather(
+            *(get_markets_page(page, self.per_page) for page in pages), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                print(f"Screener page fetch failed: {result}")
+                continue
+            self.pages_fetched += 1
+            for raw in result:
+                row = format_market_row(raw)
+                if row["market_cap_rank"] and row["market_cap_rank"] <= self.top_n:
+                    self._rows[row["id"]] = row
+                    self._seen[row["id"]] = self._cycle
+
+        # Tokens not listed for a full cycle have left the top N
+        for token_id in [t for t, cycle in self._seen.items() if cycle < self._cycle - 1]:
+            del self._seen[token_id]
+            self._rows.pop(token_id, None)
+
+        self.refreshes += 1
+        self.rescore()
+
+    def rescore(self):
+        """Score every row for every lock period from local data and publish a new table"""
+        started = time.perf_counter()
+        rows = sorted(self._rows.values(), key=lambda r: r["market_cap_rank"])
+        fundamentals = {key: value for key, value, _ in FUNDAMENTALS_CACHE.items() if value}
+        snapshot = get_trending_snapshot()
+
+        tokens = []
+        for row in rows:
+            extra = fundamentals.get(row["id"], {})
+            tokens.append({
+                **row,
+                "developer_data": extra.get("developer_data"),
+                "community_data": extra.get("community_data")
+            })
+
+        # Technical score and volatility per timeframe, as in analyze_token, from the
+        # memoised views of the cached candles; neutral defaults without candles
+        closes, periods = {}, {}
+        for timeframe in TIMEFRAMES:
+            closes[timeframe], periods[timeframe] = [], []
+            for row in rows:
+                view = timeframe_cache.peek(row["id"], timeframe)
+                closes[timeframe].append([candle[4] for candle in view[-31:]] if view is not None else [])
+                periods[timeframe].append(closes_per_year(view if view is not None else [], timeframe))
+        technical, volatility, has_ohlc = timeframe_technicals(closes, periods)
+
+        columns = token_columns(tokens, [row["id"] in snapshot for row in rows])
+        sentiment = sentiment_scores(columns)
+        on_chain = on_chain_scores(columns)
+        fundamental = fundamental_scores(columns)
+
+        scores = {}
+        for lock_period in LOCK_PERIODS:
+            timeframe = timeframe_for_lock_period(lock_period)
+            risk = risk_scores({**columns, "volatility": volatility[timeframe]}, lock_period)
+            overall = overall_scores(technical[timeframe], risk, sentiment, on_chain, fundamental)
+            scores[lock_period] = {
+                "technical": technical[timeframe],
+                "risk": risk,
+                "sentiment": sentiment,
+                "on_chain": on_chain,
+                "fundamental": fundamental,
+                "overall": overall,
+                "recommendation": recommendations(overall),
+                "has_ohlc": has_ohlc[timeframe]
+            }
+
+        # Swap in atomically so queries never see a half-built table
+        self.table = ScreenerTable(rows, scores, self.table.version + 1, time.time())
+        self.last_rescore_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def stats(self) -> dict:
+        return {
+            "tokens": len(self.table),
+            "version": self.table.version,
+            "age_seconds": round(time.time() - self.table.updated_at, 1) if self.table.updated_at else None,
+            "refreshes": self.refreshes,
+            "pages_fetched": self.pages_fetched,
+            "with_ohlc": {
+                lock_period: int(scores["has_ohlc"].sum()) for lock_period, scores in self.table.scores.items()
+            },
+            "last_rescore_ms": self.last_rescore_ms
+        }
+
+
+screener = Screener()
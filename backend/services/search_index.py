@@ -0,0 +1,140 @@
+import bisect
+import difflib
+import heapq
+import time
+from typing import Optional
+
+UNRANKED = 1_000_000
+# Queries this short match thousands of terms; their top results are precomputed
+SHORT_PREFIX_LEN = 2
+SHORT_PREFIX_TOP = 50
+
+
+class TokenSearchIndex:
+    """
+    In-memory token search over the CoinGecko coin list.
+    Prefix matching on symbol, name, name words and id via a sorted term list
+    (bisect), fuzzy matching over ranked tokens as a fallback. Results are
+    ordered by exact match first, then market_cap_rank.
+    """
+
+    def __init__(self):
+        self.tokens: list[dict] = []
+        self._terms: list[tuple[str, int]] = []  # (term, token index), sorted
+        self._fuzzy_terms: dict[str, list[int]] = {}  # ranked symbols/names -> token indexes
+        self._short_prefixes: dict[str, list[tuple[int, int]]] = {}  # prefix -> [(quality, index)]
+        self.built_at: Optional[float] = None
+
+        # Metrics
+        self.queries = 0
+        self.misses = 0
+        self.total_query_time = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    def build(self, coins: list[dict], ranked: list[dict]):
+        """
+        coins: /coins/list rows ({id, symbol, name})
+        ranked: /coins/markets rows (for market_cap_rank and image)
+        """
+        by_id = {row["id"]: row for row in ranked}
+        tokens = []
+        terms = []
+        fuzzy_terms: dict[str, list[int]] = {}
+
+        for coin in coins:
+            market = by_id.get(coin["id"], {})
+            image = market.get("image")
+            token = {
+                "id": coin["id"],
+                "name": coin["name"],
+                "symbol": (coin.get("symbol") or "").upper(),
+                "market_cap_rank": market.get("market_cap_rank"),
+                "thumb": image.replace("/large/", "/thumb/") if image else None
+            }
+            idx = len(tokens)
+            tokens.append(token)
+
+            symbol = token["symbol"].lower()
+            name = token["name"].lower()
+            keys = {symbol, name, coin["id"]}
+            keys.update(name.split())
+            terms.extend((key, idx) for key in keys if key)
+
+            if token["market_cap_rank"] is not None:
+                for key in (symbol, name):
+                    fuzzy_terms.setdefault(key, []).append(idx)
+
+        terms.sort()
+
+        def rank(idx: int) -> int:
+            return tokens[idx]["market_cap_rank"] or UNRANKED
+
+        candidates: dict[str, dict[int, int]] = {}
+        for term, idx in terms:
+            for n in range(1, min(SHORT_PREFIX_LEN, len(term)) + 1):
+                prefix_best = candidates.setdefault(term[:n], {})
+                quality = 0 if n == len(term) else 1
+                if prefix_best.get(idx, 2) > quality:
+                    prefix_best[idx] = quality
+        short_prefixes = {
+            prefix: [
+                (best[idx], idx)
+                for idx in heapq.nsmallest(SHORT_PREFIX_TOP, best, key=lambda idx: (best[idx], rank(idx)))
+            ]
+            for prefix, best in candidates.items()
+        }
+
+        # Swap in atomically so concurrent queries never see a half-built index
+        self.tokens, self._terms, self._fuzzy_terms = tokens, terms, fuzzy_terms
+        self._short_prefixes = short_prefixes
+        self.built_at = time.time()
+
+    def _rank(self, idx: int) -> int:
+        return self.tokens[idx]["market_cap_rank"] or UNRANKED
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """Ranked matches for a query (empty list on a miss)"""
+        started = time.perf_counter()
+        self.queries += 1
+        q = query.strip().lower()
+
+        best: dict[int, int] = {}  # token index -> 0 for exact match, 1 for prefix, 2 for fuzzy
+        if len(q) <= SHORT_PREFIX_LEN and limit <= SHORT_PREFIX_TOP:
+            best = {idx: quality for quality, idx in self._short_prefixes.get(q, [])}
+        else:
+            # Prefix matches: all terms in [q, q + max char)
+            lo = bisect.bisect_left(self._terms, (q,))
+            hi = bisect.bisect_left(self._terms, (q + "\uffff",))
+            for term, idx in self._terms[lo:hi]:
+                quality = 0 if term == q else 1
+                if best.get(idx, 2) > quality:
+                    best[idx] = quality
+
+        # Fuzzy matches over ranked tokens when nothing starts with the query (typos)
+        if not best and len(q) >= 3:
+            for term in difflib.get_close_matches(q, self._fuzzy_terms.keys(), n=limit, cutoff=0.75):
+                for idx in self._fuzzy_terms[term]:
+                    best.setdefault(idx, 2)
+
+        results = heapq.nsmallest(limit, best, key=lambda idx: (best[idx], self._rank(idx)))
+        if not results:
+            self.misses += 1
+
+        self.total_query_time += time.perf_counter() - started
+        return [self.tokens[idx] for idx in results]
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "tokens": len(self.tokens),
+            "built_at": self.built_at,
+            "queries": self.queries,
+            "misses": self.misses,
+            "avg_query_us": round(self.total_query_time / self.queries * 1e6, 1) if self.queries else 0.0
+        }
+
+
+search_index = TokenSearchIndex()
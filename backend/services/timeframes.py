@@ -0,0 +1,150 @@
+"""
+Timeframe views (4h, daily, weekly candles) derived from the cached CoinGecko
+series instead of separate OHLC requests per timeframe.
+
+CoinGecko's OHLC granularity follows `days`: the 30-day series has 4h candles
+(4h view as-is, daily by resampling) and the 365-day series has 4-day candles
+(weekly by resampling). Views are memoised per token and recomputed only when
+the candle store replaces the source series.
+
+The daily view only spans the 30-day series, i.e. about 30 closes: just enough
+for the 31-close indicator window (with 30 closes, volatility uses 29 returns).
+A week holds one or two 4-day candles, so weekly closes are 4 or 8 days apart;
+their volatility is annualized by the real close spacing (closes_per_year).
+"""
+import os
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+from .candle_store import candle_store, candle_interval_ms, DAY_MS
+
+HOUR_MS = 3_600_000
+WEEK_MS = 7 * DAY_MS
+YEAR_MS = 365 * DAY_MS
+WEEK_ORIGIN_MS = 4 * DAY_MS  # Weeks start on Monday 00:00 UTC (the epoch was a Thursday)
+
+MAX_VIEWS = int(os.getenv("TIMEFRAME_CACHE_MAX_VIEWS", "1500"))
+
+
+class Timeframe(NamedTuple):
+    source_days: str  # Cached series the view is built from
+    bucket_ms: int
+    origin_ms: int = 0
+
+    @property
+    def periods_per_year(self) -> float:
+        """For annualizing per-candle volatility"""
+        return YEAR_MS / self.bucket_ms
+
+    @property
+    def evenly_spaced(self) -> bool:
+        """Whether every bucket closes on a source candle bucket_ms after the previous one"""
+        return self.bucket_ms % candle_interval_ms(self.source_days) == 0
+
+
+TIMEFRAMES = {
+    "4h": Timeframe("30", 4 * HOUR_MS),
+    "1d": Timeframe("30", DAY_MS),
+    "1w": Timeframe("365", WEEK_MS, WEEK_ORIGIN_MS),
+}
+
+
+def timeframe_for_lock_period(lock_period: int) -> str:
+    """Candle size matching the deal horizon: 4h for 1 week, daily up to 4 weeks, weekly beyond"""
+    if lock_period <= 1:
+        return "4h"
+    if lock_period <= 4:
+        return "1d"
+    return "1w"
+
+
+def closes_per_year(candles, timeframe: str) -> float:
+    """
+    Closes per year of a timeframe view, for annualizing volatility: the
+    timeframe's candles per year when its closes are evenly spaced, otherwise
+    from the real spacing of the closes the volatility window reads (the last 30
+    intervals). Over uneven intervals the summed squared returns scale with the
+    summed time, so the mean spacing annualizes them without bias.
+    """
+    spec = TIMEFRAMES[timeframe]
+    if spec.evenly_spaced or len(candles) < 2:
+        return spec.periods_per_year
+    intervals = min(30, len(candles) - 1)
+    span = candles[-1][0] - candles[-1 - intervals][0]
+    return YEAR_MS * intervals / span if span > 0 else spec.periods_per_year
+
+
+def resample(candles, bucket_ms: int, origin_ms: int = 0):
+    """
+    Aggregate sorted [timestamp, open, high, low, close] candles into buckets of
+    bucket_ms. CoinGecko timestamps mark the candle close, so a candle belongs to
+    the bucket it closes in, and each output candle is stamped with the close
+    time of its last candle (the bucket's end once the bucket is complete). The
+    latest bucket may still be forming.
+    Returns the input unchanged if it already has this spacing, otherwise an (N, 5) array.
+    """
+    if len(candles) < 2:
+        return candles
+    ohlc = np.asarray(candles, dtype=np.float64)
+    timestamps = ohlc[:, 0]
+    if np.all(np.diff(timestamps) == bucket_ms) and (timestamps[0] - origin_ms) % bucket_ms == 0:
+        return candles
+
+    buckets = (timestamps - origin_ms - 1) // bucket_ms
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+    ends = np.concatenate([starts[1:], [len(ohlc)]]) - 1
+
+    resampled = np.empty((len(starts), 5))
+    resampled[:, 0] = timestamps[ends]
+    resampled[:, 1] = ohlc[starts, 1]
+    resampled[:, 2] = np.maximum.reduceat(ohlc[:, 2], starts)
+    resampled[:, 3] = np.minimum.reduceat(ohlc[:, 3], starts)
+    resampled[:, 4] = ohlc[ends, 4]
+    return resampled
+
+
+class TimeframeCache:
+    """Memoised timeframe views per (token, timeframe), keyed on the identity of the source series"""
+
+    def __init__(self, max_views: int = MAX_VIEWS):
+        self.max_views = max_views
+        self._views: OrderedDict[tuple[str, str], tuple[list, object]] = OrderedDict()
+
+        # Metrics
+        self.hits = 0
+        self.resamples = 0
+
+    async def get(self, token_id: str, timeframe: str):
+        """Candles of a timeframe (fetches/refreshes the source series through the candle store)"""
+        source = await candle_store.get_candles(token_id, days=TIMEFRAMES[timeframe].source_days)
+        return self._view(token_id, timeframe, source)
+
+    def peek(self, token_id: str, timeframe: str):
+        """View from an already cached source series, without any network I/O (None if not cached)"""
+        source = candle_store.peek(token_id, TIMEFRAMES[timeframe].source_days)
+        return self._view(token_id, timeframe, source) if source is not None else None
+
+    def _view(self, token_id: str, timeframe: str, source: list):
+        key = (token_id, timeframe)
+        cached = self._views.get(key)
+        if cached is not None and cached[0] is source:
+            self._views.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+        spec = TIMEFRAMES[timeframe]
+        view = resample(source, spec.bucket_ms, spec.origin_ms)
+        self.resamples += 1
+        self._views[key] = (source, view)
+        self._views.move_to_end(key)
+        while len(self._views) > self.max_views:
+            self._views.popitem(last=False)
+        return view
+
+    def stats(self) -> dict:
+        return {"views": len(self._views), "hits": self.hits, "resamples": self.resamples}
+
+
+timeframe_cache = TimeframeCache()
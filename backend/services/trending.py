@@ -0,0 +1,56 @@
+import os
+import time
+from typing import Optional
+
+from .coingecko import get_trending_tokens
+
+TRENDING_REFRESH_INTERVAL = float(os.getenv("TRENDING_REFRESH_INTERVAL", "300"))  # seconds
+
+
+class TrendingSnapshot:
+    """Immutable view of the trending list at one point in time"""
+
+    def __init__(self, tokens: list[dict], version: int, updated_at: Optional[float]):
+        self.tokens = tokens
+        self.ids = frozenset(t["id"] for t in tokens)
+        self.version = version
+        self.updated_at = updated_at
+
+    def __contains__(self, token_id: str) -> bool:
+        return token_id in self.ids
+
+
+_snapshot = TrendingSnapshot([], version=0, updated_at=None)
+
+
+def get_trending_snapshot() -> TrendingSnapshot:
+    """Current snapshot (no network I/O)"""
+    return _snapshot
+
+
+def is_trending(token_id: str) -> bool:
+    return token_id in _snapshot
+
+
+async def refresh_trending() -> TrendingSnapshot:
+    """Fetch the trending list and publish a new snapshot; keeps the old one on failure"""
+    global _snapshot
+    tokens = await get_trending_tokens()
+    if tokens:
+        _snapshot = TrendingSnapshot(tokens, version=_snapshot.version + 1, updated_at=time.time())
+    return _snapshot
+
+
+async def ensure_trending_snapshot() -> TrendingSnapshot:
+    """Load the first snapshot if the background refresher has not published one yet"""
+    if _snapshot.version == 0:
+        return await refresh_trending()
+    return _snapshot
+
+
+def get_trending_stats() -> dict:
+    return {
+        "version": _snapshot.version,
+        "size": len(_snapshot.ids),
+        "age_seconds": round(time.time() - _snapshot.updated_at, 1) if _snapshot.updated_at else None
+    }
@@ -1,10 +1,10 @@
 
 import asyncio
-from backend.services.coingecko import get_token_details
+from backend.services.coingecko import get_token_fundamentals
 
 async def inspect_coingecko_data():
     print("Fetching detailed data for 'solana'...")
-    data = await get_token_details('solana')
+    data = await get_token_fundamentals('solana')
     
     if not data:
         print("Failed to fetch data.")
@@ -15,9 +15,6 @@ async def inspect_coingecko_data():
     
     print("\n--- Developer Data ---")
     print(data.get('developer_data'))
-    
-    print("\n--- Public Interest ---")
-    print(data.get('public_interest_stats'))
 
 if __name__ == "__main__":
     asyncio.run(inspect_coingecko_data())
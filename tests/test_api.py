@@ -0,0 +1,64 @@
+import sys
+import os
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# The API modules import services the way the app does (from backend/)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from services import coingecko
+from api import analyze, deals, tokens
+
+
+def outage(status_code: int):
+    """Fresh caches and a CoinGecko that answers every call with status_code"""
+    coingecko.MAX_RETRIES = 0
+    coingecko.TOKEN_CACHE.clear()
+    coingecko.FUNDAMENTALS_CACHE.clear()
+    coingecko.rate_limiter = coingecko.TokenBucket(rate_per_minute=6000, burst=100, max_wait=5)
+    coingecko.http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(status_code, json={})),
+        base_url=coingecko.COINGECKO_BASE
+    )
+
+
+def api_client() -> TestClient:
+    app = FastAPI()
+    for module in (analyze, deals, tokens):
+        app.include_router(module.router, prefix="/api")
+    return TestClient(app)
+
+
+ENDPOINTS = [
+    ("GET", "/api/tokens/uniswap", None),
+    ("POST", "/api/tokens/uniswap/calculate?amount=100&discount=10&lock_period=4", None),
+    ("GET", "/api/tokens/uniswap/suggest-discount?lock_period=4", None),
+    ("POST", "/api/deals", {
+        "seller_address": "0x" + "1" * 40, "token_id": "uniswap", "token_symbol": "UNI",
+        "token_amount": 100, "price_per_token": 5, "discount": 10, "lock_period": 4
+    }),
+    ("POST", "/api/analyze", {"token_id": "uniswap", "lock_period": 4}),
+]
+
+
+def test_upstream_errors_are_mapped():
+    print("Testing CoinGecko failures on token endpoints...")
+    retries = coingecko.MAX_RETRIES
+    client = api_client()
+    try:
+        for upstream_status, expected in [(503, 502), (429, 429)]:
+            for method, url, body in ENDPOINTS:
+                outage(upstream_status)
+                response = client.request(method, url, json=body)
+                print(f"{method} {url.split('?')[0]} with upstream {upstream_status}: {response.status_code}")
+                assert response.status_code == expected, response.text
+    finally:
+        coingecko.MAX_RETRIES = retries
+        coingecko.http_client = None
+    print("✓ Upstream errors passed")
+
+
+if __name__ == "__main__":
+    test_upstream_errors_are_mapped()
@@ -0,0 +1,124 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import math
+import os
+import time
+
+import numpy as np
+
+from backend.services.backtest import run_backtest, cached_candles
+from backend.services.candle_store import candle_store
+from backend.services.batch_scoring import token_columns, score_tokens, recommendations
+from backend.services.deal_calculator import suggest_discount
+from backend.services.technical_analysis import TechnicalScorer
+
+DAY_MS = 86_400_000
+HOUR_MS = 3_600_000
+START_MS = 19_600 * DAY_MS
+
+
+def daily_candles(rng: np.random.Generator, days: int) -> list:
+    closes = 10 * np.exp(np.cumsum(rng.normal(0.001, 0.04, days)))
+    return [[START_MS + i * DAY_MS, c, c * 1.01, c * 0.99, c] for i, c in enumerate(closes.tolist())]
+
+
+def replay(candles: dict, tokens: dict, lock_period: int) -> dict:
+    """Deal returns per recommendation, one window at a time with the per-token scorers"""
+    returns = {}
+    horizon = lock_period * 7
+    for token_id, series in candles.items():
+        closes = [c[4] for c in series]
+        for end in range(30, len(series) - horizon):
+            technical = TechnicalScorer(series[:end + 1]).get_technical_score()
+            change_7d = (closes[end] / closes[end - 7] - 1) * 100
+            change_30d = (closes[end] / closes[end - 30] - 1) * 100
+            token = {**tokens.get(token_id, {}), "price_change_percentage_7d": change_7d}
+            scores = score_tokens(
+                token_columns([token], volatility=[technical["indicators"]["volatility"]]),
+                lock_period, technical=[technical["score"]]
+            )
+            discount = suggest_discount(
+                lock_period, float(scores["risk"][0]), (abs(change_7d) * 2 + abs(change_30d)) / 2
+            )["suggested_discount"]
+            market = (closes[end + horizon] / closes[end] - 1) * 100
+            deal = ((1 + market / 100) / (1 - discount / 100) - 1) * 100
+            returns.setdefault(str(recommendations(scores["overall"])[0]), []).append(deal)
+    return returns
+
+
+def test_backtest_matches_replay():
+    print("Testing backtest engine...")
+    rng = np.random.default_rng(5)
+    candles = {f"token-{i}": daily_candles(rng, 120) for i in range(12)}
+    tokens = {
+        "token-0": {"market_cap": 2e10, "total_volume": 3e9, "market_cap_rank": 15,
+                    "fully_diluted_valuation": 2.2e10},
+        "token-1": {"market_cap": 5e6, "total_volume": 20_000, "market_cap_rank": 900,
+                    "total_supply": 1e9, "circulating_supply": 1e8},
+        "token-2": {"market_cap": 8e8, "total_volume": 9e7, "market_cap_rank": 120,
+                    "developer_data": {"commit_count_4_weeks": 40, "stars": 2000}},
+    }
+    sources = {timeframe: candles for timeframe in ("4h", "1d", "1w")}
+
+    for report in run_backtest(sources, tokens, lock_periods=[1, 3]):
+        expected = replay(candles, tokens, report["lock_period"])
+        assert report["timeframe"] in ("4h", "1d") and report["candle_hours"] == 24
+        assert report["all"]["deals"] == sum(len(r) for r in expected.values())
+        for label, summary in report["buckets"].items():
+            deals = expected.get(label, [])
+            assert summary["deals"] == len(deals), (label, summary)
+            if deals:
+                assert summary["hit_rate"] == round(sum(d > 0 for d in deals) / len(deals) * 100, 1)
+                assert math.isclose(summary["total_pnl"], sum(deals) / 100 * 1000, abs_tol=0.02)
+
+    # A full year of daily candles for 500 tokens, every lock period
+    candles = {f"token-{i}": daily_candles(rng, 400) for i in range(500)}
+    started = time.perf_counter()
+    reports = run_backtest({timeframe: candles for timeframe in ("4h", "1d", "1w")}, discount=10)
+    elapsed = time.perf_counter() - started
+    print(f"Backtest: 500 tokens x 400 days, 8 lock periods in {elapsed:.2f}s")
+    assert [r["lock_period"] for r in reports] == list(range(1, 9))
+    assert reports[0]["all"]["deals"] == 500 * (400 - 30 - 7)
+    assert reports[-1]["timeframe"] == "1w" and reports[-1]["all"]["avg_discount_pct"] == 10
+    if os.getenv("RUN_BENCHMARKS"):  # Wall-clock budget: opt-in, loaded CI runners vary too much
+        assert elapsed < 10
+
+
+def cached_series(rng: np.random.Generator, count: int, step: int) -> list:
+    """CoinGecko-shaped candles: `count` candles of `step` ms, closing at the same instant"""
+    end = START_MS + 400 * DAY_MS
+    closes = 10 * np.exp(np.cumsum(rng.normal(0, 0.03, count)))
+    return [[end - (count - 1 - i) * step, c, c * 1.01, c * 0.99, c] for i, c in enumerate(closes.tolist())]
+
+
+def test_backtest_on_cached_series():
+    print("Testing backtest on cache-shaped candles...")
+    rng = np.random.default_rng(11)
+    # As cached: 30 days of 4h candles (4h and daily views), a year of 4-day candles (weekly view)
+    token_ids = [f"cached-{i}" for i in range(6)]
+    for token_id in token_ids:
+        candle_store.put(token_id, "30", cached_series(rng, 180, 4 * HOUR_MS))
+        candle_store.put(token_id, "365", cached_series(rng, 92, 4 * DAY_MS))
+
+    snapshot = cached_candles()
+    assert isinstance(snapshot["1d"]["cached-0"], np.ndarray), "Copied for the worker thread"
+    assert snapshot["1d"]["cached-0"].tolist() == candle_store.peek("cached-0", "30")
+    reports = run_backtest({tf: {t: snapshot[tf][t] for t in token_ids} for tf in snapshot})
+
+    for report in reports:
+        print(f"Lock {report['lock_period']}: {report['all']['deals']} deals on {report['candle_hours']}h candles, "
+              f"30d change for {report['price_change_30d_pct']}%")
+
+    assert all(r["tokens"] == r["tokens_with_candles"] == 6 and r["all"]["deals"] > 0 for r in reports)
+    # 4h windows from the 30-day series; daily windows need more than 30 days, so they use the year of 4-day candles
+    assert [r["candle_hours"] for r in reports] == [4] + [96] * 3 + [168] * 4
+    assert reports[0]["price_change_30d_pct"] == 0, "30 days of candles never hold a 30-day lookback"
+    assert reports[0]["all"]["deals"] == 6 * (180 - 42 - 42), "7d lookback and 1-week lock: 42 candles each"
+    assert all(r["price_change_30d_pct"] > 0 for r in reports[1:])
+
+
+if __name__ == "__main__":
+    test_backtest_matches_replay()
+    test_backtest_on_cached_series()
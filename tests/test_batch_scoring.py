@@ -0,0 +1,151 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import time
+
+import numpy as np
+
+from backend.services.batch_scoring import token_columns, score_tokens, technical_indicators, technical_scores, round1
+from backend.services.technical_analysis import TechnicalScorer
+from backend.services.risk_analysis import RiskScorer
+from backend.services.sentiment_analysis import SentimentScorer
+from backend.services.onchain_analysis import OnChainScorer
+from backend.services.fundamental_analysis import FundamentalScorer
+from backend.services.ai_scoring import calculate_overall_score
+from backend.services.screener import Screener
+
+
+def random_token(rng: random.Random) -> dict:
+    """Token data with values on and around every scorer threshold, and missing fields"""
+    def maybe(value):
+        return None if rng.random() < 0.1 else value
+
+    mcap = rng.choice([0, 1_000_000, 5e8, 2e10, rng.uniform(1e5, 1e11)])
+    ratio = rng.choice([0.01, 0.05, 0.10, 0.15, rng.uniform(0, 0.3)])
+    return {
+        "market_cap": maybe(mcap),
+        "total_volume": maybe(rng.choice([mcap * ratio, 100_000, 50_000])),
+        "fully_diluted_valuation": maybe(mcap * rng.choice([0, 1, 2, 5, 20, rng.uniform(1, 30)])),
+        "total_supply": maybe(rng.uniform(1e6, 1e9)),
+        "circulating_supply": maybe(rng.choice([0, rng.uniform(1e5, 1e9)])),
+        "market_cap_rank": maybe(rng.choice([0, 20, 50, 100, 200, 500, rng.randint(1, 3000)])),
+        "price_change_percentage_7d": maybe(rng.choice([-15, -5, 0, 10, rng.uniform(-40, 40)])),
+        "developer_data": maybe({
+            "commit_count_4_weeks": maybe(rng.choice([0, 30, 100, rng.randint(0, 300)])),
+            "stars": maybe(rng.choice([100, 1000, 5000, rng.randint(0, 20000)])),
+        }),
+        "community_data": maybe({
+            "twitter_followers": maybe(rng.choice([1_000, 10_000, 100_000, 500_000, rng.randint(0, 2_000_000)])),
+            "telegram_channel_user_count": maybe(rng.choice([2_000, 10_000, rng.randint(0, 50_000)])),
+        }),
+    }
+
+
+def test_batch_scores_match_per_token_scorers():
+    print("Testing batch scoring engine...")
+    rng = random.Random(7)
+
+    n = 3000
+    tokens = [random_token(rng) for _ in range(n)]
+    trending = [rng.random() < 0.1 for _ in range(n)]
+    volatility = [round(rng.choice([30, 60, 100, 150, rng.uniform(0, 250)]), 1) for _ in range(n)]
+    technical = [round(rng.uniform(0, 10), 1) for _ in range(n)]
+    lock_periods = np.array([rng.randint(1, 8) for _ in range(n)])
+
+    columns = token_columns(tokens, trending, volatility)
+    scores = score_tokens(columns, lock_periods, technical)
+
+    for i, token in enumerate(tokens):
+        risk = RiskScorer(token, volatility[i], int(lock_periods[i])).get_risk_score()["score"]
+        sentiment = SentimentScorer(token, trending[i]).get_sentiment_score()["score"]
+        on_chain = OnChainScorer(token).get_on_chain_score()["score"]
+        fundamental = FundamentalScorer(token, trending[i]).get_fundamental_score()["score"]
+        overall = calculate_overall_score(technical[i], risk, sentiment, on_chain, fundamental)
+
+        assert scores["risk"][i] == risk, (i, token, scores["risk"][i], risk)
+        assert scores["sentiment"][i] == sentiment, (i, token)
+        assert scores["on_chain"][i] == on_chain, (i, token)
+        assert scores["fundamental"][i] == fundamental, (i, token)
+        assert scores["overall"][i] == overall, (i, token)
+
+    # Technical score from raw indicators
+    indicators = []
+    expected = []
+    series = []
+    for _ in range(300):
+        price = 100.0
+        ohlc = []
+        step = rng.choice([0.01, 0.04, 0.1])
+        for k in range(rng.randint(1, 120)):
+            price *= 1 + rng.uniform(-step, step * 1.1)
+            ohlc.append([k, price, price, price, price])
+        scorer = TechnicalScorer(ohlc)
+        indicators.append((scorer.calculate_rsi(14), scorer.calculate_volatility(30), scorer.calculate_sma_deviation(20)))
+        expected.append(scorer.get_technical_score()["score"])
+        series.append([candle[4] for candle in ohlc])
+    rsi, vol, sma = (np.array(column) for column in zip(*indicators))
+    assert technical_scores(rsi, vol, sma).tolist() == expected
+
+    # Indicators for many series at once
+    batch_rsi, batch_vol, batch_sma = technical_indicators(series)
+    assert np.allclose(batch_rsi, rsi, rtol=1e-9, atol=1e-9)
+    assert np.allclose(batch_vol, vol, rtol=1e-9, atol=1e-9)
+    assert np.allclose(batch_sma, sma, rtol=1e-9, atol=1e-9)
+    assert technical_scores(batch_rsi, batch_vol, batch_sma).tolist() == expected
+
+    # Rounding matches Python's round() at binary near-ties
+    values = np.array([0.05, 0.15, 0.25, 0.35, 2.675, 3.85, 1.1 * 3.5, 7.45, 9.95])
+    assert round1(values).tolist() == [round(v, 1) for v in values.tolist()]
+
+    # Throughput: 10,000 tokens
+    big = token_columns(tokens * 4, trending * 4, volatility * 4)
+    started = time.perf_counter()
+    score_tokens(big, 4)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"Scored {len(tokens) * 4} tokens in {elapsed_ms:.2f}ms")
+    assert elapsed_ms < 100
+
+
+def test_screener_table():
+    print("Testing screener table...")
+    rng = random.Random(11)
+
+    screener = Screener(top_n=500)
+    for rank in range(1, 501):
+        token = random_token(rng)
+        token.update(id=f"token-{rank}", name=f"Token {rank}", symbol=f"t{rank}", market_cap_rank=rank,
+                     developer_data=None, community_data=None)
+        screener._rows[token["id"]] = token
+    screener.rescore()
+    table = screener.table
+    print(f"Rescored {len(table)} tokens x 8 lock periods in {screener.last_rescore_ms}ms")
+
+    total, items = table.query(lock_period=4, per_page=500)
+    overall = [item["scores"]["overall"] for item in items]
+    assert total == 500 and overall == sorted(overall, reverse=True)
+
+    # Rows match the per-token scorers (no cached candles: neutral technical score)
+    for item in items[:50]:
+        token = screener._rows[item["id"]]
+        risk = RiskScorer(token, 50.0, 4).get_risk_score()["score"]
+        sentiment = SentimentScorer(token, False).get_sentiment_score()["score"]
+        on_chain = OnChainScorer(token).get_on_chain_score()["score"]
+        fundamental = FundamentalScorer(token, False).get_fundamental_score()["score"]
+        assert item["scores"]["risk"] == risk
+        assert item["scores"]["overall"] == calculate_overall_score(5.0, risk, sentiment, on_chain, fundamental)
+
+    # Filters and pagination
+    total, page = table.query(lock_period=8, sort="risk", descending=False, page=2, per_page=10, min_overall=4.5)
+    print(f"Filtered: {total} rows, page 2: {[(i['id'], i['scores']['risk']) for i in page[:3]]}")
+    assert len(page) == min(10, max(0, total - 10))
+    assert all(i["scores"]["overall"] >= 4.5 for i in page)
+    assert [i["scores"]["risk"] for i in page] == sorted(i["scores"]["risk"] for i in page)
+    total, page = table.query(recommendation="HOLD", per_page=500)
+    assert all(i["recommendation"] == "HOLD" for i in page) and len(page) == total
+
+
+if __name__ == "__main__":
+    test_batch_scores_match_per_token_scorers()
+    test_screener_table()
@@ -8,7 +8,7 @@ from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', '.env'))
 
-from backend.services.ai_scoring import chat_about_token
+from backend.services.ai_scoring import chat_about_token, chat_messages
 
 # Mock Context (Result of previous analysis)
 MOCK_CONTEXT = {
@@ -43,5 +43,26 @@ async def test_chat():
     except Exception as e:
         print(f"Test failed: {e}")
 
+def test_compact_context():
+    print("Testing chat context compaction...")
+
+    context = dict(MOCK_CONTEXT, token_id="solana", image="https://example.com/sol.png",
+                   price_history_1y=[100 + i * 0.5 for i in range(365)],
+                   sparkline_in_7d=[150 + (i % 7) for i in range(168)])
+
+    first = chat_messages("Why is the fundamental score so high?", context)
+    second = chat_messages("What are the risks?", context)
+    raw_chars = len(json.dumps(context, indent=2))
+    compact_chars = len(first[1]["content"])
+    print(f"Context: {raw_chars} -> {compact_chars} chars")
+    print(first[1]["content"])
+
+    assert first[:2] == second[:2], "Prompt prefix must be identical across questions"
+    assert compact_chars < raw_chars / 10
+    assert '"points":365' in first[1]["content"] and '"change_pct":182.0' in first[1]["content"]
+    assert "image" not in first[1]["content"]
+
+
 if __name__ == "__main__":
+    test_compact_context()
     asyncio.run(test_chat())
@@ -0,0 +1,450 @@
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import tempfile
+import time
+import httpx
+
+from backend.services import coingecko
+from backend.services.cache import TTLCache
+from backend.services.candle_store import merge_candles, candle_store, DAY_MS
+from backend.services.timeframes import timeframe_cache, TIMEFRAMES, closes_per_year
+from backend.services import persistent_cache, ai_scoring, analysis_cache, batch_analysis
+from backend.services.search_index import TokenSearchIndex
+from backend.services.screener import Screener
+from backend.services.batcher import MicroBatcher
+
+UPSTREAM_CALLS = []
+THROTTLED_CALLS = []
+UNAVAILABLE_IDS = set()  # Tokens whose details/OHLC requests fail (transient 503)
+NO_DETAILS_IDS = set()  # Tokens CoinGecko has no /coins/{id} details for (404)
+UNLISTED_IDS = set()  # Tokens /coins/markets does not return
+BROKEN_IDS = set()  # /coins/markets fails for requests including these
+
+
+async def fake_coingecko(request: httpx.Request) -> httpx.Response:
+    """Minimal stand-in for the CoinGecko API"""
+    UPSTREAM_CALLS.append(request.url.path)
+    await asyncio.sleep(0.01)
+
+    if THROTTLED_CALLS:
+        THROTTLED_CALLS.pop()
+        return httpx.Response(429, headers={"Retry-After": "0"})
+    if any(request.url.path.startswith(f"/api/v3/coins/{i}") for i in UNAVAILABLE_IDS):
+        return httpx.Response(503, headers={"Retry-After": "0"})
+    if any(request.url.path == f"/api/v3/coins/{i}" for i in NO_DETAILS_IDS):
+        return httpx.Response(404)
+    if request.url.path.endswith("/coins/markets") and "page" in request.url.params:
+        per_page, page = int(request.url.params["per_page"]), int(request.url.params["page"])
+        return httpx.Response(200, json=[
+            {"id": f"coin-{rank}", "name": f"Coin {rank}", "symbol": f"c{rank}", "current_price": 1.0,
+             "market_cap": 1e12 / rank, "market_cap_rank": rank}
+            for rank in range((page - 1) * per_page + 1, page * per_page + 1)
+        ])
+    if request.url.path.endswith("/coins/list"):
+        return httpx.Response(200, json=[{"id": "uniswap", "symbol": "uni", "name": "Uniswap"}])
+    if request.url.path.endswith("/coins/markets"):
+        ids = request.url.params.get("ids", "").split(",")
+        if BROKEN_IDS & set(ids):
+            return httpx.Response(400)
+        return httpx.Response(200, json=[
+            {"id": i, "name": i.title(), "symbol": i[:3], "current_price": 1.0, "market_cap": 1e9}
+            for i in ids if i not in UNLISTED_IDS
+        ])
+    if request.url.path.endswith("/ohlc"):
+        # 4h candles for up to 30 days, 4-day candles beyond (closing at the timestamp)
+        days = int(request.url.params["days"])
+        step = 4 * 3_600_000 if days <= 30 else 4 * DAY_MS
+        end = 1_700_006_400_000
+        count = days * DAY_MS // step
+        return httpx.Response(200, json=[
+            [end - (count - 1 - i) * step, 10 + i % 5, 12 + i % 5, 9 + i % 5, 11 + i % 7] for i in range(count)
+        ])
+    if request.url.path.endswith("/search/trending"):
+        return httpx.Response(200, json={"coins": [{"item": {"id": "uniswap", "name": "Uniswap", "symbol": "UNI"}}]})
+    return httpx.Response(200, json={"developer_data": {"stars": 10}, "community_data": {}})
+
+
+def use_fake_upstream():
+    UPSTREAM_CALLS.clear()
+    coingecko.TOKEN_CACHE.clear()
+    coingecko.FUNDAMENTALS_CACHE.clear()
+    coingecko.rate_limiter = coingecko.TokenBucket(rate_per_minute=6000, burst=100, max_wait=5)
+    coingecko.http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(fake_coingecko),
+        base_url=coingecko.COINGECKO_BASE
+    )
+
+
+def test_concurrent_requests_are_coalesced():
+    print("Testing request coalescing...")
+
+    async def run():
+        use_fake_upstream()
+        before = coingecko.coingecko_flight.coalesced
+        results = await asyncio.gather(*[coingecko.get_token_data("uniswap") for _ in range(10)])
+        trending = await asyncio.gather(*[coingecko.get_trending_tokens() for _ in range(5)])
+        await coingecko.close_http_client()
+        return results, trending, coingecko.coingecko_flight.coalesced - before
+
+    results, trending, coalesced = asyncio.run(run())
+
+    print(f"Upstream calls: {UPSTREAM_CALLS}")
+    print(f"Coalesced: {coalesced}")
+
+    assert all(r["id"] == "uniswap" for r in results)
+    assert all(t[0]["id"] == "uniswap" for t in trending)
+    assert UPSTREAM_CALLS.count("/api/v3/coins/markets") == 1, "Markets should be fetched once"
+    assert UPSTREAM_CALLS.count("/api/v3/search/trending") == 1, "Trending should be fetched once"
+    assert coalesced == 9 + 9 + 4  # markets + fundamentals + trending
+
+
+def test_market_rows_are_batched():
+    print("Testing /coins/markets micro-batching...")
+
+    token_ids = [f"token-{i}" for i in range(40)]
+
+    async def run():
+        use_fake_upstream()
+        data = await coingecko.get_many_token_data(token_ids)
+        await coingecko.close_http_client()
+        return data
+
+    data = asyncio.run(run())
+
+    print(f"Markets calls: {UPSTREAM_CALLS.count('/api/v3/coins/markets')}")
+
+    assert set(data) == set(token_ids)
+    assert all(data[t]["id"] == t for t in token_ids)
+    assert UPSTREAM_CALLS.count("/api/v3/coins/markets") == 1, "All ids should share one markets call"
+
+
+def test_failed_batches_reach_their_callers():
+    print("Testing micro-batch failure handling...")
+
+    async def malformed(keys):
+        return [{"id": key} for key in keys]  # Not keyed by id: resolving the callers fails
+
+    async def run():
+        batcher = MicroBatcher("malformed", malformed, window=0.001)
+        results = await asyncio.gather(*(batcher.load(key) for key in ("a", "b")), return_exceptions=True)
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(run())
+
+    print(f"Results: {results}, stats: {stats}")
+
+    assert all(isinstance(r, AttributeError) for r in results), "Callers should get the error, not hang"
+    assert stats["batches"] == 1 and stats["in_flight"] == 0
+
+
+def test_rate_limited_requests_are_retried():
+    print("Testing 429 retry with Retry-After...")
+
+    async def run():
+        use_fake_upstream()
+        THROTTLED_CALLS.extend([429, 429])
+        retries_before = coingecko.retry_stats["retry_after_honoured"]
+        data = await coingecko.get_token_data("aave")
+        await coingecko.close_http_client()
+        return data, coingecko.retry_stats["retry_after_honoured"] - retries_before
+
+    data, honoured = asyncio.run(run())
+
+    print(f"Upstream calls: {UPSTREAM_CALLS}")
+    print(f"Retry-After honoured: {honoured}")
+
+    assert data and data["id"] == "aave", "Request should succeed after retries"
+    assert honoured == 2
+
+
+def test_stale_entries_are_served_while_refreshing():
+    print("Testing stale-while-revalidate...")
+
+    async def run():
+        use_fake_upstream()
+        coingecko.TOKEN_CACHE.set("uniswap", {"id": "uniswap", "name": "Old"}, stored_at=time.time() - 120)
+        stale = await coingecko.get_token_data("uniswap")
+        await asyncio.sleep(0.1)  # let the background refresh land
+        refreshed = await coingecko.get_token_data("uniswap")
+        await coingecko.close_http_client()
+        return stale, refreshed
+
+    stale, refreshed = asyncio.run(run())
+
+    print(f"Stale: {stale['name']}, Refreshed: {refreshed['name']}")
+
+    assert stale["name"] == "Old", "Stale entry should be served without waiting"
+    assert refreshed["name"] == "Uniswap", "Entry should be refreshed in the background"
+
+
+def test_token_cache_evicts_least_recently_used():
+    print("Testing LRU eviction...")
+
+    cache = TTLCache("test", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    print(cache.stats())
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache, "Least recently used entry should be evicted"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_fundamentals_outlive_market_data():
+    print("Testing tiered TTLs...")
+
+    async def run():
+        use_fake_upstream()
+        await coingecko.get_token_data("uniswap")
+        coingecko.TOKEN_CACHE.clear()  # market tier expires long before fundamentals
+        UPSTREAM_CALLS.clear()
+        data = await coingecko.get_token_data("uniswap")
+        await coingecko.close_http_client()
+        return data
+
+    data = asyncio.run(run())
+
+    print(f"Upstream calls on market refresh: {UPSTREAM_CALLS}")
+
+    assert UPSTREAM_CALLS == ["/api/v3/coins/markets"], "Fundamentals should come from the long-lived tier"
+    assert data["developer_data"] == {"stars": 10}
+
+
+def test_candle_tail_merges_by_timestamp():
+    print("Testing OHLC tail merge...")
+
+    step = 4 * DAY_MS
+    history = [[i * step, 1, 2, 0.5, 1.0] for i in range(100)]
+    # Tail re-sends the last two candles (the newest one updated) plus one new candle
+    tail = [[98 * step, 1, 2, 0.5, 1.0], [99 * step, 1, 3, 0.5, 2.5], [100 * step, 2, 3, 1.5, 2.0]]
+
+    merged = merge_candles(history, tail, "365")
+
+    print(f"Merged: {len(merged)} candles, last close {merged[-1][4]}")
+
+    assert merged[-1] == tail[-1]
+    assert merged[-2][4] == 2.5, "Updated candle should replace the cached one"
+    assert merged[0][0] >= merged[-1][0] - 365 * DAY_MS, "Series should be trimmed to the horizon"
+    assert merge_candles(history, [[98 * step + 1, 1, 1, 1, 1]], "365") is None, "Misaligned tail should be rejected"
+
+
+def test_timeframe_views_share_cached_series():
+    print("Testing timeframe views...")
+    use_fake_upstream()
+
+    async def views():
+        return await asyncio.gather(*(timeframe_cache.get("uniswap", tf) for tf in ("4h", "1d", "1w")))
+
+    four_hour, daily, weekly = asyncio.run(views())
+    ohlc_calls = [path for path in UPSTREAM_CALLS if path.endswith("/ohlc")]
+    print(f"OHLC requests: {len(ohlc_calls)}, candles 4h/1d/1w: {len(four_hour)}/{len(daily)}/{len(weekly)}")
+
+    assert len(ohlc_calls) == 2, "One 30-day and one 365-day series serve all timeframes"
+    assert four_hour is candle_store.peek("uniswap", "30"), "Native 4h candles are used as-is"
+
+    # Daily candles aggregate the six 4h candles closing in each day
+    source = candle_store.peek("uniswap", "30")
+    day_end = daily[1][0]
+    members = [c for c in source if day_end - DAY_MS < c[0] <= day_end]
+    assert len(members) == 6 and day_end % DAY_MS == 0
+    assert list(daily[1][1:]) == [members[0][1], max(c[2] for c in members), min(c[3] for c in members), members[-1][4]]
+
+    # One weekly candle per Monday-based week, stamped with its last 4-day candle's close time
+    weeks = [(ts - TIMEFRAMES["1w"].origin_ms - 1) // (7 * DAY_MS) for ts in weekly[:, 0]]
+    assert [b - a for a, b in zip(weeks, weeks[1:])] == [1] * (len(weeks) - 1)
+    assert {b - a for a, b in zip(weekly[:-1, 0], weekly[1:, 0])} == {4 * DAY_MS, 8 * DAY_MS}
+    assert weekly[-1][4] == candle_store.peek("uniswap", "365")[-1][4]
+
+    # Uneven weekly closes are annualized by their real spacing
+    assert closes_per_year(daily, "1d") == 365 and closes_per_year(four_hour, "4h") == 365 * 6
+    assert closes_per_year(weekly, "1w") == 365 * 30 / ((weekly[-1][0] - weekly[-31][0]) / DAY_MS)
+
+    # Memoised until the source series changes
+    calls = len(UPSTREAM_CALLS)
+    assert asyncio.run(timeframe_cache.get("uniswap", "1d")) is daily
+    assert len(UPSTREAM_CALLS) == calls
+
+
+def test_degraded_analyses_are_not_cached():
+    print("Testing analysis cache with missing inputs...")
+    UNAVAILABLE_IDS.add("degraded-coin")
+    NO_DETAILS_IDS.add("long-tail-coin")
+
+    async def llm_narrative(token_data, lock_period, r):
+        return {**ai_scoring.deterministic_analysis(token_data, lock_period, r), "narrative_source": "llm"}
+
+    async def run():
+        use_fake_upstream()
+        analysis_cache.ANALYSIS_CACHE.clear()
+        healthy = await coingecko.get_token_data("healthy-coin")
+        degraded = await coingecko.get_token_data("degraded-coin")
+        long_tail = await coingecko.get_token_data("long-tail-coin")
+        results = [await analysis_cache.get_or_analyze(token, 4) for token in (healthy, degraded, long_tail)]
+        streamed = [event async for event in analysis_cache.stream_or_analyze(degraded, 2)]
+        await coingecko.close_http_client()
+        return results, streamed[-1]["analysis"]
+
+    original = ai_scoring.generate_narrative
+    ai_scoring.generate_narrative = llm_narrative
+    try:
+        (healthy, degraded, long_tail), streamed = asyncio.run(run())
+    finally:
+        ai_scoring.generate_narrative = original
+        UNAVAILABLE_IDS.clear()
+        NO_DETAILS_IDS.clear()
+
+    print(f"Missing inputs: {healthy['missing_inputs']} / {degraded['missing_inputs']} / {long_tail['missing_inputs']}")
+
+    assert healthy["missing_inputs"] == [] and degraded["missing_inputs"] == ["ohlc", "fundamentals"]
+    assert streamed["missing_inputs"] == ["ohlc", "fundamentals"]
+    assert degraded["scores"]["technical"] == 5.0
+    assert analysis_cache.get_cached_analysis("healthy-coin", 4) is not None
+    assert analysis_cache.get_cached_analysis("degraded-coin", 4) is None, "Retry the fetch on the next request"
+    assert analysis_cache.get_cached_analysis("degraded-coin", 2) is None
+    # No details on CoinGecko (404) is not a failed fetch: nothing to retry
+    assert long_tail["missing_inputs"] == []
+    assert analysis_cache.get_cached_analysis("long-tail-coin", 4) is not None
+
+
+def test_batch_analysis_statuses():
+    print("Testing batch analysis...")
+    UNAVAILABLE_IDS.add("batch-degraded")
+    UNLISTED_IDS.add("batch-unlisted")
+    lock_periods = [1, 4, 8]
+
+    async def collect(token_ids):
+        return {r["token_id"]: r async for r in batch_analysis.analyze_batch(token_ids, lock_periods)}
+
+    async def run():
+        use_fake_upstream()
+        results = await collect(["uniswap", "batch-ok", "batch-degraded", "batch-unlisted"])
+        sweeps = {
+            token_id: await ai_scoring.analyze_lock_periods(results[token_id]["token_data"], lock_periods)
+            for token_id in ("uniswap", "batch-ok", "batch-degraded")
+        }
+        BROKEN_IDS.add("batch-broken")
+        coingecko.TOKEN_CACHE.clear()
+        failed = await collect(["batch-ok", "batch-broken"])
+        await coingecko.close_http_client()
+        return results, sweeps, failed
+
+    try:
+        results, sweeps, failed = asyncio.run(run())
+    finally:
+        UNAVAILABLE_IDS.clear()
+        UNLISTED_IDS.clear()
+        BROKEN_IDS.clear()
+
+    print(f"Statuses: {({t: r['status'] for t, r in results.items()})}, upstream down: {failed['batch-ok']}")
+
+    assert results["uniswap"]["status"] == "ok" and results["batch-ok"]["status"] == "ok"
+    assert results["batch-degraded"]["status"] == "degraded"
+    assert results["batch-degraded"]["missing_inputs"] == ["ohlc", "fundamentals"]
+    assert results["batch-unlisted"]["status"] == "not_found"
+    assert [r["status"] for r in failed.values()] == ["error", "error"], "Upstream errors are not 'not found'"
+
+    # Vectorized scoring matches the per-token sweep
+    for token_id, sweep in sweeps.items():
+        analyses = [analysis for _, analysis in results[token_id]["analyses"]]
+        assert all(a.pop("price_history_1y") == sweep["price_history_1y"] for a in analyses)
+        assert analyses == sweep["periods"], token_id
+        assert results[token_id]["missing_inputs"] == sweep["missing_inputs"]
+
+
+def test_screener_shares_pages_with_search_index():
+    print("Testing markets page sharing...")
+
+    async def run():
+        use_fake_upstream()
+        screener = Screener(top_n=500)
+        await asyncio.gather(screener.refresh(), coingecko.refresh_search_index())
+        await coingecko.close_http_client()
+        return screener
+
+    screener = asyncio.run(run())
+    page_calls = UPSTREAM_CALLS.count("/api/v3/coins/markets")
+    print(f"Markets page calls: {page_calls}, screener rows: {len(screener.table)}")
+
+    # Pages 1-2 of the screener's top 500 come from the search index's pages 1-4
+    assert page_calls == coingecko.SEARCH_INDEX_RANKED_PAGES
+    assert screener.pages_fetched == 2 and len(screener.table) == 500
+
+
+def test_caches_survive_restart():
+    print("Testing persistent cache round-trip...")
+
+    path = os.path.join(tempfile.mkdtemp(), "coingecko.db")
+    persistent_cache.CACHE_DB_PATH = path
+
+    coingecko.TOKEN_CACHE.clear()
+    coingecko.TOKEN_CACHE.set("uniswap", {"id": "uniswap"})
+    coingecko.TOKEN_CACHE.set("expired", {"id": "expired"}, stored_at=time.time() - 10 * 86400)
+
+    persistent_cache.restore_caches()
+    asyncio.run(persistent_cache.close_persistent_cache())
+
+    coingecko.TOKEN_CACHE.clear()  # simulated restart
+    persistent_cache.restore_caches()
+    asyncio.run(persistent_cache.close_persistent_cache())
+    persistent_cache.CACHE_DB_PATH = None
+
+    print(f"Restored keys: {[k for k, _, _ in coingecko.TOKEN_CACHE.items()]}")
+
+    assert coingecko.TOKEN_CACHE.get("uniswap") == {"id": "uniswap"}
+    assert "expired" not in coingecko.TOKEN_CACHE, "Entries past their TTL should not be restored"
+
+
+def test_search_index_ranks_by_market_cap():
+    print("Testing local search index...")
+
+    index = TokenSearchIndex()
+    index.build(
+        coins=[
+            {"id": "uniswap", "symbol": "uni", "name": "Uniswap"},
+            {"id": "unicorn-token", "symbol": "unicorn", "name": "Unicorn Token"},
+            {"id": "universe", "symbol": "uniq", "name": "Universe"},
+            {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+            {"id": "wrapped-bitcoin", "symbol": "wbtc", "name": "Wrapped Bitcoin"},
+        ],
+        ranked=[
+            {"id": "bitcoin", "market_cap_rank": 1},
+            {"id": "wrapped-bitcoin", "market_cap_rank": 15},
+            {"id": "uniswap", "market_cap_rank": 25},
+            {"id": "universe", "market_cap_rank": 900},
+        ]
+    )
+
+    uni = [t["id"] for t in index.search("uni")]
+    bitcoin = [t["id"] for t in index.search("bitcoin")]
+    typo = [t["id"] for t in index.search("bitcoim")]
+
+    print(f"uni: {uni}, bitcoin: {bitcoin}, bitcoim: {typo}")
+
+    assert uni == ["uniswap", "universe", "unicorn-token"], "Exact symbol first, then by rank, unranked last"
+    assert bitcoin == ["bitcoin", "wrapped-bitcoin"], "Name words should match"
+    assert typo[0] == "bitcoin", "Fuzzy match should catch typos"
+    assert index.search("zzzz") == []
+
+
+if __name__ == "__main__":
+    test_concurrent_requests_are_coalesced()
+    test_market_rows_are_batched()
+    test_failed_batches_reach_their_callers()
+    test_rate_limited_requests_are_retried()
+    test_stale_entries_are_served_while_refreshing()
+    test_token_cache_evicts_least_recently_used()
+    test_fundamentals_outlive_market_data()
+    test_candle_tail_merges_by_timestamp()
+    test_timeframe_views_share_cached_series()
+    test_degraded_analyses_are_not_cached()
+    test_batch_analysis_statuses()
+    test_screener_shares_pages_with_search_index()
+    test_caches_survive_restart()
+    test_search_index_ranks_by_market_cap()
@@ -0,0 +1,80 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import math
+import random
+import time
+
+from backend.services.indicators import IndicatorState
+from backend.services.technical_analysis import TechnicalScorer
+
+
+def reference(candles: list) -> tuple[float, float, float]:
+    scorer = TechnicalScorer(candles)
+    return scorer.calculate_rsi(14), scorer.calculate_volatility(30), scorer.calculate_sma_deviation(20)
+
+
+def assert_close(actual: tuple, expected: tuple):
+    for a, e in zip(actual, expected):
+        assert math.isclose(a, e, rel_tol=1e-9, abs_tol=1e-9), (actual, expected)
+
+
+def test_incremental_indicators():
+    print("Testing incremental indicators...")
+    rng = random.Random(3)
+
+    for _ in range(100):
+        state = IndicatorState()
+        candles = []
+        price = 100.0
+        for i in range(rng.randint(1, 200)):
+            # Flat stretches exercise the loss-free / gain-free RSI windows
+            if rng.random() > 0.3:
+                price *= 1 + rng.uniform(-0.05, 0.05)
+            candles.append([i * 1000, price, price, price, price])
+            state.update(candles[-1])
+
+            # The forming candle is revised in place
+            if rng.random() < 0.3:
+                price *= 1 + rng.uniform(-0.01, 0.01)
+                candles[-1] = [i * 1000, price, price, price, price]
+                state.update(candles[-1])
+
+            assert_close(state.indicators(), reference(candles))
+        assert state.technical_score() == TechnicalScorer(candles).get_technical_score()
+
+        # Serialised alongside the candles
+        restored = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+        assert_close(restored.indicators(), state.indicators())
+
+        # A merged tail: the last candle revised plus new candles
+        merged = candles[:-1] + [[candles[-1][0], 0, 0, 0, price * 1.02]] + [
+            [(len(candles) + j) * 1000, 0, 0, 0, price * (1 + 0.01 * j)] for j in range(5)
+        ]
+        synced = restored.sync(merged)
+        assert synced is restored, "New candles are applied incrementally"
+        assert_close(synced.indicators(), reference(merged))
+
+        # An older close changed: the state is rebuilt
+        if len(merged) > 3:
+            revised = [list(c) for c in merged]
+            revised[-3][4] *= 1.1
+            rebuilt = synced.sync(revised)
+            assert rebuilt is not synced
+            assert_close(rebuilt.indicators(), reference(revised))
+
+    # Appending is O(1): the cost does not depend on history length
+    state = IndicatorState.from_candles([[i, 0, 0, 0, 100 + i % 5] for i in range(400)])
+    started = time.perf_counter()
+    for i in range(400, 50_400):
+        state.update([i, 0, 0, 0, 100 + i % 5 + (i % 3) * 0.1])
+    elapsed_us = (time.perf_counter() - started) / 50_000 * 1e6
+    print(f"Update: {elapsed_us:.1f}us per candle")
+    assert_close(state.indicators(), reference([[i, 0, 0, 0, 100 + i % 5 + (i % 3) * 0.1] for i in range(50_000, 50_400)]))
+    assert elapsed_us < 100
+
+
+if __name__ == "__main__":
+    test_incremental_indicators()
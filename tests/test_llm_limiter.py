@@ -0,0 +1,74 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+from backend.services.llm_limiter import LLMLimiter, LLMUnavailable
+
+
+def test_llm_limiter_bounds_latency():
+    print("Testing LLM limiter...")
+
+    async def slow_llm():
+        await asyncio.sleep(1.0)
+        return "narrative"
+
+    async def fast_llm():
+        await asyncio.sleep(0.05)
+        return "narrative"
+
+    async def call(limiter, fn):
+        try:
+            return await limiter.run(fn)
+        except LLMUnavailable as e:
+            return f"fallback: {e}"
+
+    async def scenario():
+        # Slow model: every call is cut off at the deadline
+        limiter = LLMLimiter(max_concurrency=2, max_queue=2, timeout=0.2)
+        results = await asyncio.gather(*(call(limiter, slow_llm) for _ in range(6)))
+        print(f"Slow model: {limiter.stats()}")
+
+        assert all(r.startswith("fallback") for r in results), "No caller should wait past the deadline"
+        assert limiter.rejected == 2, "Callers beyond the queue limit fail fast"
+        assert limiter.timeouts == 4
+        assert limiter.in_flight == 0 and limiter.waiting == 0
+
+        # Healthy model: calls queue for a slot and complete
+        limiter = LLMLimiter(max_concurrency=2, max_queue=10, timeout=1.0)
+        results = await asyncio.gather(*(call(limiter, fast_llm) for _ in range(6)))
+        print(f"Fast model: {limiter.stats()}")
+
+        assert results == ["narrative"] * 6
+        assert limiter.completed == 6 and limiter.stats()["fast_fallback_rate"] == 0.0
+
+        # Slow stream: cut off at the stream deadline, releasing the slot for the queued caller
+        async def slow_stream():
+            for i in range(100):
+                await asyncio.sleep(0.01)
+                yield f"token {i}"
+
+        async def stream(limiter):
+            received = []
+            try:
+                async with limiter.slot() as slot:
+                    async for item in slot.stream(slow_stream(), timeout=0.1):
+                        received.append(item)
+            except LLMUnavailable:
+                pass
+            return received
+
+        limiter = LLMLimiter(max_concurrency=1, max_queue=1, timeout=5.0)
+        first, second = await asyncio.gather(stream(limiter), stream(limiter))
+        print(f"Streamed: {len(first)}, {len(second)} of 100, {limiter.stats()}")
+
+        assert 0 < len(first) < 100 and 0 < len(second) < 100, "Both streams are cut short"
+        assert limiter.timeouts == 2 and limiter.rejected == 0
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_llm_limiter_bounds_latency()
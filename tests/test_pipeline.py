@@ -0,0 +1,44 @@
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+from backend.services.pipeline import Stage, run_pipeline
+
+
+def test_independent_stages_run_concurrently():
+    print("Testing DAG pipeline...")
+
+    events = []
+
+    async def slow(value):
+        events.append(("start", value))
+        await asyncio.sleep(0.1)
+        events.append(("end", value))
+        return value
+
+    stages = [
+        Stage("a", lambda r: slow(1)),
+        Stage("b", lambda r: slow(2)),
+        Stage("sum", lambda r: r["a"] + r["b"], ("a", "b")),
+        Stage("unused", lambda r: slow(3)),
+    ]
+
+    results, timings = asyncio.run(run_pipeline("test", stages, targets=["sum"]))
+
+    print(f"Events: {events}, Timings: {timings}")
+
+    assert results["sum"] == 3
+    assert "unused" not in results, "Only stages needed for the targets should run"
+    assert {e for e in events[:2]} == {("start", 1), ("start", 2)}, "Independent stages should overlap"
+
+    # Pre-seeded results are not recomputed
+    results, timings = asyncio.run(run_pipeline("test", stages, targets=["sum"], results={"a": 10, "b": 5}))
+    assert results["sum"] == 15
+    assert set(timings) == {"sum"}
+
+
+if __name__ == "__main__":
+    test_independent_stages_run_concurrently()
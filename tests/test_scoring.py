@@ -3,6 +3,9 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import math
+import time
+
 from backend.services.technical_analysis import TechnicalScorer
 
 def test_technical_scorer():
@@ -65,6 +68,103 @@ def test_technical_scorer():
     print("\nTests Passed!")
 
 
+def reference_indicators(closes: list[float]) -> tuple[float, float, float]:
+    """RSI(14), volatility(30) and SMA20 deviation computed with plain Python"""
+    deltas = [closes[i] - closes[i-1] for i in range(1, len(closes))]
+    rsi = 50.0
+    if len(closes) >= 15:
+        avg_gain = sum(d for d in deltas[-14:] if d > 0) / 14
+        avg_loss = sum(-d for d in deltas[-14:] if d < 0) / 14
+        rsi = 100.0 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss))
+
+    volatility = 0.0
+    if len(closes) >= 30:
+        returns = [math.log(closes[i] / closes[i-1]) for i in range(1, len(closes))][-30:]
+        mean = sum(returns) / len(returns)
+        volatility = math.sqrt(sum((r - mean) ** 2 for r in returns) / len(returns)) * math.sqrt(365) * 100
+
+    sma_dev = 0.0
+    if len(closes) >= 20:
+        sma = sum(closes[-20:]) / 20
+        sma_dev = (closes[-1] - sma) / sma * 100
+    return rsi, volatility, sma_dev
+
+
+def test_technical_scorer_matches_reference():
+    print("Testing TechnicalScorer against plain Python indicators...")
+    import random
+    rng = random.Random(5)
+
+    for _ in range(200):
+        price = 100.0
+        ohlc = []
+        for i in range(rng.randint(0, 400)):
+            price *= 1 + rng.uniform(-0.08, 0.085)
+            ohlc.append([1000 + i, price, price * 1.01, price * 0.99, price])
+        closes = [candle[4] for candle in ohlc]
+        rng.shuffle(ohlc)  # Sorted by timestamp internally
+
+        scorer = TechnicalScorer(ohlc)
+        rsi, volatility, sma_dev = reference_indicators(closes)
+        assert math.isclose(scorer.calculate_rsi(14), rsi, rel_tol=1e-9, abs_tol=1e-9)
+        assert math.isclose(scorer.calculate_volatility(30), volatility, rel_tol=1e-9, abs_tol=1e-9)
+        assert math.isclose(scorer.calculate_sma_deviation(20), sma_dev, rel_tol=1e-9, abs_tol=1e-9)
+
+    # A year of daily candles
+    ohlc = [[i, 100.0 + i % 7, 101.0, 99.0, 100.0 + i % 7] for i in range(365)]
+    started = time.perf_counter()
+    for _ in range(100):
+        TechnicalScorer(ohlc).get_technical_score()
+    elapsed_us = (time.perf_counter() - started) / 100 * 1e6
+    print(f"Scored 365 candles in {elapsed_us:.0f}us")
+    if os.getenv("RUN_BENCHMARKS"):  # Wall-clock budget: opt-in, loaded CI runners vary too much
+        assert elapsed_us < 5000
+
+
+
+from backend.services.indicator_suite import ema, drawdowns_by_horizon
+
+def test_extended_indicators():
+    print("Testing extended indicators...")
+    import random
+    rng = random.Random(9)
+
+    price = 100.0
+    ohlc = []
+    for i in range(120):
+        price *= 1 + rng.uniform(-0.06, 0.06)
+        ohlc.append([i * 4 * 86_400_000, price, price * 1.03, price * 0.96, price])  # 4-day candles
+    closes = [candle[4] for candle in ohlc]
+
+    # EMA matches the recursive definition
+    expected = [closes[0]]
+    for close in closes[1:]:
+        expected.append(expected[-1] + (2 / 13) * (close - expected[-1]))
+    assert all(math.isclose(a, b, rel_tol=1e-12) for a, b in zip(ema(TechnicalScorer(ohlc).closes, 12), expected))
+
+    # Drawdown within a horizon matches a brute-force scan over (peak, trough) pairs
+    by_lag = drawdowns_by_horizon(TechnicalScorer(ohlc).closes, 14)
+    for lag in (1, 2, 7, 14):
+        brute = max(
+            (1 - closes[j] / closes[i]) * 100
+            for j in range(len(closes)) for i in range(max(0, j - lag), j + 1)
+        )
+        assert math.isclose(by_lag[lag], brute, abs_tol=1e-9)
+
+    indicators = TechnicalScorer(ohlc).get_technical_score()["indicators"]
+    extended = TechnicalScorer(ohlc).calculate_extended_indicators()
+    print(f"Indicators: {indicators}")
+    print(f"Extended: {extended}")
+    assert extended["bollinger_width"] > 0 and extended["atr_pct"] > 0 and extended["tr_volatility"] > 0
+    assert math.isclose(extended["macd_histogram_pct"], extended["macd_pct"] - extended["macd_signal_pct"], abs_tol=0.011)
+
+    # 1 week = 2 four-day candles; longer locks can only see deeper drawdowns
+    drawdowns = extended["max_drawdown_by_lock_period"]
+    assert drawdowns[1] == round(by_lag[2], 1) and drawdowns[8] == round(by_lag[14], 1)
+    assert list(drawdowns.values()) == sorted(drawdowns.values())
+    assert drawdowns[8] <= extended["max_drawdown"]
+
+
 from backend.services.risk_analysis import RiskScorer
 
 def test_risk_scorer():
@@ -139,9 +239,67 @@ def test_fundamental_scorer():
     assert result_dead['score'] < 5.0, "Dead token should have low score"
 
 
+
+from backend.services import ai_scoring, trending
+from backend.services.candle_store import candle_store
+from backend.services.pipeline import run_pipeline
+
+def test_lock_period_sweep():
+    print("Testing lock period sweep...")
+    import asyncio
+
+    token = {
+        "id": "sweep-coin", "name": "Sweep Coin", "symbol": "swp",
+        "market_cap": 500_000_000, "total_volume": 20_000_000,
+        "fully_diluted_valuation": 2_000_000_000, "market_cap_rank": 120,
+        "price_change_percentage_7d": 4.2, "developer_data": None, "community_data": None
+    }
+    # Local data only: cached candles (4-day candles for 1y, 4h candles for 30 days)
+    # and a published trending snapshot
+    now = 1_700_006_400_000
+    day, hour = 86_400_000, 3_600_000
+    candle_store.put(token["id"], "365", [
+        [now - (91 - i) * 4 * day, 1, 2, 0.5, 1 + (i * 37 % 11) / 10] for i in range(92)
+    ])
+    candle_store.put(token["id"], "30", [
+        [now - (179 - i) * 4 * hour, 1, 2, 0.5, 1 + (i * 13 % 7) / 10 + i / 100] for i in range(180)
+    ])
+    trending._snapshot = trending.TrendingSnapshot([{"id": token["id"]}], version=1, updated_at=None)
+
+    sweep = asyncio.run(ai_scoring.analyze_lock_periods(token))
+    print(f"Overall by lock period: {[p['scores']['overall'] for p in sweep['periods']]}")
+
+    assert [p["lock_period"] for p in sweep["periods"]] == list(range(1, 9))
+    for period in sweep["periods"]:
+        r, _ = asyncio.run(run_pipeline(
+            "test", ai_scoring.analysis_stages(token, period["lock_period"]), targets=["overall"]
+        ))
+        single = ai_scoring.deterministic_analysis(token, period["lock_period"], r)
+        assert r["technical"]["timeframe"] == ai_scoring.timeframe_for_lock_period(period["lock_period"])
+        assert period["scores"] == single["scores"], "Sweep must match a single-period analysis"
+        assert period["recommendation"] == single["recommendation"]
+        assert period["expected_return"] == single["expected_return"]
+
+    risks = [p["scores"]["risk"] for p in sweep["periods"]]
+    assert risks == sorted(risks), "Longer locks should not lower risk"
+
+    # Extended indicators are reported with the technical stage (not scored) and feed the prompt
+    indicators = r["technical"]["indicators"]
+    for name in ("ema_12", "ema_26", "macd_pct", "bollinger_width", "atr_pct", "tr_volatility", "max_drawdown"):
+        assert name in indicators, name
+    assert 8 in indicators["max_drawdown_by_lock_period"]
+    prompt = ai_scoring.scorecard_prompt(token, 8, r)
+    assert "MACD histogram" in prompt and "Worst drawdown in any 8-week window" in prompt
+
 if __name__ == "__main__":
     test_technical_scorer()
     print("\n" + "="*20 + "\n")
+    test_technical_scorer_matches_reference()
+    print("\n" + "="*20 + "\n")
+    test_extended_indicators()
+    print("\n" + "="*20 + "\n")
     test_risk_scorer()
     print("\n" + "="*20 + "\n")
     test_fundamental_scorer()
+    print("\n" + "="*20 + "\n")
+    test_lock_period_sweep()